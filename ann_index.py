@@ -0,0 +1,239 @@
+"""
+Approximate nearest-neighbour search over the keyword index
+Random-projection LSH on TF-IDF vectors with exact Jaccard re-ranking
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import ANN_NUM_TABLES, ANN_NUM_BITS, ANN_NUM_PROBES, ANN_MAX_CANDIDATES
+
+# Cap on the gathered (terms x hyperplanes) float32 projections held per projection step
+PROJECTION_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+class RandomProjectionLSH:
+    """
+    Multi-table sign-random-projection LSH over TF-IDF weighted keyword vectors
+    
+    Recall/latency knobs:
+        num_tables: More tables raise recall and memory, each adds one bucket lookup
+        num_bits: More bits per table make buckets smaller (faster, lower recall)
+        num_probes: Extra buckets probed per table by flipping the least certain bits
+        max_candidates: Cap on the candidates re-ranked exactly per query
+    """
+    
+    def __init__(self, keyword_index, num_tables: int = ANN_NUM_TABLES, num_bits: int = ANN_NUM_BITS, seed: int = 0):
+        if not 1 <= num_bits <= 62:
+            raise ValueError("num_bits must be between 1 and 62")
+        
+        self.keyword_index = keyword_index
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        
+        vocabulary_size = len(keyword_index.posting_offsets) - 1
+        qa_count = len(keyword_index.qa_keyword_totals)
+        document_frequencies = np.diff(keyword_index.posting_offsets)
+        self.idf_weights = (np.log((qa_count + 1) / (document_frequencies + 1)) + 1).astype(np.float32)
+        
+        random_state = np.random.default_rng(seed)
+        self.projections = random_state.standard_normal((vocabulary_size, num_tables * num_bits), dtype=np.float32)
+        self.bit_values = np.left_shift(np.int64(1), np.arange(num_bits, dtype=np.int64))
+        
+        self._build_row_major_postings(vocabulary_size, qa_count)
+        self._build_hash_tables(qa_count)
+    
+    def _build_row_major_postings(self, vocabulary_size: int, qa_count: int):
+        """Transpose the token-major posting lists into per-QA (CSR) rows"""
+        posting_token_ids = np.repeat(np.arange(vocabulary_size), np.diff(self.keyword_index.posting_offsets))
+        row_order = np.argsort(self.keyword_index.posting_qa_ids, kind="stable")
+        
+        self.row_token_ids = posting_token_ids[row_order]
+        self.row_counts = self.keyword_index.posting_counts[row_order]
+        self.row_offsets = np.zeros(qa_count + 1, dtype=np.int64)
+        self.row_offsets[1:] = np.cumsum(np.bincount(self.keyword_index.posting_qa_ids, minlength=qa_count))
+    
+    def _project_rows(self, row_start: int, row_end: int) -> np.ndarray:
+        """
+        Project a range of QA rows onto every table's random hyperplanes
+        
+        A sparse CSR-rows @ projections product: rows with the same number of
+        terms are gathered into one (rows, terms) block and multiplied as a
+        batch, which stays in float32 and avoids a scattered np.add.at.
+        """
+        row_lengths = np.diff(self.row_offsets[row_start:row_end + 1])
+        projected = np.zeros((row_end - row_start, self.projections.shape[1]), dtype=np.float32)
+        
+        for row_length in np.unique(row_lengths[row_lengths > 0]):
+            local_rows = np.flatnonzero(row_lengths == row_length)
+            positions = self.row_offsets[row_start + local_rows][:, None] + np.arange(row_length)
+            token_ids = self.row_token_ids[positions]
+            weights = (self.row_counts[positions] * self.idf_weights[token_ids]).astype(np.float32)
+            projected[local_rows] = (weights[:, None, :] @ self.projections[token_ids])[:, 0]
+        return projected
+    
+    def _hash_codes(self, projected: np.ndarray) -> np.ndarray:
+        """Turn projections into one integer bucket code per table"""
+        sign_bits = (projected > 0).reshape(len(projected), self.num_tables, self.num_bits)
+        return sign_bits.astype(np.int64) @ self.bit_values
+    
+    def _build_hash_tables(self, qa_count: int):
+        """Hash every QA entry and sort each table by bucket code for searchsorted lookups"""
+        codes = np.zeros((qa_count, self.num_tables), dtype=np.int64)
+        terms_per_chunk = max(PROJECTION_CHUNK_BYTES // (self.projections.shape[1] * self.projections.itemsize), 1)
+        row_start = 0
+        while row_start < qa_count:
+            # As many whole rows as fit in the byte budget, and at least one
+            row_end = int(np.searchsorted(self.row_offsets, self.row_offsets[row_start] + terms_per_chunk, side="right")) - 1
+            row_end = min(max(row_end, row_start + 1), qa_count)
+            codes[row_start:row_end] = self._hash_codes(self._project_rows(row_start, row_end))
+            row_start = row_end
+        
+        self.table_orders = np.argsort(codes, axis=0, kind="stable").T
+        self.table_codes = np.take_along_axis(codes, self.table_orders.T, axis=0).T
+    
+    def _query_terms(self, query_counts: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Map query tokens to sorted in-vocabulary token ids and counts"""
+        known_terms = sorted(
+            (self.keyword_index.vocabulary[token], count)
+            for token, count in query_counts.items() if token in self.keyword_index.vocabulary
+        )
+        token_ids = np.array([token_id for token_id, _ in known_terms], dtype=np.int64)
+        counts = np.array([count for _, count in known_terms], dtype=np.int64)
+        return token_ids, counts
+    
+    def _probe_codes(self, projected: np.ndarray, num_probes: int) -> np.ndarray:
+        """Bucket codes to visit per table: the home bucket plus single-bit flips of the weakest bits"""
+        per_table = projected.reshape(self.num_tables, self.num_bits)
+        home_codes = (per_table > 0).astype(np.int64) @ self.bit_values
+        probe_count = min(num_probes, self.num_bits)
+        if probe_count == 0:
+            return home_codes[:, None]
+        
+        weakest_bits = np.argsort(np.abs(per_table), axis=1)[:, :probe_count]
+        flipped_codes = home_codes[:, None] ^ self.bit_values[weakest_bits]
+        return np.concatenate([home_codes[:, None], flipped_codes], axis=1)
+    
+    def candidate_ids(self, token_ids: np.ndarray, counts: np.ndarray, num_probes: int = ANN_NUM_PROBES):
+        """
+        Collect the QA ids that share a probed bucket with the query in any table
+        
+        Returns:
+            Tuple of (candidate QA ids in ascending order, number of bucket collisions each)
+        """
+        weights = (counts * self.idf_weights[token_ids]).astype(np.float32)
+        projected = weights @ self.projections[token_ids]
+        probe_codes = self._probe_codes(projected, num_probes)
+        
+        bucket_members = []
+        for table in range(self.num_tables):
+            table_codes = self.table_codes[table]
+            starts = np.searchsorted(table_codes, probe_codes[table], side="left")
+            ends = np.searchsorted(table_codes, probe_codes[table], side="right")
+            for start, end in zip(starts, ends):
+                if end > start:
+                    bucket_members.append(self.table_orders[table][start:end])
+        
+        if not bucket_members:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(bucket_members), return_counts=True)
+    
+    def score_candidates(self, candidate_ids: np.ndarray, token_ids: np.ndarray, counts: np.ndarray, query_total: int) -> np.ndarray:
+        """Exact multiset Jaccard between the query and each candidate QA row"""
+        row_starts = self.row_offsets[candidate_ids]
+        row_lengths = self.row_offsets[candidate_ids + 1] - row_starts
+        total_terms = int(row_lengths.sum())
+        
+        term_positions = (
+            np.repeat(row_starts - np.cumsum(row_lengths) + row_lengths, row_lengths) + np.arange(total_terms)
+        )
+        row_token_ids = self.row_token_ids[term_positions]
+        query_positions = np.minimum(np.searchsorted(token_ids, row_token_ids), len(token_ids) - 1)
+        shared = token_ids[query_positions] == row_token_ids
+        overlaps = np.where(shared, np.minimum(self.row_counts[term_positions], counts[query_positions]), 0)
+        
+        candidate_rows = np.repeat(np.arange(len(candidate_ids)), row_lengths)
+        intersections = np.bincount(candidate_rows, weights=overlaps, minlength=len(candidate_ids))
+        unions = query_total + self.keyword_index.qa_keyword_totals[candidate_ids] - intersections
+        return intersections / unions
+    
+    def query(
+        self,
+        query_counts: Dict[str, int],
+        top_k: int,
+        num_probes: int = ANN_NUM_PROBES,
+        max_candidates: Optional[int] = ANN_MAX_CANDIDATES
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate candidate search followed by exact re-ranking
+        
+        Returns:
+            Tuple of (candidate QA ids, exact Jaccard scores) with non-zero scores
+        """
+        token_ids, counts = self._query_terms(query_counts)
+        if len(token_ids) == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=float)
+        
+        candidates, collisions = self.candidate_ids(token_ids, counts, num_probes)
+        if max_candidates is not None and len(candidates) > max_candidates:
+            most_collisions = np.argsort(-collisions, kind="stable")[:max_candidates]
+            candidates = np.sort(candidates[most_collisions])
+        if len(candidates) == 0:
+            return candidates, np.zeros(0, dtype=float)
+        
+        scores = self.score_candidates(candidates, token_ids, counts, sum(query_counts.values()))
+        keep = scores > 0
+        return candidates[keep], scores[keep]
+
+
+def evaluate_recall_at_k(questions: List[str], k: int = 5, num_probes: int = ANN_NUM_PROBES) -> Dict[str, float]:
+    """
+    Compare ANN results against the exact find_best_match search path
+    
+    Args:
+        questions: Evaluation questions, e.g. a sample of real chat logs
+        k: Number of results compared per question
+        num_probes: Query-time probe setting to evaluate
+    
+    Returns:
+        Dict with recall@k, mean per-query latency of both paths and mean candidate count
+    """
+    from delta_segment import merge_delta_matches
+    from question_matcher import (
+        correct_query_tokens, extract_keyword_counts, find_top_matches, get_lsh_index,
+        initialize_question_matching, select_top_k
+    )
+    
+    state = initialize_question_matching()
+    lsh_index = get_lsh_index(state)
+    found, expected = 0, 0
+    exact_seconds, ann_seconds = 0.0, 0.0
+    candidate_total = 0
+    
+    for question in questions:
+        started = time.perf_counter()
+        exact_ids = {qa_id for qa_id, _ in find_top_matches(question, top_k=k, state=state)}
+        exact_seconds += time.perf_counter() - started
+        
+        started = time.perf_counter()
+        # Same query preparation as find_top_matches(scoring_mode="ann"), typo correction included
+        query_counts = correct_query_tokens(extract_keyword_counts(question or ""), state)
+        candidate_ids, scores = lsh_index.query(query_counts, k, num_probes)
+        candidate_ids, scores = merge_delta_matches(candidate_ids, scores, query_counts, state)
+        ann_ids = {qa_id for qa_id, _ in select_top_k(candidate_ids, scores, k)}
+        ann_seconds += time.perf_counter() - started
+        
+        candidate_total += len(candidate_ids)
+        found += len(exact_ids & ann_ids)
+        expected += len(exact_ids)
+    
+    query_count = max(len(questions), 1)
+    return {
+        f"recall@{k}": found / expected if expected else 1.0,
+        "exact_latency_ms": exact_seconds / query_count * 1000,
+        "ann_latency_ms": ann_seconds / query_count * 1000,
+        "mean_candidates": candidate_total / query_count,
+        "num_tables": lsh_index.num_tables,
+        "num_bits": lsh_index.num_bits,
+        "num_probes": num_probes
+    }
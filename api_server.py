@@ -0,0 +1,344 @@
+"""
+Headless HTTP API for widget and partner integrations
+Serves the same knowledge base matching and LLM fallback as the Streamlit UI, without its per-interaction reruns
+
+Endpoints:
+    POST /ask            {"question": "..."} -> {"answer", "source", "confidence"}
+    POST /ask/stream     {"question": "..."} -> server-sent events: "chunk" events, then one "done" event
+    GET  /health         Circuit breaker, rate limiter, request coalescing and semantic cache state
+    GET  /metrics        Prometheus text (GET /metrics.json for the JSON snapshot)
+
+Usage:
+    python api_server.py --host 0.0.0.0 --port 8000
+    python api_server.py --port 8000 --workers 0    # one process per core, one shared matcher index
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import time
+from http import HTTPStatus
+from typing import Dict, NamedTuple, Optional
+from config import API_HOST, API_PORT, API_MAX_BODY_BYTES, API_KEEPALIVE_TIMEOUT_SECONDS, API_WORKERS
+from circuit_breaker import OPEN
+from llm_service import get_circuit_breaker_stats, get_llm_response_async, get_llm_response_streaming_async, load_environment
+from metrics import get_counter, get_histogram, get_metrics_snapshot, render_prometheus_text
+from prefork_server import serve_prefork
+from question_matcher import find_best_match, warm_up_query_indexes
+from rate_limiter import get_upstream_rate_limiter
+from request_coalescing import get_coalescing_stats
+from response_cache import get_semantic_cache
+
+MAX_HEADER_LINES = 100
+SOURCE_KNOWLEDGE_BASE = "knowledge_base"
+SOURCE_LLM = "llm"
+
+logger = logging.getLogger(__name__)
+
+rag_hits = get_counter("rag_hits_total", "Questions answered from the knowledge base")
+rag_misses = get_counter("rag_misses_total", "Questions that fell back to the LLM")
+api_request_seconds = get_histogram("api_request_seconds", "HTTP API request latency, streamed answers included")
+
+
+class HTTPError(Exception):
+    """Client or server problem answered with a JSON error body"""
+    
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+async def read_line(reader: asyncio.StreamReader) -> bytes:
+    """One request or header line; a line over the stream's buffer limit is the client's error"""
+    try:
+        return await reader.readline()
+    except ValueError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request line or header line too long")
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """Parse one HTTP/1.1 request, or return None once the client has closed the connection"""
+    request_line = await read_line(reader)
+    if not request_line.strip():
+        return None
+    
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        header_line = await read_line(reader)
+        if not header_line.strip():
+            break
+        name, separator, value = header_line.decode("latin-1").partition(":")
+        if not separator:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed header line")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+    
+    if "transfer-encoding" in headers:
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Send the body with Content-Length")
+    try:
+        content_length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if content_length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if content_length > API_MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body is limited to {API_MAX_BODY_BYTES} bytes")
+    
+    body = await reader.readexactly(content_length) if content_length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return Request(method.upper(), target.split("?", 1)[0], headers, body, keep_alive)
+
+
+def write_response(writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes, content_type: str, keep_alive: bool):
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+    )
+
+
+def write_json(writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict, keep_alive: bool):
+    write_response(writer, status, json.dumps(payload).encode("utf-8"), "application/json", keep_alive)
+
+
+def format_sse_event(event: str, payload: dict) -> bytes:
+    """One server-sent event; JSON keeps newlines in the answer from ending the event early"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+def parse_question(body: bytes) -> str:
+    """The question from a {"question": "..."} JSON body"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+    
+    question = payload.get("question") if isinstance(payload, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'Body must be {"question": "..."} with a non-empty question')
+    return question
+
+
+def match_knowledge_base(question: str) -> Optional[dict]:
+    """Knowledge base answer as an API payload, counting the RAG hit or miss like the UI"""
+    match_result = find_best_match(question)
+    if not match_result:
+        rag_misses.increment()
+        return None
+    
+    rag_hits.increment()
+    answer, confidence_score = match_result
+    return {"answer": answer, "source": SOURCE_KNOWLEDGE_BASE, "confidence": float(confidence_score)}
+
+
+async def handle_ask(request: Request, writer: asyncio.StreamWriter) -> bool:
+    question = parse_question(request.body)
+    # Matching is CPU-bound NumPy work, so it runs on a worker thread instead of stalling every connection
+    response = await asyncio.to_thread(match_knowledge_base, question)
+    if response is None:
+        response = {"answer": await get_llm_response_async(question), "source": SOURCE_LLM, "confidence": None}
+    write_json(writer, HTTPStatus.OK, response, request.keep_alive)
+    return request.keep_alive
+
+
+async def stream_answer_events(question: str, writer: asyncio.StreamWriter):
+    """Write the knowledge base answer, or the streamed LLM answer, as "chunk" events and a final "done" event"""
+    response = await asyncio.to_thread(match_knowledge_base, question)
+    if response is not None:
+        writer.write(format_sse_event("chunk", {"text": response["answer"]}))
+        writer.write(format_sse_event("done", {"source": response["source"], "confidence": response["confidence"]}))
+        return
+    
+    # aclosing leaves the coalesced stream as soon as the client disconnects; the coalescer
+    # cancels the upstream call once no other caller is reading it
+    async with contextlib.aclosing(get_llm_response_streaming_async(question)) as response_chunks:
+        async for response_chunk in response_chunks:
+            writer.write(format_sse_event("chunk", {"text": response_chunk}))
+            await writer.drain()
+    writer.write(format_sse_event("done", {"source": SOURCE_LLM, "confidence": None}))
+
+
+async def handle_ask_stream(request: Request, writer: asyncio.StreamWriter) -> bool:
+    """Stream the answer as server-sent events; the response is delimited by closing the connection"""
+    question = parse_question(request.body)
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/event-stream\r\n"
+        b"Cache-Control: no-cache\r\n"
+        b"Connection: close\r\n\r\n"
+    )
+    
+    try:
+        await stream_answer_events(question, writer)
+    except ConnectionError:
+        raise
+    except Exception:
+        # The 200 header is already sent, so the failure is reported as an event instead
+        logger.exception("Streaming an answer failed")
+        writer.write(format_sse_event("error", {"error": "Internal server error"}))
+    return False
+
+
+def get_health() -> dict:
+    """Always served with 200; "degraded" while the breaker is open and the LLM is bypassed"""
+    circuit_breaker_stats = get_circuit_breaker_stats()
+    return {
+        "status": "degraded" if circuit_breaker_stats["state"] == OPEN else "ok",
+        "pid": os.getpid(),
+        "circuit_breaker": circuit_breaker_stats,
+        "rate_limiter": get_upstream_rate_limiter().get_stats(),
+        "coalescing": get_coalescing_stats(),
+        "semantic_cache": get_semantic_cache().get_stats()
+    }
+
+
+async def handle_health(request: Request, writer: asyncio.StreamWriter) -> bool:
+    write_json(writer, HTTPStatus.OK, get_health(), request.keep_alive)
+    return request.keep_alive
+
+
+async def handle_metrics(request: Request, writer: asyncio.StreamWriter) -> bool:
+    write_response(writer, HTTPStatus.OK, render_prometheus_text().encode("utf-8"), "text/plain; version=0.0.4", request.keep_alive)
+    return request.keep_alive
+
+
+async def handle_metrics_json(request: Request, writer: asyncio.StreamWriter) -> bool:
+    write_json(writer, HTTPStatus.OK, get_metrics_snapshot(), request.keep_alive)
+    return request.keep_alive
+
+
+ROUTES = {
+    ("POST", "/ask"): handle_ask,
+    ("POST", "/ask/stream"): handle_ask_stream,
+    ("GET", "/health"): handle_health,
+    ("GET", "/metrics"): handle_metrics,
+    ("GET", "/metrics.json"): handle_metrics_json
+}
+
+
+async def dispatch_request(request: Request, writer: asyncio.StreamWriter) -> bool:
+    """Run the route's handler; returns whether the connection can serve another request"""
+    handler = ROUTES.get((request.method, request.path))
+    if handler is None:
+        if any(path == request.path for _, path in ROUTES):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{request.method} is not allowed on {request.path}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {request.path}")
+    return await handler(request, writer)
+
+
+async def serve_request(request: Request, writer: asyncio.StreamWriter) -> bool:
+    """Dispatch one request, answering any failure with a JSON error; returns whether the connection stays open"""
+    try:
+        return await dispatch_request(request, writer)
+    except HTTPError as error:
+        write_json(writer, error.status, {"error": error.message}, keep_alive=False)
+    except ConnectionError:
+        raise
+    except Exception:
+        logger.exception("Unhandled error serving %s %s", request.method, request.path)
+        write_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}, keep_alive=False)
+    return False
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve keep-alive requests on one connection until either side closes it"""
+    keep_alive = True
+    try:
+        while keep_alive:
+            try:
+                request = await asyncio.wait_for(read_request(reader), API_KEEPALIVE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                break
+            except HTTPError as error:
+                write_json(writer, error.status, {"error": error.message}, keep_alive=False)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                raise
+            except Exception:
+                logger.exception("Unhandled error reading a request")
+                write_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}, keep_alive=False)
+                break
+            if request is None:
+                break
+            
+            started = time.perf_counter()
+            try:
+                keep_alive = await serve_request(request, writer)
+                await writer.drain()
+            finally:
+                api_request_seconds.observe(time.perf_counter() - started)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def start_api_server(host: str = API_HOST, port: int = API_PORT, listen_socket: Optional[socket.socket] = None) -> asyncio.Server:
+    """
+    Build the matcher and typo indexes, then start accepting connections
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+        listen_socket: Already listening socket to accept from instead, as in a pre-forked worker
+    
+    Returns:
+        The listening asyncio server
+    """
+    await asyncio.to_thread(warm_up_query_indexes)
+    if listen_socket is not None:
+        return await asyncio.start_server(handle_connection, sock=listen_socket)
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+async def run_api_server(host: str = API_HOST, port: int = API_PORT, listen_socket: Optional[socket.socket] = None):
+    server = await start_api_server(host, port, listen_socket)
+    async with server:
+        await server.serve_forever()
+
+
+def serve_api_socket(listen_socket: socket.socket):
+    """Worker entry point for serve_prefork"""
+    asyncio.run(run_api_server(listen_socket=listen_socket))
+
+
+def print_listening(listen_socket: socket.socket, worker_count: int):
+    host, port = listen_socket.getsockname()[:2]
+    print(f"Serving on http://{host}:{port} with {worker_count} workers", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Pre-forked worker processes, 0 = one per CPU core")
+    arguments = parser.parse_args()
+    
+    load_environment()
+    if arguments.workers == 1:
+        asyncio.run(run_api_server(arguments.host, arguments.port))
+    else:
+        serve_prefork(arguments.host, arguments.port, serve_api_socket, arguments.workers, on_listening=print_listening)
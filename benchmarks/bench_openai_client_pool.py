@@ -0,0 +1,111 @@
+"""
+Benchmark: per-request OpenAI client vs the pooled, keep-alive client
+Runs against a local stub of the chat completions endpoint, no API key or network needed
+
+Usage:
+    python benchmarks/bench_openai_client_pool.py --requests 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STUB_COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-3.5-turbo",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "Thoughtful AI automates healthcare revenue cycle work."},
+        "finish_reason": "stop"
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+}
+
+
+class StubCompletionHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a fixed chat completion over HTTP/1.1 keep-alive"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(STUB_COMPLETION).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """Start the stub server on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletionHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def time_requests(get_client, request_count):
+    """Per-request latencies in milliseconds, client acquisition included"""
+    from llm_service import call_openai_completion_api_async, run_on_llm_event_loop
+    
+    latencies = []
+    for _ in range(request_count):
+        started = time.perf_counter()
+        response = run_on_llm_event_loop(call_openai_completion_api_async(get_client(), "What does EVA do?"))
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response, "stub server returned no completion"
+    return latencies
+
+
+def summarize(latencies):
+    """Mean and percentile summary of a latency sample"""
+    ordered = sorted(latencies)
+    return {
+        "mean_ms": sum(ordered) / len(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    }
+
+
+def run_benchmark(request_count):
+    """Compare a fresh client per request against the shared pooled client"""
+    from openai import AsyncOpenAI
+    import llm_service
+    
+    server, base_url = start_stub_server()
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    
+    try:
+        per_request = summarize(time_requests(
+            lambda: AsyncOpenAI(api_key="sk-benchmark", base_url=base_url), request_count
+        ))
+        pooled = summarize(time_requests(llm_service.create_openai_client, request_count))
+    finally:
+        server.shutdown()
+    
+    return {
+        "benchmark": "openai_client_pool",
+        "requests": request_count,
+        "per_request_client": per_request,
+        "pooled_client": pooled,
+        "saved_ms_per_request": per_request["mean_ms"] - pooled["mean_ms"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    arguments = parser.parse_args()
+    print(json.dumps(run_benchmark(arguments.requests), indent=2))
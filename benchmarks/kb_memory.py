@@ -0,0 +1,74 @@
+"""
+Memory benchmark for the knowledge base representation
+Compares bytes per entry of Q&A dicts and per-question Counters against CompactQAStore and the CSR inverted index
+
+Usage:
+    python benchmarks/kb_memory.py
+    python benchmarks/kb_memory.py --sizes 1000,100000,1000000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_kb import generate_synthetic_kb
+from data import THOUGHTFUL_AI_QA
+from kb_store import CompactQAStore
+from question_matcher import build_inverted_index, extract_keyword_counts
+
+DEFAULT_SIZES = "1000,100000"
+
+
+def measure_retained_bytes(build):
+    """
+    Bytes still allocated once build() returns, i.e. what its result keeps alive
+    
+    Returns:
+        Tuple of (build's result, retained bytes)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def measure_kb_memory(qa_entries):
+    """Bytes per entry for each representation of the same Q&A entries"""
+    entry_count = len(qa_entries)
+    # Copy the strings too, so the dicts own their text the way a loaded KB does
+    _, dict_bytes = measure_retained_bytes(
+        lambda: [{"question": "".join(qa["question"]), "answer": "".join(qa["answer"])} for qa in qa_entries]
+    )
+    store, store_bytes = measure_retained_bytes(lambda: CompactQAStore.from_entries(qa_entries))
+    _, counter_bytes = measure_retained_bytes(lambda: [extract_keyword_counts(qa["question"]) for qa in qa_entries])
+    _, index_bytes = measure_retained_bytes(lambda: build_inverted_index(store.questions))
+    
+    return {
+        "entries": entry_count,
+        "dict_entries_bytes_per_entry": dict_bytes / entry_count,
+        "compact_store_bytes_per_entry": store_bytes / entry_count,
+        "counter_terms_bytes_per_entry": counter_bytes / entry_count,
+        "csr_terms_bytes_per_entry": index_bytes / entry_count,
+        "text_reduction": dict_bytes / store_bytes,
+        "term_reduction": counter_bytes / index_bytes
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated synthetic KB sizes")
+    args = parser.parse_args()
+    
+    results = {"thoughtful_ai_qa": measure_kb_memory(THOUGHTFUL_AI_QA)}
+    for size in (int(size) for size in args.sizes.split(",")):
+        results[f"synthetic/n={size}"] = measure_kb_memory(generate_synthetic_kb(size))
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,170 @@
+"""
+Load test for the headless HTTP API
+Without --host/--port it starts api_server in-process with a stubbed LLM, so no API key or network is needed
+
+Usage:
+    python benchmarks/load_test_api.py --connections 50 --requests 20
+    python benchmarks/load_test_api.py --llm-delay 0.5 --stream
+    python benchmarks/load_test_api.py --host 127.0.0.1 --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+KB_QUESTION = "What does EVA do?"
+
+
+async def read_response(reader):
+    """Status, headers and body of one response; reads to EOF when there is no Content-Length"""
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        header_line = await reader.readline()
+        if not header_line.strip():
+            break
+        name, _, value = header_line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+    return int(status_line.split()[1]), headers, body
+
+
+async def post_json(reader, writer, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: load-test\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    return await read_response(reader)
+
+
+def build_question(connection, request_number, llm_fraction):
+    """A KB question, or a unique off-topic question that has to go to the LLM"""
+    if (request_number * 7 + connection) % 100 < llm_fraction * 100:
+        return f"How should clinic {connection} prepare for audit {request_number}?"
+    return KB_QUESTION
+
+
+async def run_ask_client(host, port, connection, request_count, llm_fraction, latencies):
+    """One keep-alive connection sending request_count POST /ask requests back to back"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request_number in range(request_count):
+            started = time.perf_counter()
+            status, _, _ = await post_json(reader, writer, "/ask", {"question": build_question(connection, request_number, llm_fraction)})
+            latencies.append(time.perf_counter() - started)
+            assert status == 200, f"unexpected status {status}"
+    finally:
+        writer.close()
+
+
+async def run_stream_client(host, port, connection, request_count, llm_fraction, latencies, first_event_latencies):
+    """request_count POST /ask/stream requests, one connection each since SSE responses end with close"""
+    for request_number in range(request_count):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            body = json.dumps({"question": build_question(connection, request_number, llm_fraction)}).encode("utf-8")
+            started = time.perf_counter()
+            writer.write(
+                f"POST /ask/stream HTTP/1.1\r\nHost: load-test\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+            while (await reader.readline()).strip():
+                pass
+            await reader.readuntil(b"\n\n")
+            first_event_latencies.append(time.perf_counter() - started)
+            await reader.read()
+            latencies.append(time.perf_counter() - started)
+        finally:
+            writer.close()
+
+
+def summarize_latencies(latencies_seconds, prefix):
+    latencies_ms = np.array(latencies_seconds) * 1000
+    return {
+        f"{prefix}/p50_ms": float(np.percentile(latencies_ms, 50)),
+        f"{prefix}/p95_ms": float(np.percentile(latencies_ms, 95)),
+        f"{prefix}/p99_ms": float(np.percentile(latencies_ms, 99))
+    }
+
+
+def install_stub_llm(delay_seconds):
+    """Point the async LLM path at the test stub client, without the account's rate limits"""
+    import llm_service
+    import rate_limiter
+    from tests.llm_stubs import AsyncStubOpenAIClient
+    
+    stub_client = AsyncStubOpenAIClient(delay_seconds=delay_seconds)
+    llm_service.is_openai_api_key_available = lambda: True
+    llm_service.create_async_openai_client = lambda: stub_client
+    rate_limiter.upstream_rate_limiter = rate_limiter.UpstreamRateLimiter(requests_per_minute=1e9, tokens_per_minute=1e12)
+    return stub_client
+
+
+async def run_load_test(arguments):
+    """Drive the API with concurrent clients and return throughput and latency percentiles"""
+    server = stub_client = None
+    host, port = arguments.host, arguments.port
+    if port is None:
+        from api_server import start_api_server
+        
+        stub_client = install_stub_llm(arguments.llm_delay)
+        server = await start_api_server("127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+    
+    latencies, first_event_latencies = [], []
+    started = time.perf_counter()
+    try:
+        if arguments.stream:
+            clients = [
+                run_stream_client(host, port, connection, arguments.requests, arguments.llm_fraction, latencies, first_event_latencies)
+                for connection in range(arguments.connections)
+            ]
+        else:
+            clients = [
+                run_ask_client(host, port, connection, arguments.requests, arguments.llm_fraction, latencies)
+                for connection in range(arguments.connections)
+            ]
+        await asyncio.gather(*clients)
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    elapsed = time.perf_counter() - started
+    
+    endpoint = "ask_stream" if arguments.stream else "ask"
+    results = {
+        f"{endpoint}/requests": len(latencies),
+        f"{endpoint}/requests_per_second": len(latencies) / elapsed,
+        **summarize_latencies(latencies, f"{endpoint}/latency")
+    }
+    if first_event_latencies:
+        results.update(summarize_latencies(first_event_latencies, f"{endpoint}/first_event"))
+    if stub_client is not None:
+        results[f"{endpoint}/upstream_calls"] = stub_client.calls
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="Target a running server instead of an in-process one")
+    parser.add_argument("--connections", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--llm-fraction", type=float, default=0.5, help="Share of questions that miss the KB")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--stream", action="store_true", help="Load POST /ask/stream instead of POST /ask")
+    arguments = parser.parse_args()
+    
+    print(json.dumps(asyncio.run(run_load_test(arguments)), indent=2))
@@ -0,0 +1,73 @@
+"""
+Import-time profiler for cold starts
+Imports a module in a fresh interpreter under `python -X importtime` and reports where the time goes
+
+Usage:
+    python benchmarks/profile_imports.py main
+    python benchmarks/profile_imports.py api_server --top 30 --budget-ms 250
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_DEPENDENCIES = ("numpy", "openai", "dotenv")
+
+
+def profile_import(module_name: str) -> dict:
+    """
+    Import module_name in a clean subprocess and parse the -X importtime report
+    
+    Args:
+        module_name: Module to import, e.g. "main"
+    
+    Returns:
+        Dict with total_ms (the module's cumulative import time), the set of
+        imported modules, the heavy dependencies that got loaded and the
+        slowest imports by self and cumulative time
+    """
+    environment = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=REPO_ROOT, env=environment, capture_output=True, text=True, check=True
+    )
+    
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    
+    imported_modules = {entry["module"] for entry in imports}
+    target = next(entry for entry in reversed(imports) if entry["module"] == module_name)
+    return {
+        "module": module_name,
+        "total_ms": target["cumulative_ms"],
+        "imported_modules": imported_modules,
+        "heavy_dependencies_loaded": [name for name in HEAVY_DEPENDENCIES if name in imported_modules],
+        "slowest_self": sorted(imports, key=lambda entry: entry["self_ms"], reverse=True),
+        "slowest_cumulative": sorted(imports, key=lambda entry: entry["cumulative_ms"], reverse=True)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20, help="Slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, help="Exit with 1 when the import takes longer")
+    arguments = parser.parse_args()
+    
+    profile = profile_import(arguments.module)
+    report = {
+        "module": profile["module"],
+        "total_ms": profile["total_ms"],
+        "heavy_dependencies_loaded": profile["heavy_dependencies_loaded"],
+        "slowest_self": profile["slowest_self"][:arguments.top],
+        "slowest_cumulative": profile["slowest_cumulative"][:arguments.top]
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if arguments.budget_ms is not None and profile["total_ms"] > arguments.budget_ms else 0)
@@ -0,0 +1,282 @@
+"""
+Benchmark suite: keyword similarity, matcher lookups, matcher cold start and UI streaming
+Prints machine-readable JSON; compare against an earlier run to catch regressions
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 5,1000,100000 --output results.json
+    python benchmarks/run_benchmarks.py --sizes 5,1000,10000,100000,1000000
+    python benchmarks/run_benchmarks.py --baseline results.json --max-regression 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import data
+import question_matcher
+from benchmarks.synthetic_kb import generate_queries, generate_synthetic_kb
+
+DEFAULT_SIZES = "5,1000,10000,100000"
+QUERY_COUNT = 200
+STREAM_CHUNK_COUNTS = (100, 1000)
+ANN_MIN_KB_SIZE = 10000
+
+
+def best_of(function, repeats=5, number=1000):
+    """Best mean seconds per call over several timing runs, the least noisy estimate"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def latency_percentiles(latencies_seconds, prefix):
+    """p50/p95/p99 of a latency sample in microseconds, keyed under prefix"""
+    latencies_us = np.array(latencies_seconds) * 1e6
+    return {
+        f"{prefix}/p50_us": float(np.percentile(latencies_us, 50)),
+        f"{prefix}/p95_us": float(np.percentile(latencies_us, 95)),
+        f"{prefix}/p99_us": float(np.percentile(latencies_us, 99))
+    }
+
+
+def bench_keyword_similarity():
+    """Micro benchmark of the pairwise scalar similarity used by the full-scan path"""
+    short_pair = ("What does EVA do?", "What does the eligibility verification agent (EVA) do?")
+    long_pair = (" ".join(["claims processing payment posting"] * 25), " ".join(["eligibility claims agent"] * 25))
+    return {
+        "calculate_keyword_similarity/short_us": best_of(lambda: question_matcher.calculate_keyword_similarity(*short_pair)) * 1e6,
+        "calculate_keyword_similarity/long_us": best_of(
+            lambda: question_matcher.calculate_keyword_similarity(*long_pair), number=200
+        ) * 1e6
+    }
+
+
+def time_cold_start(qa_entries):
+    """Seconds for initialize_question_matching with no state loaded"""
+    question_matcher.matcher_state = None
+    started = time.perf_counter()
+    question_matcher.initialize_question_matching()
+    return time.perf_counter() - started
+
+
+def bench_matcher(size):
+    """Cold start (built and snapshot-loaded) and lookup latency for one synthetic KB size"""
+    qa_entries = generate_synthetic_kb(size)
+    queries = generate_queries(qa_entries, QUERY_COUNT)
+    original_entries = data.THOUGHTFUL_AI_QA
+    original_snapshot_dir = os.environ.pop("MATCHER_SNAPSHOT_DIR", None)
+    results = {}
+    
+    data.THOUGHTFUL_AI_QA = qa_entries
+    try:
+        results[f"initialize_question_matching/n={size}/cold_build_ms"] = time_cold_start(qa_entries) * 1000
+        
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            os.environ["MATCHER_SNAPSHOT_DIR"] = snapshot_dir
+            time_cold_start(qa_entries)
+            results[f"initialize_question_matching/n={size}/snapshot_load_ms"] = time_cold_start(qa_entries) * 1000
+            del os.environ["MATCHER_SNAPSHOT_DIR"]
+            
+            scoring_modes = ["keyword", "ann"] if size >= ANN_MIN_KB_SIZE else ["keyword"]
+            for scoring_mode in scoring_modes:
+                question_matcher.find_best_match(queries[0], scoring_mode=scoring_mode)
+                latencies = []
+                for query in queries:
+                    started = time.perf_counter()
+                    question_matcher.find_best_match(query, scoring_mode=scoring_mode)
+                    latencies.append(time.perf_counter() - started)
+                results.update(latency_percentiles(latencies, f"find_best_match/{scoring_mode}/n={size}"))
+            
+            results.update(bench_fuzzy_correction(size))
+            results.update(bench_incremental_edits(size, qa_entries))
+            question_matcher.matcher_state = None
+    finally:
+        data.THOUGHTFUL_AI_QA = original_entries
+        question_matcher.matcher_state = None
+        if original_snapshot_dir is not None:
+            os.environ["MATCHER_SNAPSHOT_DIR"] = original_snapshot_dir
+    
+    return results
+
+
+def bench_fuzzy_correction(size):
+    """Typo index build time and uncached correction latency for tokens with one character dropped"""
+    state = question_matcher.initialize_question_matching()
+    question_matcher.fuzzy_token_index = None
+    started = time.perf_counter()
+    fuzzy_index = question_matcher.get_fuzzy_token_index(state)
+    results = {f"fuzzy_token_index/n={size}/build_ms": (time.perf_counter() - started) * 1000}
+    
+    random_state = np.random.default_rng(2)
+    long_tokens = [token for token in state.keyword_index.vocabulary if len(token) >= 6]
+    latencies = []
+    for token_number in random_state.integers(len(long_tokens), size=QUERY_COUNT):
+        token = long_tokens[token_number]
+        dropped = int(random_state.integers(len(token)))
+        started = time.perf_counter()
+        fuzzy_index.find_correction(token[:dropped] + token[dropped + 1:])
+        latencies.append(time.perf_counter() - started)
+    
+    results.update(latency_percentiles(latencies, f"fuzzy_correction/n={size}"))
+    return results
+
+
+def bench_incremental_edits(size, qa_entries):
+    """Upsert/delete latency against the published KB, and the compaction that folds the edits back in"""
+    original_delta_limit = question_matcher.MATCHER_COMPACTION_DELTA_ENTRIES
+    original_tombstone_limit = question_matcher.MATCHER_COMPACTION_TOMBSTONE_FRACTION
+    question_matcher.MATCHER_COMPACTION_DELTA_ENTRIES = float("inf")
+    question_matcher.MATCHER_COMPACTION_TOMBSTONE_FRACTION = float("inf")
+    random_state = np.random.default_rng(3)
+    results = {}
+    
+    try:
+        # The first edit after a build creates the delta segment; report it on its own
+        started = time.perf_counter()
+        question_matcher.upsert_qa_entry("How do I reset my portal password?", "Use the forgot password link.")
+        results[f"upsert_qa_entry/n={size}/first_edit_ms"] = (time.perf_counter() - started) * 1000
+        
+        latencies = []
+        for edit_number, qa_number in enumerate(random_state.integers(len(qa_entries), size=QUERY_COUNT)):
+            qa = qa_entries[qa_number]
+            started = time.perf_counter()
+            if edit_number % 4 == 0:
+                question_matcher.delete_qa_entry(qa["question"])
+            else:
+                question_matcher.upsert_qa_entry(qa["question"], f"Edited answer {edit_number}")
+            latencies.append(time.perf_counter() - started)
+        results.update(latency_percentiles(latencies, f"upsert_qa_entry/n={size}"))
+        
+        started = time.perf_counter()
+        question_matcher.compact_question_matching(background=False)
+        results[f"compact_question_matching/n={size}/ms"] = (time.perf_counter() - started) * 1000
+    finally:
+        question_matcher.MATCHER_COMPACTION_DELTA_ENTRIES = original_delta_limit
+        question_matcher.MATCHER_COMPACTION_TOMBSTONE_FRACTION = original_tombstone_limit
+    
+    return results
+
+
+class RecordingPlaceholder:
+    """Stands in for st.empty(): counts markdown calls and the bytes they re-render"""
+    
+    def __init__(self):
+        self.markdown_calls = 0
+        self.rendered_bytes = 0
+    
+    def markdown(self, text):
+        self.markdown_calls += 1
+        self.rendered_bytes += len(text.encode("utf-8"))
+
+
+def bench_streaming_display(chunk_count):
+    """Chunk handling cost of main.display_streaming_response with Streamlit stubbed out"""
+    import main
+    
+    chunks = [f"word{index} " for index in range(chunk_count)]
+    placeholder = RecordingPlaceholder()
+    original_st, original_stream = main.st, main.get_llm_response_streaming
+    main.st = SimpleNamespace(empty=lambda: placeholder)
+    main.get_llm_response_streaming = lambda user_input: iter(chunks)
+    
+    try:
+        started = time.perf_counter()
+        main.display_streaming_response("benchmark question")
+        elapsed = time.perf_counter() - started
+    finally:
+        main.st, main.get_llm_response_streaming = original_st, original_stream
+    
+    prefix = f"display_streaming_response/chunks={chunk_count}"
+    return {
+        f"{prefix}/total_ms": elapsed * 1000,
+        f"{prefix}/markdown_calls": placeholder.markdown_calls,
+        f"{prefix}/rendered_bytes": placeholder.rendered_bytes
+    }
+
+
+def get_git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes):
+    """Run every benchmark and return metadata plus a flat {metric: value} dict"""
+    metrics = bench_keyword_similarity()
+    for size in sizes:
+        metrics.update(bench_matcher(size))
+    for chunk_count in STREAM_CHUNK_COUNTS:
+        metrics.update(bench_streaming_display(chunk_count))
+    
+    return {
+        "metadata": {
+            "created_at": time.time(),
+            "git_commit": get_git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "kb_sizes": sizes
+        },
+        "metrics": metrics
+    }
+
+
+def find_regressions(results, baseline, max_regression):
+    """
+    Metrics that got worse than the baseline by more than max_regression
+    
+    Every metric is lower-is-better (time, calls, bytes). Metrics missing from
+    either run are skipped.
+    
+    Returns:
+        List of {"metric", "baseline", "current", "change"} dicts
+    """
+    regressions = []
+    for metric, baseline_value in baseline["metrics"].items():
+        current_value = results["metrics"].get(metric)
+        if current_value is None or baseline_value <= 0:
+            continue
+        change = current_value / baseline_value - 1
+        if change > max_regression:
+            regressions.append({"metric": metric, "baseline": baseline_value, "current": current_value, "change": change})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated synthetic KB sizes")
+    parser.add_argument("--output", help="Also write the results JSON to this file")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    arguments = parser.parse_args()
+    
+    results = run_benchmarks([int(size) for size in arguments.sizes.split(",")])
+    
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            results["regressions"] = find_regressions(results, json.load(baseline_file), arguments.max_regression)
+    
+    print(json.dumps(results, indent=2))
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    
+    sys.exit(1 if results.get("regressions") else 0)
@@ -0,0 +1,76 @@
+"""
+Deterministic synthetic Q&A knowledge bases for benchmarks
+Word frequencies follow a Zipf distribution so posting lists are skewed like real text
+"""
+
+import itertools
+import os
+import sys
+from typing import List
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_matcher import IMPORTANT_KEYWORDS
+
+SYLLABLES = ["ba", "co", "de", "fi", "gu", "ha", "ki", "lo", "me", "nu", "pa", "ri", "so", "ta", "vi", "zo"]
+QUESTION_TEMPLATES = ["How does {} work?", "What is {}?", "Can you explain {}?", "Tell me about {}"]
+ZIPF_EXPONENT = 1.2
+
+
+def build_vocabulary(vocabulary_size: int) -> List[str]:
+    """Pronounceable pseudo-words, shortest first so frequent ranks get short words"""
+    words = []
+    for length in itertools.count(2):
+        for syllables in itertools.product(SYLLABLES, repeat=length):
+            words.append("".join(syllables))
+            if len(words) == vocabulary_size:
+                return words
+
+
+def generate_synthetic_kb(size: int, seed: int = 0, vocabulary_size: int = 50000) -> List[dict]:
+    """
+    Build a Q&A list shaped like data.THOUGHTFUL_AI_QA
+    
+    Args:
+        size: Number of Q&A entries
+        seed: Random seed, the same seed always gives the same KB
+        vocabulary_size: Distinct filler words to draw from
+    
+    Returns:
+        List of {"question", "answer"} dicts
+    """
+    random_state = np.random.default_rng(seed)
+    vocabulary = np.array(build_vocabulary(vocabulary_size) + IMPORTANT_KEYWORDS)
+    
+    question_lengths = random_state.integers(3, 9, size)
+    answer_lengths = random_state.integers(12, 25, size)
+    word_ranks = (random_state.zipf(ZIPF_EXPONENT, int(question_lengths.sum() + answer_lengths.sum())) - 1) % len(vocabulary)
+    words = vocabulary[word_ranks].tolist()
+    templates = random_state.integers(0, len(QUESTION_TEMPLATES), size)
+    
+    qa_entries = []
+    position = 0
+    for entry in range(size):
+        question_end = position + question_lengths[entry]
+        answer_end = question_end + answer_lengths[entry]
+        qa_entries.append({
+            "question": QUESTION_TEMPLATES[templates[entry]].format(" ".join(words[position:question_end])),
+            "answer": " ".join(words[question_end:answer_end]).capitalize() + "."
+        })
+        position = answer_end
+    
+    return qa_entries
+
+
+def generate_queries(qa_entries: List[dict], count: int, seed: int = 1) -> List[str]:
+    """Half paraphrased KB questions (one word dropped), half off-topic questions"""
+    random_state = np.random.default_rng(seed)
+    queries = []
+    for query_number in range(count):
+        if query_number % 2 == 0:
+            words = qa_entries[int(random_state.integers(len(qa_entries)))]["question"].split()
+            del words[int(random_state.integers(len(words)))]
+            queries.append(" ".join(words))
+        else:
+            queries.append(f"What is the weather like in city {query_number}?")
+    return queries
@@ -0,0 +1,60 @@
+"""
+Bounded chat history storage
+Recent messages stay as plain dicts, older ones are packed into zlib-compressed JSON blocks
+"""
+
+import json
+import zlib
+from typing import List, Tuple
+
+ArchivedBlock = Tuple[int, bytes]
+
+
+def compress_messages(messages: List[dict]) -> bytes:
+    """Pack a run of chat messages into one compressed block"""
+    return zlib.compress(json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decompress_messages(block: bytes) -> List[dict]:
+    """Unpack a block produced by compress_messages"""
+    return json.loads(zlib.decompress(block).decode("utf-8"))
+
+
+def archive_oldest_messages(messages: List[dict], archived_blocks: List[ArchivedBlock], max_live_messages: int, block_size: int):
+    """
+    Move the oldest messages into compressed blocks until at most max_live_messages remain
+
+    Messages move block_size at a time so compression has enough text to work
+    with and archiving does not run on every new message. Both lists are
+    modified in place.
+    """
+    while len(messages) > max_live_messages:
+        oldest = messages[:block_size]
+        del messages[:block_size]
+        archived_blocks.append((len(oldest), compress_messages(oldest)))
+
+
+def count_messages(messages: List[dict], archived_blocks: List[ArchivedBlock]) -> int:
+    """Total messages in the conversation, archived ones included"""
+    return len(messages) + sum(block_count for block_count, _ in archived_blocks)
+
+
+def get_recent_messages(messages: List[dict], archived_blocks: List[ArchivedBlock], count: int) -> List[dict]:
+    """
+    The last count messages of the conversation, oldest first
+
+    Only the archived blocks that overlap the requested window are decompressed.
+    """
+    if count <= len(messages):
+        return messages[len(messages) - count:]
+
+    still_needed = count - len(messages)
+    older_blocks = []
+    for block_count, block in reversed(archived_blocks):
+        if still_needed <= 0:
+            break
+        block_messages = decompress_messages(block)
+        older_blocks.append(block_messages[max(0, block_count - still_needed):])
+        still_needed -= block_count
+
+    return [message for block_messages in reversed(older_blocks) for message in block_messages] + messages
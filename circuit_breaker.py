@@ -0,0 +1,128 @@
+"""
+Circuit breaker for the upstream LLM
+Stops sending questions to OpenAI while it is failing or slow, then probes for recovery
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable
+from config import (
+    LLM_BREAKER_WINDOW,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_FAILURE_RATE,
+    LLM_BREAKER_SLOW_CALL_SECONDS,
+    LLM_BREAKER_OPEN_SECONDS,
+    LLM_TIMEOUT_SECONDS
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed -> open -> half-open breaker over a rolling window of recent calls
+    
+    A call counts as bad if it failed or took longer than slow_call_seconds.
+    The breaker opens once the window holds at least min_calls and the bad
+    fraction reaches failure_rate. After open_seconds one probe is let through
+    (half-open): success closes the breaker, failure re-opens it.
+    """
+    
+    def __init__(
+        self,
+        window: int = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        failure_rate: float = LLM_BREAKER_FAILURE_RATE,
+        slow_call_seconds: float = LLM_BREAKER_SLOW_CALL_SECONDS,
+        open_seconds: float = LLM_BREAKER_OPEN_SECONDS,
+        probe_timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = None
+        self.probe_started_at = None
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def is_open(self) -> bool:
+        """True while calls are being rejected and the cool-down has not yet elapsed"""
+        with self._lock:
+            return self.state == OPEN and self.clock() - self.opened_at < self.open_seconds
+    
+    def allow_request(self) -> bool:
+        """Whether an upstream call may start now; grants the single half-open probe"""
+        with self._lock:
+            now = self.clock()
+            
+            if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self.probe_started_at = None
+            
+            if self.state == HALF_OPEN:
+                # A probe that never reported back (e.g. abandoned stream) must not wedge the breaker
+                if self.probe_started_at is None or now - self.probe_started_at >= self.probe_timeout_seconds:
+                    self.probe_started_at = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            
+            self.rejected_calls += 1
+            return False
+    
+    def record_success(self, latency_seconds: float):
+        """Report a finished call; a slow success counts against the upstream"""
+        if latency_seconds > self.slow_call_seconds:
+            self.record_failure()
+            return
+        
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+    
+    def record_failure(self):
+        """Report a failed (or too slow) call"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            
+            self._outcomes.append(False)
+            bad_calls = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and bad_calls / len(self._outcomes) >= self.failure_rate):
+                self._open()
+    
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.probe_started_at = None
+        self.times_opened += 1
+        self._outcomes.clear()
+    
+    def get_stats(self) -> dict:
+        """Breaker state and counters for monitoring"""
+        with self._lock:
+            state = self.state
+            if state == OPEN and self.clock() - self.opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            recent_calls = len(self._outcomes)
+            return {
+                "state": state,
+                "recent_calls": recent_calls,
+                "recent_failure_rate": self._outcomes.count(False) / recent_calls if recent_calls else 0.0,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected_calls
+            }
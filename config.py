@@ -4,6 +4,73 @@ Configuration constants for the Thoughtful AI Support Agent
 
 LLM_MODEL = "gpt-3.5-turbo"
 MAX_TOKENS = 500
+LLM_TIMEOUT_SECONDS = 30  # Total budget per question: every attempt, backoff sleep and hedge
+LLM_ATTEMPT_TIMEOUT_SECONDS = 10  # Cap per attempt, so a stalled attempt is retried within the budget
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BASE_DELAY_SECONDS = 0.25
+LLM_RETRY_MAX_DELAY_SECONDS = 4.0
+LLM_HEDGE_ENABLED = False  # Race a second request when the first is slower than the observed p95
+LLM_HEDGE_PERCENTILE = 0.95
+LLM_HEDGE_MIN_DELAY_SECONDS = 0.5
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = 2.0  # Used until LLM_LATENCY_MIN_SAMPLES latencies are recorded
+LLM_LATENCY_WINDOW = 200
+LLM_LATENCY_MIN_SAMPLES = 20
+LLM_BREAKER_WINDOW = 20  # Recent upstream calls the circuit breaker judges failure rate over
+LLM_BREAKER_MIN_CALLS = 10
+LLM_BREAKER_FAILURE_RATE = 0.5
+LLM_BREAKER_SLOW_CALL_SECONDS = 10  # Slower calls (time to first token when streaming) count as failures
+LLM_BREAKER_OPEN_SECONDS = 30  # How long to fail fast before letting a probe through
+LLM_BREAKER_KB_FALLBACK_THRESHOLD = 0.2  # Loose match threshold for KB answers served while the breaker is open
+LLM_REQUESTS_PER_MINUTE = 3500  # Account-wide: pre-forked API workers each get an equal share
+LLM_TOKENS_PER_MINUTE = 90000
+LLM_RATE_LIMIT_QUEUE_SIZE = 200
+LLM_RATE_LIMIT_QUEUE_TIMEOUT_SECONDS = 10
+LLM_MAX_CONCURRENT_REQUESTS = 100  # Split across workers too; keep <= LLM_MAX_CONNECTIONS so admitted streams never wait for a socket
+LLM_MAX_CONNECTIONS = 100
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+LLM_KEEPALIVE_EXPIRY_SECONDS = 60.0
+PROMPT_VERSION = "1"  # Bump when build_system_prompt changes so cached answers are not reused
+
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+RESPONSE_CACHE_PERSISTENT_MAX_ENTRIES = 100000
+
+SEMANTIC_CACHE_MAX_ENTRIES = 2048
+SEMANTIC_CACHE_DIMENSIONS = 512
+SEMANTIC_CACHE_SIMILARITY_THRESHOLD = 0.9
+SEMANTIC_CACHE_MIN_CONTENT_OVERLAP = 0.75  # Jaccard floor on the content words of two questions served one answer
+
+ANN_NUM_TABLES = 16
+ANN_NUM_BITS = 14
+ANN_NUM_PROBES = 2
+ANN_MAX_CANDIDATES = 2000
+ANN_PREBUILD = False  # Build the LSH index at warm-up; only worth it when a serving path uses scoring_mode="ann"
+
+FUZZY_MATCH_ENABLED = True  # Correct query tokens missing from the KB vocabulary to a close KB token
+FUZZY_MATCH_MIN_TOKEN_LENGTH = 5  # Shorter tokens are left alone: too many real words are one edit apart
+FUZZY_MATCH_TWO_EDIT_TOKEN_LENGTH = 9  # Tokens this long tolerate two edits, shorter ones one
+FUZZY_MATCH_CACHE_SIZE = 4096
+
+MATCHER_COMPACTION_DELTA_ENTRIES = 1000  # Upserts kept beside the main index before a background rebuild
+MATCHER_COMPACTION_TOMBSTONE_FRACTION = 0.1  # ...or once this share of all entries is deleted
+
+KB_LOADER_MAX_FIELD_CHARS = 20000  # Longer questions or answers are rejected as malformed records
+KB_LOADER_MAX_REPORTED_PROBLEMS = 20  # Skipped records beyond this are counted but not listed
+
+STREAM_RENDER_INTERVAL_SECONDS = 0.05  # Redraw a streaming answer at most ~20 times a second
+STREAM_RENDER_MAX_PENDING_CHARS = 400  # ...unless this much new text is waiting
+
+CHAT_HISTORY_VISIBLE_MESSAGES = 20  # Rendered on every rerun; older ones sit behind "load earlier"
+CHAT_HISTORY_LOAD_MORE_STEP = 20
+CHAT_HISTORY_MAX_LIVE_MESSAGES = 100  # Beyond this, the oldest messages are compressed
+CHAT_HISTORY_ARCHIVE_BLOCK_SIZE = 50
+
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_MAX_BODY_BYTES = 16 * 1024  # Larger /ask bodies are rejected with 413
+API_KEEPALIVE_TIMEOUT_SECONDS = 15  # Idle keep-alive connections are closed after this
+API_WORKERS = 1  # Pre-forked worker processes sharing one listening socket; 0 = one per CPU core
+API_WORKER_RESPAWN_DELAY_SECONDS = 1.0  # Pause before replacing a crashed worker, so crash loops back off
 
 APP_TITLE = "Thoughtful AI Support Assistant"
 WELCOME_MESSAGE = """
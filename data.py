@@ -26,14 +26,32 @@ THOUGHTFUL_AI_QA = [
     }
 ]
 
+def iter_qa_entries():
+    """
+    Yield Q&A entries one at a time: streamed from the KB_PATH export when set, otherwise THOUGHTFUL_AI_QA
+    
+    Invalid records in the export are skipped and logged rather than failing
+    every lookup; validate a file up front with python kb_loader.py.
+    """
+    from kb_loader import LoadReport, get_kb_path, iter_kb_file, log_load_report
+    
+    kb_path = get_kb_path()
+    if kb_path is None:
+        yield from THOUGHTFUL_AI_QA
+        return
+    
+    report = LoadReport()
+    yield from iter_kb_file(kb_path, skip_invalid=True, report=report)
+    log_load_report(kb_path, report)
+
 def get_all_questions():
-    """Helper function to get all questions for display purposes"""
-    return [qa["question"] for qa in THOUGHTFUL_AI_QA]
+    """Helper function to iterate over all questions for display purposes"""
+    return (qa["question"] for qa in iter_qa_entries())
 
 def get_all_answers():
-    """Helper function to get all answers for reference"""
-    return [qa["answer"] for qa in THOUGHTFUL_AI_QA]
+    """Helper function to iterate over all answers for reference"""
+    return (qa["answer"] for qa in iter_qa_entries())
 
 def get_question_count():
-    """Helper function to get the total number of predefined questions"""
-    return len(THOUGHTFUL_AI_QA) 
\ No newline at end of file
+    """Helper function to get the total number of questions, counted without loading them all"""
+    return sum(1 for _ in iter_qa_entries())
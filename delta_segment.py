@@ -0,0 +1,203 @@
+"""
+Incremental edits on top of a built question matcher index
+Upserted entries go to a small append-only segment and deletions become tombstones, so an edit never touches the main index
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+# Tombstone version of an entry that has not been deleted
+NOT_DELETED = 2 ** 63 - 1
+
+
+def get_entry_key(qa: dict) -> str:
+    """Key an entry is upserted and deleted by: its "id" when set, otherwise its question text"""
+    return qa.get("id") or qa["question"]
+
+
+def iter_store_entry_keys(qa_store) -> Iterator[str]:
+    """get_entry_key for every entry of a CompactQAStore, without decoding the answers"""
+    for qa_id, question in enumerate(qa_store.questions):
+        yield qa_store.entry_ids.get(qa_id) or question
+
+
+def hash_entry_key(entry_key: str) -> int:
+    """Stable 64-bit hash of an entry key, the same in every process so it can be saved in a snapshot"""
+    return int.from_bytes(hashlib.blake2b(entry_key.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class EntryKeyIndex(NamedTuple):
+    """Main-index entry keys as sorted 64-bit hashes, with the QA id behind each hash"""
+    key_hashes: np.ndarray
+    qa_ids: np.ndarray
+    
+    @classmethod
+    def build(cls, entry_keys: Iterable[str], entry_count: int) -> EntryKeyIndex:
+        key_hashes = np.fromiter((hash_entry_key(entry_key) for entry_key in entry_keys), dtype=np.int64, count=entry_count)
+        qa_ids = np.argsort(key_hashes, kind="stable")
+        return cls(key_hashes[qa_ids], qa_ids.astype(np.int64))
+    
+    def candidate_ids(self, entry_key: str) -> np.ndarray:
+        """QA ids whose key hashes like entry_key, ascending; hash collisions are possible"""
+        key_hash = hash_entry_key(entry_key)
+        start = np.searchsorted(self.key_hashes, key_hash, side="left")
+        end = np.searchsorted(self.key_hashes, key_hash, side="right")
+        return self.qa_ids[start:end]
+
+
+class DeltaSegment:
+    """
+    Entries upserted since the last compaction, plus tombstones for deleted entries
+    
+    QA ids continue after the main index: delta entry i has id first_delta_id + i.
+    Everything is append-only or written once, so lookups never take a lock:
+    a MatcherState sees the first delta_size delta entries and the tombstones
+    written at or before its version.
+    """
+    
+    def __init__(self, main_entries: List[dict], main_key_index: EntryKeyIndex):
+        self.main_entries = main_entries
+        self.main_key_index = main_key_index
+        self.first_delta_id = len(main_entries)
+        self.entries = []
+        self.postings = {}
+        self.keyword_totals = []
+        self.keyword_norms = []
+        self.normalized_embeddings = []
+        self.main_deleted_at = np.full(len(main_entries), NOT_DELETED, dtype=np.int64)
+        self.delta_deleted_at = []
+        self.tombstone_count = 0
+        # Writer-side only: key -> QA id of the live delta entry; main entries are found through main_key_index
+        self.entry_ids = {}
+    
+    def get_entry(self, qa_id: int) -> dict:
+        return self.entries[qa_id - self.first_delta_id]
+    
+    def find_live_id(self, entry_key: str) -> Optional[int]:
+        """
+        QA id of the live entry with this key, or None (writer-side, under the edit lock)
+        
+        Only the main-index rows whose key hash matches are decoded, so the
+        lookup never scans the main entries.
+        """
+        if entry_key in self.entry_ids:
+            return self.entry_ids[entry_key]
+        # When the KB repeats a key, the latest live row is the one edits replace
+        for qa_id in self.main_key_index.candidate_ids(entry_key)[::-1]:
+            if self.main_deleted_at[qa_id] == NOT_DELETED and get_entry_key(self.main_entries[qa_id]) == entry_key:
+                return int(qa_id)
+        return None
+    
+    def append_entry(self, qa: dict, keyword_counts: Counter, normalized_embedding: np.ndarray) -> int:
+        """Index one entry in O(its token count); it stays invisible until a state's delta_size covers it"""
+        local_id = len(self.entries)
+        for token, count in keyword_counts.items():
+            self.postings.setdefault(token, []).append((local_id, count))
+        self.keyword_totals.append(sum(keyword_counts.values()))
+        self.keyword_norms.append(float(np.sqrt(sum(count * count for count in keyword_counts.values()))))
+        self.normalized_embeddings.append(normalized_embedding)
+        self.delta_deleted_at.append(NOT_DELETED)
+        self.entries.append(qa)
+        
+        qa_id = self.first_delta_id + local_id
+        self.entry_ids[get_entry_key(qa)] = qa_id
+        return qa_id
+    
+    def mark_deleted(self, qa_id: int, version: int):
+        """Tombstone an entry for states at or after version"""
+        if qa_id < self.first_delta_id:
+            self.main_deleted_at[qa_id] = version
+        else:
+            self.delta_deleted_at[qa_id - self.first_delta_id] = version
+        self.tombstone_count += 1
+    
+    def live_main_mask(self, qa_ids: np.ndarray, version: int) -> np.ndarray:
+        """Which main-index QA ids are not deleted as of version"""
+        return self.main_deleted_at[qa_ids] > version
+    
+    def collect_live_entries(self, main_entries: List[dict], delta_size: int, version: int) -> List[dict]:
+        """Every entry a state with this delta_size and version can match, in QA id order"""
+        live_entries = [main_entries[qa_id] for qa_id in np.flatnonzero(self.main_deleted_at > version)]
+        live_entries.extend(
+            self.entries[local_id] for local_id in range(delta_size) if self.delta_deleted_at[local_id] > version
+        )
+        return live_entries
+    
+    def score_keyword_matches(
+        self,
+        query_counts: Counter,
+        delta_size: int,
+        version: int,
+        metric: str = "jaccard"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score the visible delta entries that share a token with the query
+        
+        Returns:
+            Tuple of (QA ids in ascending order, multiset Jaccard or cosine scores)
+        """
+        overlaps = {}
+        for token, query_count in query_counts.items():
+            for local_id, count in self.postings.get(token, ()):
+                # Posting lists are in insertion order, so the rest is newer than this state
+                if local_id >= delta_size:
+                    break
+                overlap = min(count, query_count) if metric == "jaccard" else count * query_count
+                overlaps[local_id] = overlaps.get(local_id, 0) + overlap
+        
+        local_ids = sorted(local_id for local_id in overlaps if self.delta_deleted_at[local_id] > version)
+        if not local_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=float)
+        
+        intersections = np.array([overlaps[local_id] for local_id in local_ids], dtype=float)
+        if metric == "jaccard":
+            totals = np.array([self.keyword_totals[local_id] for local_id in local_ids], dtype=float)
+            scores = intersections / (sum(query_counts.values()) + totals - intersections)
+        else:
+            norms = np.array([self.keyword_norms[local_id] for local_id in local_ids], dtype=float)
+            query_norm = np.sqrt(sum(count * count for count in query_counts.values()))
+            scores = intersections / (query_norm * norms)
+        return self.first_delta_id + np.array(local_ids, dtype=np.int64), scores
+    
+    def score_dense(self, query_unit_vector: np.ndarray, delta_size: int, version: int) -> np.ndarray:
+        """Cosine score of every visible delta entry, zero for deleted ones"""
+        if delta_size == 0:
+            return np.zeros(0, dtype=float)
+        scores = np.array(self.normalized_embeddings[:delta_size]) @ query_unit_vector
+        scores[np.array(self.delta_deleted_at[:delta_size], dtype=np.int64) <= version] = 0
+        return scores
+
+
+def merge_delta_matches(
+    candidate_ids: np.ndarray,
+    scores: np.ndarray,
+    query_counts: Counter,
+    state,
+    metric: str = "jaccard"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drop deleted main-index candidates and append the delta segment's matches
+    
+    Delta ids all follow the main ids, so ascending order is preserved.
+    """
+    delta = state.delta
+    if delta is None:
+        return candidate_ids, scores
+    
+    live = delta.live_main_mask(candidate_ids, state.version)
+    delta_ids, delta_scores = delta.score_keyword_matches(query_counts, state.delta_size, state.version, metric)
+    return np.concatenate([candidate_ids[live], delta_ids]), np.concatenate([scores[live], delta_scores])
+
+
+def needs_compaction(state, max_delta_entries: int, max_tombstone_fraction: float) -> bool:
+    """Whether the delta segment or the tombstones have grown enough to rebuild the main index"""
+    delta = state.delta
+    if delta is None:
+        return False
+    total_entries = delta.first_delta_id + state.delta_size
+    return state.delta_size >= max_delta_entries or delta.tombstone_count > max_tombstone_fraction * total_entries
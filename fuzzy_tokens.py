@@ -0,0 +1,148 @@
+"""
+Typo-tolerant lookup of query tokens in the KB vocabulary
+A character-trigram index narrows the vocabulary to a handful of candidates before any edit distance is computed
+"""
+
+import functools
+from collections import defaultdict
+from typing import Iterator, Optional
+import numpy as np
+from config import FUZZY_MATCH_MIN_TOKEN_LENGTH, FUZZY_MATCH_TWO_EDIT_TOKEN_LENGTH, FUZZY_MATCH_CACHE_SIZE
+
+try:
+    # C implementation behind thefuzz; bounded_edit_distance below is the same metric in Python
+    from rapidfuzz import process as rapidfuzz_process
+    from rapidfuzz.distance import OSA
+except ImportError:
+    rapidfuzz_process = None
+
+TRIGRAM_PADDING = "$$"
+# One edit changes at most 3 trigrams; an adjacent transposition can change 4
+TRIGRAMS_CHANGED_PER_EDIT = 4
+
+
+def iter_trigrams(token: str) -> Iterator[str]:
+    """Character trigrams of the padded token, so short tokens and word edges get trigrams too"""
+    padded = f"{TRIGRAM_PADDING}{token}{TRIGRAM_PADDING}"
+    for position in range(len(padded) - 2):
+        yield padded[position:position + 3]
+
+
+def bounded_edit_distance(source: str, target: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance: insertions, deletions, substitutions and adjacent transpositions
+    
+    Returns:
+        The distance, or max_distance + 1 as soon as it is known to exceed max_distance
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    
+    before_previous_row = None
+    previous_row = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current_row = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            distance = min(
+                previous_row[j] + 1,
+                current_row[j - 1] + 1,
+                previous_row[j - 1] + (source[i - 1] != target[j - 1])
+            )
+            if i > 1 and j > 1 and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]:
+                distance = min(distance, before_previous_row[j - 2] + 1)
+            current_row[j] = distance
+        if min(current_row) > max_distance:
+            return max_distance + 1
+        before_previous_row, previous_row = previous_row, current_row
+    
+    return min(previous_row[-1], max_distance + 1)
+
+
+def get_max_edit_distance(token: str) -> int:
+    """Edits tolerated for a query token: none when short, one, or two when long"""
+    if len(token) < FUZZY_MATCH_MIN_TOKEN_LENGTH or not token.isalpha():
+        return 0
+    return 2 if len(token) >= FUZZY_MATCH_TWO_EDIT_TOKEN_LENGTH else 1
+
+
+class TrigramTokenIndex:
+    """
+    Trigram -> vocabulary token posting lists (CSR layout) over an InvertedIndex vocabulary
+    
+    A token within k edits of the query shares at least |query trigrams| - 4k of
+    the query's distinct trigrams, so counting shared trigrams with one bincount
+    rules out almost the whole vocabulary before edit distances are computed.
+    """
+    
+    def __init__(self, keyword_index):
+        self.keyword_index = keyword_index
+        self.tokens = np.array(sorted(keyword_index.vocabulary, key=keyword_index.vocabulary.get), dtype=object)
+        self.token_lengths = np.array([len(token) for token in self.tokens], dtype=np.int64)
+        # Document frequency breaks ties between equally close tokens
+        self.token_frequencies = np.diff(np.asarray(keyword_index.posting_offsets))
+        
+        postings = defaultdict(list)
+        for token_id, token in enumerate(self.tokens):
+            for trigram in set(iter_trigrams(token)):
+                postings[trigram].append(token_id)
+        
+        self.trigram_ids = {trigram: trigram_id for trigram_id, trigram in enumerate(postings)}
+        self.posting_offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.posting_offsets[1:] = np.cumsum([len(token_ids) for token_ids in postings.values()])
+        self.posting_token_ids = np.fromiter(
+            (token_id for token_ids in postings.values() for token_id in token_ids),
+            dtype=np.int64, count=int(self.posting_offsets[-1])
+        )
+        self.correct = functools.lru_cache(maxsize=FUZZY_MATCH_CACHE_SIZE)(self.find_correction)
+    
+    def find_candidates(self, token: str, max_distance: int) -> np.ndarray:
+        """Vocabulary token ids that pass the trigram count and length filters"""
+        query_trigrams = set(iter_trigrams(token))
+        min_shared = len(query_trigrams) - TRIGRAMS_CHANGED_PER_EDIT * max_distance
+        trigram_ids = [self.trigram_ids[trigram] for trigram in query_trigrams if trigram in self.trigram_ids]
+        # min_shared <= 0 would make every token a candidate; get_max_edit_distance keeps tokens long enough
+        if min_shared <= 0 or len(trigram_ids) < min_shared:
+            return np.zeros(0, dtype=np.int64)
+        
+        posting_lists = [
+            self.posting_token_ids[self.posting_offsets[trigram_id]:self.posting_offsets[trigram_id + 1]]
+            for trigram_id in trigram_ids
+        ]
+        shared_counts = np.bincount(np.concatenate(posting_lists), minlength=len(self.tokens))
+        candidate_ids = np.flatnonzero(shared_counts >= min_shared)
+        return candidate_ids[np.abs(self.token_lengths[candidate_ids] - len(token)) <= max_distance]
+    
+    def compute_distances(self, token: str, candidate_ids: np.ndarray, max_distance: int) -> np.ndarray:
+        """Edit distance to each candidate, capped at max_distance + 1"""
+        candidate_tokens = self.tokens[candidate_ids]
+        if rapidfuzz_process is not None:
+            return rapidfuzz_process.cdist(
+                [token], candidate_tokens, scorer=OSA.distance, score_cutoff=max_distance, dtype=np.int64
+            )[0]
+        return np.array([bounded_edit_distance(token, candidate, max_distance) for candidate in candidate_tokens], dtype=np.int64)
+    
+    def find_correction(self, token: str) -> Optional[str]:
+        """
+        Closest vocabulary token within the edits tolerated for this token
+        
+        Returns:
+            The vocabulary token (the token itself when it is known), or None
+            when nothing is close enough
+        """
+        if token in self.keyword_index.vocabulary:
+            return token
+        
+        max_distance = get_max_edit_distance(token)
+        if max_distance == 0:
+            return None
+        
+        candidate_ids = self.find_candidates(token, max_distance)
+        distances = self.compute_distances(token, candidate_ids, max_distance)
+        close_enough = distances <= max_distance
+        if not close_enough.any():
+            return None
+        
+        # Fewest edits first, then the most frequent token, then the lowest token id
+        candidate_ids, distances = candidate_ids[close_enough], distances[close_enough]
+        best = np.lexsort((candidate_ids, -self.token_frequencies[candidate_ids], distances))[0]
+        return self.tokens[candidate_ids[best]]
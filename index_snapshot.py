@@ -0,0 +1,115 @@
+"""
+Versioned on-disk snapshots of the question matcher index
+Arrays are stored as .npy files so workers can memory-map them instead of rebuilding
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterable, Optional
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+SNAPSHOT_FORMAT_VERSION = 3
+SNAPSHOT_PREFIX = "matcher-"
+MANIFEST_FILENAME = "manifest.json"
+
+
+def compute_dataset_hash(qa_entries: Iterable[dict]) -> str:
+    """Content hash of the Q&A dataset, entry ids included since the snapshot indexes them, used as the snapshot key"""
+    hasher = hashlib.sha256()
+    for qa in qa_entries:
+        hasher.update(json.dumps([qa["question"], qa["answer"], qa.get("id")], ensure_ascii=False).encode("utf-8"))
+        hasher.update(b"\n")
+    return hasher.hexdigest()
+
+
+def get_snapshot_path(snapshot_dir: str, dataset_hash: str) -> str:
+    """Directory holding the snapshot for one dataset hash and format version"""
+    return os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}{dataset_hash[:16]}-v{SNAPSHOT_FORMAT_VERSION}")
+
+
+def discard_unreadable_snapshot(snapshot_dir: str, target_path: str):
+    """Move a damaged snapshot (e.g. a missing .npy) out of the way so a fresh one can take its path"""
+    discard_path = tempfile.mkdtemp(prefix=".discard-", dir=snapshot_dir)
+    try:
+        os.rename(target_path, os.path.join(discard_path, os.path.basename(target_path)))
+    except OSError:
+        # Already replaced or removed by another process
+        pass
+    shutil.rmtree(discard_path, ignore_errors=True)
+
+
+def save_snapshot(snapshot_dir: str, dataset_hash: str, arrays: Dict[str, np.ndarray]) -> str:
+    """
+    Write arrays to a new snapshot and atomically move it into place
+    
+    An unreadable snapshot already at the target path is replaced; older
+    snapshots in the same directory are removed once the new one is live.
+    
+    Returns:
+        Path of the snapshot directory
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    target_path = get_snapshot_path(snapshot_dir, dataset_hash)
+    staging_path = tempfile.mkdtemp(prefix=".staging-", dir=snapshot_dir)
+    
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging_path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "dataset_hash": dataset_hash,
+            "arrays": sorted(arrays),
+            "created_at": time.time()
+        }
+        with open(os.path.join(staging_path, MANIFEST_FILENAME), "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        
+        if os.path.isdir(target_path) and load_snapshot(snapshot_dir, dataset_hash) is None:
+            discard_unreadable_snapshot(snapshot_dir, target_path)
+        try:
+            os.rename(staging_path, target_path)
+        except OSError:
+            # Another process published the same snapshot first
+            shutil.rmtree(staging_path, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+    
+    for entry in os.listdir(snapshot_dir):
+        entry_path = os.path.join(snapshot_dir, entry)
+        if entry.startswith(SNAPSHOT_PREFIX) and entry_path != target_path:
+            shutil.rmtree(entry_path, ignore_errors=True)
+    
+    return target_path
+
+
+def load_snapshot(snapshot_dir: str, dataset_hash: str, mmap_mode: Optional[str] = "r") -> Optional[Dict[str, np.ndarray]]:
+    """
+    Memory-map the snapshot for a dataset hash
+    
+    Returns:
+        Dict of arrays, or None if the snapshot is missing, stale or unreadable
+    """
+    snapshot_path = get_snapshot_path(snapshot_dir, dataset_hash)
+    
+    try:
+        with open(os.path.join(snapshot_path, MANIFEST_FILENAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+        
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION or manifest.get("dataset_hash") != dataset_hash:
+            return None
+        
+        return {
+            name: np.load(os.path.join(snapshot_path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in manifest["arrays"]
+        }
+    except (OSError, ValueError, KeyError):
+        return None
@@ -0,0 +1,199 @@
+"""
+Streaming loader for knowledge base exports
+Reads Q&A records from JSONL or CSV files (optionally gzipped) one record at a time, so a large export is never held in memory whole
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from typing import Iterator, List, Optional, Tuple
+from config import KB_LOADER_MAX_FIELD_CHARS, KB_LOADER_MAX_REPORTED_PROBLEMS
+from kb_store import CompactQAStore
+
+GZIP_MAGIC = b"\x1f\x8b"
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+CSV_SUFFIXES = (".csv",)
+REQUIRED_FIELDS = ("question", "answer")
+
+logger = logging.getLogger(__name__)
+_reported_kb_versions = set()
+
+
+class KBLoadError(ValueError):
+    """A KB file or record that cannot be loaded; the message names the file and line"""
+
+
+class LoadReport:
+    """Counts from one load, keeping only the first few problems so memory stays bounded"""
+    
+    def __init__(self, max_problems: int = KB_LOADER_MAX_REPORTED_PROBLEMS):
+        self.loaded = 0
+        self.skipped = 0
+        self.problems: List[str] = []
+        self.max_problems = max_problems
+    
+    def record_problem(self, problem: str):
+        self.skipped += 1
+        if len(self.problems) < self.max_problems:
+            self.problems.append(problem)
+
+
+def get_kb_path() -> Optional[str]:
+    """KB export to serve instead of data.THOUGHTFUL_AI_QA, None unless KB_PATH is set"""
+    kb_path = os.getenv("KB_PATH")
+    return kb_path if kb_path and kb_path.strip() else None
+
+
+def detect_format(path: str) -> str:
+    """Detect "jsonl" or "csv" from the file name, looking past a .gz suffix"""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-len(".gz")]
+    if name.endswith(JSONL_SUFFIXES):
+        return "jsonl"
+    if name.endswith(CSV_SUFFIXES):
+        return "csv"
+    raise KBLoadError(f"{path}: unsupported KB file type, expected .jsonl, .ndjson or .csv (optionally .gz)")
+
+
+def open_kb_text(path: str) -> io.TextIOWrapper:
+    """Open a KB file as UTF-8 text, decompressing it when it starts with the gzip magic bytes"""
+    with open(path, "rb") as probe:
+        compressed = probe.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    binary_file = gzip.open(path, "rb") if compressed else open(path, "rb")
+    # newline="" lets the csv module handle line breaks inside quoted fields
+    return io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+
+
+def iter_raw_records(text_file: io.TextIOWrapper, file_format: str, path: str) -> Iterator[Tuple[int, object]]:
+    """(line number, unparsed record) pairs: a JSON line for JSONL, a column dict for CSV"""
+    if file_format == "jsonl":
+        for line_number, line in enumerate(text_file, 1):
+            if line.strip():
+                yield line_number, line
+        return
+    
+    reader = csv.DictReader(text_file)
+    if reader.fieldnames is None or not set(REQUIRED_FIELDS) <= set(reader.fieldnames):
+        raise KBLoadError(f"{path}: the CSV header needs {' and '.join(REQUIRED_FIELDS)} columns")
+    for row in reader:
+        yield reader.line_num, row
+
+
+def parse_record(raw_record: object, file_format: str) -> dict:
+    """
+    Validate one raw record into a Q&A entry
+    
+    Returns:
+        {"question", "answer"} with surrounding whitespace stripped, plus "id"
+        when the record has one
+    """
+    if file_format == "jsonl":
+        try:
+            record = json.loads(raw_record)
+        except json.JSONDecodeError as error:
+            raise KBLoadError(f"invalid JSON ({error.msg})") from None
+        if not isinstance(record, dict):
+            raise KBLoadError("expected a JSON object")
+    else:
+        record = raw_record
+    
+    qa = {}
+    for field in REQUIRED_FIELDS:
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise KBLoadError(f"missing or empty {field}")
+        if len(value) > KB_LOADER_MAX_FIELD_CHARS:
+            raise KBLoadError(f"{field} longer than {KB_LOADER_MAX_FIELD_CHARS} characters")
+        qa[field] = value.strip()
+    
+    entry_id = record.get("id")
+    if entry_id is not None and str(entry_id).strip():
+        qa["id"] = str(entry_id).strip()
+    return qa
+
+
+def iter_kb_file(path: str, skip_invalid: bool = False, report: Optional[LoadReport] = None) -> Iterator[dict]:
+    """
+    Stream validated Q&A entries from a JSONL or CSV file, gzipped or not
+    
+    Args:
+        path: The KB export to read
+        skip_invalid: Skip and report bad records instead of raising KBLoadError
+        report: LoadReport to fill in with counts and problems
+    
+    Yields:
+        One Q&A entry dict at a time
+    """
+    file_format = detect_format(path)
+    if report is None:
+        report = LoadReport()
+    
+    with open_kb_text(path) as text_file:
+        try:
+            for line_number, raw_record in iter_raw_records(text_file, file_format, path):
+                try:
+                    qa = parse_record(raw_record, file_format)
+                except KBLoadError as error:
+                    if not skip_invalid:
+                        raise KBLoadError(f"{path}:{line_number}: {error}") from None
+                    report.record_problem(f"{path}:{line_number}: {error}")
+                    continue
+                report.loaded += 1
+                yield qa
+        except (csv.Error, UnicodeDecodeError, EOFError, gzip.BadGzipFile) as error:
+            raise KBLoadError(f"{path}: {error}") from error
+
+
+def log_load_report(path: str, report: LoadReport):
+    """Warn about the records skipped while serving a KB file, once per version of the file"""
+    if not report.skipped:
+        return
+    
+    try:
+        file_stat = os.stat(path)
+        kb_version = (path, file_stat.st_mtime_ns, file_stat.st_size)
+    except OSError:
+        kb_version = (path, None, None)
+    if kb_version in _reported_kb_versions:
+        return
+    _reported_kb_versions.add(kb_version)
+    
+    logger.warning("%s: skipped %d invalid records, loaded %d", path, report.skipped, report.loaded)
+    for problem in report.problems:
+        logger.warning("  %s", problem)
+
+
+def load_kb_file(path: str, skip_invalid: bool = False) -> Tuple[CompactQAStore, LoadReport]:
+    """
+    Stream a KB export straight into a CompactQAStore
+    
+    Entries are packed as they are read, so peak memory is the store itself
+    rather than a list of dicts.
+    
+    Returns:
+        Tuple of (the store, the load report)
+    """
+    report = LoadReport()
+    store = CompactQAStore.from_entries(iter_kb_file(path, skip_invalid, report))
+    return store, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a knowledge base export without serving it")
+    parser.add_argument("path", help="JSONL or CSV file, optionally gzipped")
+    parser.add_argument("--skip-invalid", action="store_true", help="Report bad records instead of stopping at the first")
+    args = parser.parse_args()
+    
+    try:
+        store, report = load_kb_file(args.path, args.skip_invalid)
+    except KBLoadError as error:
+        raise SystemExit(f"❌ {error}")
+    
+    for problem in report.problems:
+        print(f"⚠️ {problem}")
+    print(f"✅ {report.loaded} entries loaded, {report.skipped} skipped, {store.nbytes} bytes packed")
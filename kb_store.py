@@ -0,0 +1,110 @@
+"""
+Compact storage for the Q&A knowledge base
+Questions and answers are packed into contiguous UTF-8 buffers with offsets instead of one dict and two str objects per entry
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+
+
+class StringColumn:
+    """Strings stored back to back in one UTF-8 buffer; string i is buffer[offsets[i]:offsets[i + 1]]"""
+    
+    def __init__(self, buffer: bytes, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index: int) -> str:
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+    
+    def __iter__(self) -> Iterator[str]:
+        buffer, offsets = self.buffer, self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield buffer[start:end].decode("utf-8")
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer) + self.offsets.nbytes
+
+
+class StringColumnBuilder:
+    """Appends strings to one growing buffer, then freezes it into a StringColumn"""
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array("q", [0])
+    
+    def append(self, text: str):
+        self.buffer += text.encode("utf-8")
+        self.offsets.append(len(self.buffer))
+    
+    def build(self) -> StringColumn:
+        return StringColumn(bytes(self.buffer), np.asarray(self.offsets, dtype=np.int64))
+
+
+class CompactQAStore(Sequence):
+    """
+    Read-only sequence of Q&A entries backed by two StringColumns
+    
+    Indexing returns a fresh {"question", "answer"} dict (plus "id" when the
+    entry has one), so the store drops in wherever a list of Q&A dicts is
+    read. Only entries that carry an "id" pay for a dict slot.
+    """
+    
+    def __init__(self, questions: StringColumn, answers: StringColumn, entry_ids: Dict[int, str]):
+        self.questions = questions
+        self.answers = answers
+        self.entry_ids = entry_ids
+    
+    @classmethod
+    def from_entries(cls, qa_entries: Iterable[dict]) -> CompactQAStore:
+        """Pack Q&A dicts into a store in one pass; qa_entries can be a generator"""
+        if isinstance(qa_entries, cls):
+            return qa_entries
+        
+        questions, answers = StringColumnBuilder(), StringColumnBuilder()
+        entry_ids = {}
+        for index, qa in enumerate(qa_entries):
+            questions.append(qa["question"])
+            answers.append(qa["answer"])
+            if qa.get("id"):
+                entry_ids[index] = qa["id"]
+        return cls(questions.build(), answers.build(), entry_ids)
+    
+    def __len__(self) -> int:
+        return len(self.questions)
+    
+    def __getitem__(self, index: int) -> dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Q&A store index out of range")
+        
+        qa = {"question": self.questions[index], "answer": self.answers[index]}
+        if index in self.entry_ids:
+            qa["id"] = self.entry_ids[index]
+        return qa
+    
+    def __iter__(self) -> Iterator[dict]:
+        for index, (question, answer) in enumerate(zip(self.questions, self.answers)):
+            qa = {"question": question, "answer": answer}
+            if index in self.entry_ids:
+                qa["id"] = self.entry_ids[index]
+            yield qa
+    
+    def __repr__(self) -> str:
+        return f"<CompactQAStore {len(self)} entries, {self.nbytes} bytes>"
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the text buffers and offsets (entry ids excluded)"""
+        return self.questions.nbytes + self.answers.nbytes
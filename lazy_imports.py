@@ -0,0 +1,44 @@
+"""
+Deferred imports for heavy dependencies
+Keeps NumPy off the cold-start path until a code path actually needs it
+"""
+
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+    
+    Once loaded, the module's attributes are copied onto the stand-in, so hot
+    lookups like np.zeros are plain attribute hits rather than __getattr__ calls.
+    The stand-in's own helpers are underscore-prefixed so they never shadow a
+    module attribute (numpy.load, for one).
+    """
+    
+    def __init__(self, module_name: str):
+        self.__dict__["_module_name"] = module_name
+        self.__dict__["_module"] = None
+        self.__dict__["_load_lock"] = threading.Lock()
+    
+    def _load_module(self):
+        """Import the real module now and return it; safe to call from several threads"""
+        module = self._module
+        if module is None:
+            with self._load_lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._module_name)
+                    self.__dict__.update(module.__dict__)
+                    self.__dict__["_module"] = module
+        return module
+    
+    def _is_loaded(self) -> bool:
+        return self._module is not None
+    
+    def __getattr__(self, attribute: str):
+        return getattr(self._load_module(), attribute)
+    
+    def __repr__(self) -> str:
+        return f"<lazy module {self._module_name!r}{' (loaded)' if self._is_loaded() else ''}>"
@@ -2,16 +2,70 @@
 OpenAI LLM integration for fallback responses
 """
 
+import asyncio
+import importlib
 import os
-from typing import Optional
-from dotenv import load_dotenv
-from config import LLM_MODEL, MAX_TOKENS
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+from config import (
+    LLM_MODEL,
+    MAX_TOKENS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_BREAKER_KB_FALLBACK_THRESHOLD
+)
+from circuit_breaker import OPEN, CircuitBreaker
+from metrics import get_counter, get_histogram, increment_counter, observe_seconds, register_gauge, timed
+from question_matcher import IMPORTANT_KEYWORDS, extract_keyword_counts, find_best_match
+from request_coalescing import get_async_request_coalescer
+from rate_limiter import (
+    CHARS_PER_TOKEN,
+    RateLimitExceeded,
+    estimate_prompt_tokens,
+    estimate_request_tokens,
+    get_upstream_rate_limiter,
+    get_worker_share
+)
+from request_deadlines import LatencyTracker, call_with_budget_async
+from response_cache import build_cache_key, get_cached_response, iter_response_chunks, store_cached_response
 
-load_dotenv()
+T = TypeVar("T")
+
+llm_event_loop = None
+_environment_loaded = False
+_event_loop_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_async_request_semaphores = weakref.WeakKeyDictionary()
+completion_latency_tracker = LatencyTracker()
+stream_open_latency_tracker = LatencyTracker()
+llm_circuit_breaker = CircuitBreaker()
+
+get_histogram("llm_time_to_first_token_seconds", "Time from starting a streamed LLM call to its first token")
+get_histogram("llm_stream_seconds", "Duration of a streamed LLM answer")
+get_counter("llm_prompt_tokens_total", "LLM prompt tokens (estimated for streamed answers)")
+get_counter("llm_completion_tokens_total", "LLM completion tokens (estimated for streamed answers)")
+register_gauge("llm_circuit_breaker_open", "1 while the LLM circuit breaker rejects calls", lambda: float(get_circuit_breaker_stats()["state"] == OPEN))
+register_gauge("llm_rate_limit_queue_depth", "Requests waiting for LLM rate limit capacity", lambda: get_upstream_rate_limiter().get_stats()["queue_depth"])
+
+
+def load_environment():
+    """Read .env into os.environ once; entry points call this instead of paying for dotenv at import"""
+    global _environment_loaded
+    
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
 
 
 def get_openai_api_key() -> Optional[str]:
     """Retrieve OpenAI API key from environment variables"""
+    load_environment()
     return os.getenv("OPENAI_API_KEY")
 
 
@@ -21,17 +75,106 @@ def is_openai_api_key_available() -> bool:
     return api_key is not None and api_key.strip() != "" and api_key != "your-key-here"
 
 
+def build_pooled_http_client():
+    """Async HTTP client with a bounded keep-alive connection pool, shared by every OpenAI request on its event loop"""
+    from openai import DefaultAsyncHttpxClient
+    
+    # openai bundles either httpx or its httpx2 fork; take Limits from whichever backs its client
+    http_client_base = next(cls for cls in DefaultAsyncHttpxClient.__mro__ if cls.__name__ == "AsyncClient")
+    httpx_module = importlib.import_module(http_client_base.__module__.split(".")[0])
+    
+    return DefaultAsyncHttpxClient(limits=httpx_module.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS
+    ))
+
+
+def reset_llm_event_loop():
+    """Forget the parent's loop in a forked child; its thread did not survive the fork"""
+    global llm_event_loop
+    llm_event_loop = None
+
+
+def get_llm_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop on a daemon thread that runs the async LLM code for synchronous callers"""
+    global llm_event_loop
+    
+    if llm_event_loop is None:
+        with _event_loop_lock:
+            if llm_event_loop is None:
+                event_loop = asyncio.new_event_loop()
+                threading.Thread(target=event_loop.run_forever, name="llm-event-loop", daemon=True).start()
+                llm_event_loop = event_loop
+    
+    return llm_event_loop
+
+
+def run_on_llm_event_loop(coroutine: Awaitable[T]) -> T:
+    """Run a coroutine on the shared LLM event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_llm_event_loop()).result()
+
+
+def iter_on_llm_event_loop(async_iterator: AsyncIterator[T]) -> Iterator[T]:
+    """Drive an async generator on the shared LLM event loop from a synchronous caller"""
+    try:
+        while True:
+            try:
+                item = run_on_llm_event_loop(async_iterator.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        # Not waited on: a generator closed at interpreter exit must not block on the loop thread
+        asyncio.run_coroutine_threadsafe(async_iterator.aclose(), get_llm_event_loop())
+
+
+os.register_at_fork(after_in_child=reset_llm_event_loop)
+
+
+@timed("create_openai_client_seconds", "Time to obtain the pooled OpenAI client")
 def create_openai_client():
-    """Create and return OpenAI client if possible"""
+    """The pooled AsyncOpenAI client of the shared LLM event loop, which serves the synchronous entry points"""
+    async def get_event_loop_client():
+        return create_async_openai_client()
+    
+    return run_on_llm_event_loop(get_event_loop_client())
+
+
+def create_async_openai_client():
+    """Return the AsyncOpenAI client for the running event loop, recreating it only when the API key or base URL changes"""
     if not is_openai_api_key_available():
         return None
     
+    event_loop = asyncio.get_running_loop()
+    client_key = (get_openai_api_key(), os.getenv("OPENAI_BASE_URL"))
+    current_pool = _async_clients.get(event_loop)
+    if current_pool is not None and current_pool[0] == client_key:
+        return current_pool[1]
+    
     try:
-        from openai import OpenAI
-        api_key = get_openai_api_key()
-        return OpenAI(api_key=api_key)
+        from openai import AsyncOpenAI
+        async_client = AsyncOpenAI(
+            api_key=client_key[0], http_client=build_pooled_http_client(), max_retries=0
+        )
     except Exception:
         return None
+    
+    _async_clients[event_loop] = (client_key, async_client)
+    if current_pool is not None:
+        # Otherwise the replaced client's keep-alive connections stay open until garbage collection
+        asyncio.ensure_future(current_pool[1].close())
+    return async_client
+
+
+def get_async_request_semaphore() -> asyncio.Semaphore:
+    """Per-event-loop cap on outstanding upstream calls (this worker's share of LLM_MAX_CONCURRENT_REQUESTS)"""
+    event_loop = asyncio.get_running_loop()
+    request_semaphore = _async_request_semaphores.get(event_loop)
+    if request_semaphore is None:
+        request_semaphore = asyncio.Semaphore(max(int(get_worker_share(LLM_MAX_CONCURRENT_REQUESTS)), 1))
+        _async_request_semaphores[event_loop] = request_semaphore
+    return request_semaphore
 
 
 def build_system_prompt() -> str:
@@ -46,51 +189,195 @@ Thoughtful AI provides AI-powered automation agents for healthcare processes inc
 You should be helpful and professional. If asked about topics outside of healthcare automation or Thoughtful AI, politely redirect the conversation back to how Thoughtful AI can help with healthcare automation needs."""
 
 
-def call_openai_completion_api(openai_client, user_question: str) -> Optional[str]:
-    """Make API call to OpenAI with comprehensive error handling"""
-    try:
-        conversation_messages = [
+def build_completion_request(user_question: str, stream: bool = False, timeout: float = LLM_TIMEOUT_SECONDS) -> dict:
+    """Keyword arguments for chat.completions.create"""
+    completion_request = {
+        "model": LLM_MODEL,
+        "messages": [
             {"role": "system", "content": build_system_prompt()},
             {"role": "user", "content": user_question}
-        ]
-        
-        completion_response = openai_client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=conversation_messages,
-            max_tokens=MAX_TOKENS,
-            temperature=0.7,
-            timeout=30
-        )
-        
-        return completion_response.choices[0].message.content.strip()
+        ],
+        "max_tokens": MAX_TOKENS,
+        "temperature": 0.7,
+        "timeout": timeout
+    }
+    if stream:
+        completion_request["stream"] = True
+    return completion_request
+
+
+def close_stream(streaming_response):
+    """Release the connection of a stream that lost a hedge race or stopped being read"""
+    close = getattr(streaming_response, "close", None)
+    if close is not None:
+        closing = close()
+        if asyncio.iscoroutine(closing):
+            asyncio.ensure_future(closing)
+
+
+async def create_admitted_completion_async(openai_client, completion_request: dict):
+    """
+    chat.completions.create once the shared rate limiter admits the request
     
-    except Exception:
-        return None
+    The time spent queued for admission comes out of the attempt timeout, so
+    the upstream call only gets what is left of it.
+    """
+    rate_limiter = get_upstream_rate_limiter()
+    estimated_tokens = estimate_request_tokens(completion_request)
+    admission_started = time.monotonic()
+    await rate_limiter.acquire_async(estimated_tokens, timeout=completion_request["timeout"])
+    
+    remaining_timeout = completion_request["timeout"] - (time.monotonic() - admission_started)
+    if remaining_timeout <= 0:
+        rate_limiter.settle(estimated_tokens, 0)
+        raise RateLimitExceeded("Attempt timeout spent waiting for LLM rate limit capacity")
+    
+    completion_response = await openai_client.chat.completions.create(**dict(completion_request, timeout=remaining_timeout))
+    record_token_usage(completion_response, rate_limiter, estimated_tokens)
+    return completion_response
 
 
-def call_openai_streaming_api(openai_client, user_question: str):
-    """Make streaming API call to OpenAI"""
-    try:
-        conversation_messages = [
-            {"role": "system", "content": build_system_prompt()},
-            {"role": "user", "content": user_question}
-        ]
-        
-        streaming_response = openai_client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=conversation_messages,
-            max_tokens=MAX_TOKENS,
-            temperature=0.7,
-            timeout=30,
-            stream=True
+def record_token_usage(completion_response, rate_limiter, estimated_tokens: int):
+    """Count reported token usage and hand unused reserved tokens back to the rate limiter"""
+    usage = getattr(completion_response, "usage", None)
+    if usage is not None:
+        increment_counter("llm_prompt_tokens_total", usage.prompt_tokens)
+        increment_counter("llm_completion_tokens_total", usage.completion_tokens)
+        rate_limiter.settle(estimated_tokens, usage.total_tokens)
+
+
+class UpstreamCallTracker:
+    """
+    Circuit breaker and metrics bookkeeping for one upstream call
+    
+    Used as a "with" block around the call. Any Exception is recorded and
+    suppressed, leaving failed set for the caller to answer with its
+    fallback; RateLimitExceeded is shed locally and not counted against the
+    upstream.
+    """
+    
+    def __init__(self, user_question: str):
+        self.user_question = user_question
+        self.started = time.monotonic()
+        self.first_token_latency = None
+        self.response_chunks = []
+        self.failed = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None or not issubclass(exc_type, Exception):
+            return False
+        if not issubclass(exc_type, RateLimitExceeded):
+            llm_circuit_breaker.record_failure()
+        self.failed = True
+        return True
+    
+    def read_completion(self, completion_response) -> str:
+        """Text of a finished completion, recording the call as a success"""
+        llm_generated_response = completion_response.choices[0].message.content.strip()
+        llm_circuit_breaker.record_success(time.monotonic() - self.started)
+        return llm_generated_response
+    
+    def read_chunk(self, response_chunk) -> Optional[str]:
+        """Text of one streamed chunk (None for empty deltas), timing the first token"""
+        content = response_chunk.choices[0].delta.content
+        if content is not None:
+            if self.first_token_latency is None:
+                self.first_token_latency = time.monotonic() - self.started
+            self.response_chunks.append(content)
+        return content
+    
+    def finish_stream(self) -> str:
+        """Record a cleanly finished stream as a success, with stage timings and estimated tokens; returns its full text"""
+        llm_circuit_breaker.record_success(
+            self.first_token_latency if self.first_token_latency is not None else time.monotonic() - self.started
         )
-        
-        for response_chunk in streaming_response:
-            if response_chunk.choices[0].delta.content is not None:
-                yield response_chunk.choices[0].delta.content
+        response_text = "".join(self.response_chunks)
+        record_streamed_response(self.user_question, self.started, self.first_token_latency, response_text)
+        return response_text
+
+
+def record_streamed_response(user_question: str, started: float, first_token_latency: Optional[float], response_text: str):
+    """Stage timings and estimated token counts for a finished stream (streams carry no usage)"""
+    observe_seconds("llm_stream_seconds", time.monotonic() - started)
+    if first_token_latency is not None:
+        observe_seconds("llm_time_to_first_token_seconds", first_token_latency)
+    increment_counter("llm_prompt_tokens_total", estimate_prompt_tokens(build_completion_request(user_question)["messages"]))
+    increment_counter("llm_completion_tokens_total", len(response_text) // CHARS_PER_TOKEN)
+
+
+async def call_openai_completion_api_async(openai_client, user_question: str) -> Optional[str]:
+    """Make API call to OpenAI within the request budget and the request semaphore, retrying transient errors"""
+    with UpstreamCallTracker(user_question) as upstream_call:
+        async with get_async_request_semaphore():
+            completion_response = await call_with_budget_async(
+                lambda timeout: create_admitted_completion_async(
+                    openai_client, build_completion_request(user_question, timeout=timeout)
+                ),
+                completion_latency_tracker
+            )
+        return upstream_call.read_completion(completion_response)
+    return None
+
+
+async def call_openai_streaming_api_async(
+    openai_client,
+    user_question: str,
+    on_complete: Optional[Callable[[str], None]] = None
+) -> AsyncIterator[str]:
+    """Make streaming API call to OpenAI, passing the full text to on_complete if it finishes cleanly; holds a semaphore slot for the whole stream"""
+    if not llm_circuit_breaker.allow_request():
+        yield await asyncio.to_thread(get_circuit_open_response, user_question)
+        return
     
-    except Exception:
-        yield "I'm sorry, I'm currently unable to process your question. Please try again later or contact our support team for assistance with Thoughtful AI's healthcare automation solutions."
+    with UpstreamCallTracker(user_question) as upstream_call:
+        async with get_async_request_semaphore():
+            streaming_response = await call_with_budget_async(
+                lambda timeout: create_admitted_completion_async(
+                    openai_client, build_completion_request(user_question, stream=True, timeout=timeout)
+                ),
+                stream_open_latency_tracker,
+                on_discard=close_stream
+            )
+            
+            try:
+                async for response_chunk in streaming_response:
+                    content = upstream_call.read_chunk(response_chunk)
+                    if content is not None:
+                        yield content
+            finally:
+                # Closes the connection at once when the stream is cancelled mid-answer
+                close_stream(streaming_response)
+    
+    if upstream_call.failed:
+        yield get_error_fallback_message()
+        return
+    
+    response_text = upstream_call.finish_stream()
+    if on_complete is not None:
+        await asyncio.to_thread(on_complete, response_text)
+
+
+async def stream_completion_response_async(
+    openai_client,
+    user_question: str,
+    on_complete: Optional[Callable[[str], None]] = None
+) -> AsyncIterator[str]:
+    """Non-streaming completion as a one-chunk stream, so it can be shared with streaming callers"""
+    if not llm_circuit_breaker.allow_request():
+        yield await asyncio.to_thread(get_circuit_open_response, user_question)
+        return
+    
+    llm_generated_response = await call_openai_completion_api_async(openai_client, user_question)
+    if not llm_generated_response:
+        yield get_error_fallback_message()
+        return
+    
+    if on_complete is not None:
+        await asyncio.to_thread(on_complete, llm_generated_response)
+    yield llm_generated_response
 
 
 def get_error_fallback_message() -> str:
@@ -98,55 +385,134 @@ def get_error_fallback_message() -> str:
     return "I'm sorry, I'm currently unable to process your question. Please try again later or contact our support team for assistance with Thoughtful AI's healthcare automation solutions."
 
 
+def get_circuit_open_response(user_question: str) -> str:
+    """Fast answer while the breaker is open: the closest loosely relevant KB answer, else the fallback message"""
+    # Loose Jaccard scores are noisy for off-topic questions, so require a domain keyword too
+    if not any(keyword in IMPORTANT_KEYWORDS for keyword in extract_keyword_counts(user_question)):
+        return get_error_fallback_message()
+    
+    low_confidence_match = find_best_match(user_question, similarity_threshold=LLM_BREAKER_KB_FALLBACK_THRESHOLD)
+    if low_confidence_match:
+        return low_confidence_match[0]
+    return get_error_fallback_message()
+
+
+def get_circuit_breaker_stats() -> dict:
+    """State of the upstream circuit breaker, for health checks and monitoring"""
+    return llm_circuit_breaker.get_stats()
+
+
+def get_immediate_response(user_question: str) -> Optional[str]:
+    """Answer that needs no upstream call: input/API key problems or a cached answer"""
+    if not user_question or not user_question.strip():
+        return "Please ask me a question about Thoughtful AI's healthcare automation solutions."
+    
+    cached_response = get_cached_response(user_question)
+    if cached_response is not None:
+        return cached_response
+    
+    if not is_openai_api_key_available():
+        return "API key not configured. Please set up your OpenAI API key to use this feature."
+    
+    return None
+
+
+def build_cache_callback(user_question: str) -> Callable[[str], None]:
+    """on_complete hook that caches a finished streamed answer"""
+    def cache_completed_response(response: str):
+        if response.strip():
+            store_cached_response(user_question, response.strip())
+    
+    return cache_completed_response
+
+
 def get_llm_response(user_question: str) -> str:
     """
     Get response from OpenAI LLM for questions that don't match predefined Q&A
     
+    Runs get_llm_response_async on the shared LLM event loop, so synchronous
+    callers share its client, request semaphore and coalescer.
+    
     Args:
         user_question: The user's input question
-        
+    
     Returns:
         LLM-generated response or simple fallback message
     """
-    if not user_question or not user_question.strip():
-        return "Please ask me a question about Thoughtful AI's healthcare automation solutions."
+    return run_on_llm_event_loop(get_llm_response_async(user_question))
+
+
+def get_llm_response_streaming(user_question: str) -> Iterator[str]:
+    """
+    Get streaming response from OpenAI LLM for questions that don't match predefined Q&A
     
-    if not is_openai_api_key_available():
-        return "API key not configured. Please set up your OpenAI API key to use this feature."
+    Drives get_llm_response_streaming_async on the shared LLM event loop.
+    
+    Args:
+        user_question: The user's input question
+    
+    Returns:
+        Generator yielding response chunks
+    """
+    yield from iter_on_llm_event_loop(get_llm_response_streaming_async(user_question))
+
+
+async def get_llm_response_async(user_question: str) -> str:
+    """
+    Async version of get_llm_response for event-loop based servers
+    
+    Args:
+        user_question: The user's input question
+    
+    Returns:
+        LLM-generated response or simple fallback message
+    """
+    # Cache lookups hit SQLite and the semantic index, so keep them off the event loop
+    immediate_response = await asyncio.to_thread(get_immediate_response, user_question)
+    if immediate_response is not None:
+        return immediate_response
     
-    openai_client = create_openai_client()
+    if llm_circuit_breaker.is_open():
+        return await asyncio.to_thread(get_circuit_open_response, user_question)
+    
+    openai_client = create_async_openai_client()
     if not openai_client:
         return get_error_fallback_message()
     
-    llm_generated_response = call_openai_completion_api(openai_client, user_question)
-    
-    if llm_generated_response:
-        return llm_generated_response
-    else:
-        return get_error_fallback_message() 
+    response_chunks = get_async_request_coalescer().stream(
+        build_cache_key(user_question),
+        lambda: stream_completion_response_async(openai_client, user_question, on_complete=build_cache_callback(user_question))
+    )
+    return "".join([response_chunk async for response_chunk in response_chunks]).strip()
 
 
-def get_llm_response_streaming(user_question: str):
+async def get_llm_response_streaming_async(user_question: str) -> AsyncIterator[str]:
     """
-    Get streaming response from OpenAI LLM for questions that don't match predefined Q&A
+    Async generator version of get_llm_response_streaming
     
     Args:
         user_question: The user's input question
-        
+    
     Returns:
-        Generator yielding response chunks
+        Async generator yielding response chunks
     """
-    if not user_question or not user_question.strip():
-        yield "Please ask me a question about Thoughtful AI's healthcare automation solutions."
+    immediate_response = await asyncio.to_thread(get_immediate_response, user_question)
+    if immediate_response is not None:
+        for response_chunk in iter_response_chunks(immediate_response):
+            yield response_chunk
         return
     
-    if not is_openai_api_key_available():
-        yield "API key not configured. Please set up your OpenAI API key to use this feature."
+    if llm_circuit_breaker.is_open():
+        yield await asyncio.to_thread(get_circuit_open_response, user_question)
         return
     
-    openai_client = create_openai_client()
+    openai_client = create_async_openai_client()
     if not openai_client:
         yield get_error_fallback_message()
         return
     
-    yield from call_openai_streaming_api(openai_client, user_question) 
\ No newline at end of file
+    async for response_chunk in get_async_request_coalescer().stream(
+        build_cache_key(user_question),
+        lambda: call_openai_streaming_api_async(openai_client, user_question, on_complete=build_cache_callback(user_question))
+    ):
+        yield response_chunk
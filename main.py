@@ -3,10 +3,26 @@ Thoughtful AI Customer Support Agent
 Entry point for the Streamlit application
 """
 
+import time
 import streamlit as st
 from question_matcher import find_best_match
-from llm_service import get_llm_response, get_llm_response_streaming
-from config import APP_TITLE, WELCOME_MESSAGE
+from llm_service import get_llm_response, get_llm_response_streaming, load_environment
+from chat_history import archive_oldest_messages, count_messages, get_recent_messages
+from metrics import get_counter, observe_seconds, start_metrics_export, timed
+from warmup import start_background_warmup
+from config import (
+    APP_TITLE,
+    WELCOME_MESSAGE,
+    STREAM_RENDER_INTERVAL_SECONDS,
+    STREAM_RENDER_MAX_PENDING_CHARS,
+    CHAT_HISTORY_VISIBLE_MESSAGES,
+    CHAT_HISTORY_LOAD_MORE_STEP,
+    CHAT_HISTORY_MAX_LIVE_MESSAGES,
+    CHAT_HISTORY_ARCHIVE_BLOCK_SIZE
+)
+
+rag_hits = get_counter("rag_hits_total", "Questions answered from the knowledge base")
+rag_misses = get_counter("rag_misses_total", "Questions that fell back to the LLM")
 
 
 def configure_streamlit_page():
@@ -23,6 +39,10 @@ def initialize_session_state():
     """Initialize chat history in session state if not exists"""
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "archived_messages" not in st.session_state:
+        st.session_state.archived_messages = []
+    if "visible_message_count" not in st.session_state:
+        st.session_state.visible_message_count = CHAT_HISTORY_VISIBLE_MESSAGES
 
 
 def should_display_welcome_message():
@@ -38,12 +58,23 @@ def add_welcome_message_to_chat():
     })
 
 
+def archive_old_messages():
+    """Keep session memory bounded by compressing messages beyond the live cap"""
+    archive_oldest_messages(
+        st.session_state.messages,
+        st.session_state.archived_messages,
+        CHAT_HISTORY_MAX_LIVE_MESSAGES,
+        CHAT_HISTORY_ARCHIVE_BLOCK_SIZE
+    )
+
+
 def add_user_message_to_chat(user_input):
     """Add user message to chat history"""
     st.session_state.messages.append({
         "role": "user",
         "content": user_input
     })
+    archive_old_messages()
 
 
 def add_assistant_message_to_chat(response):
@@ -52,6 +83,7 @@ def add_assistant_message_to_chat(response):
         "role": "assistant",
         "content": response
     })
+    archive_old_messages()
 
 
 def find_rag_response(user_input):
@@ -70,24 +102,56 @@ def display_chat_message(message):
 
 
 def display_all_chat_messages():
-    """Display all messages in chat history"""
-    for message in st.session_state.messages:
+    """Display the most recent messages, with older ones behind a "load earlier" button"""
+    total_messages = count_messages(st.session_state.messages, st.session_state.archived_messages)
+    hidden_messages = total_messages - st.session_state.visible_message_count
+    
+    if hidden_messages > 0 and st.button(f"Load earlier messages ({hidden_messages} more)", key="load_earlier_messages"):
+        st.session_state.visible_message_count += CHAT_HISTORY_LOAD_MORE_STEP
+    
+    visible_messages = min(st.session_state.visible_message_count, total_messages)
+    for message in get_recent_messages(st.session_state.messages, st.session_state.archived_messages, visible_messages):
         display_chat_message(message)
 
 
+def should_render_stream(last_render_at, pending_chars, now):
+    """Redraw on the first chunk, then once per interval or when enough new text is buffered"""
+    return (
+        last_render_at is None
+        or now - last_render_at >= STREAM_RENDER_INTERVAL_SECONDS
+        or pending_chars >= STREAM_RENDER_MAX_PENDING_CHARS
+    )
+
+
 def display_streaming_response(user_input):
-    """Display streaming LLM response with visual feedback"""
+    """Display streaming LLM response with visual feedback, coalescing chunks into fewer redraws"""
     response_placeholder = st.empty()
-    complete_response = ""
+    response_parts = []
+    pending_chars = 0
+    last_render_at = None
+    render_seconds = 0.0
     
     for chunk in get_llm_response_streaming(user_input):
-        complete_response += chunk
-        response_placeholder.markdown(complete_response + "▌")
+        response_parts.append(chunk)
+        pending_chars += len(chunk)
+        
+        now = time.perf_counter()
+        if should_render_stream(last_render_at, pending_chars, now):
+            # Collapse the buffer so the next join only copies the text once
+            response_parts = ["".join(response_parts)]
+            response_placeholder.markdown(response_parts[0] + "▌")
+            last_render_at = time.perf_counter()
+            render_seconds += last_render_at - now
+            pending_chars = 0
     
+    complete_response = "".join(response_parts)
+    render_started = time.perf_counter()
     response_placeholder.markdown(complete_response)
+    observe_seconds("ui_render_seconds", render_seconds + time.perf_counter() - render_started)
     return complete_response
 
 
+@timed("chat_turn_seconds", "End-to-end latency of one chat turn")
 def handle_user_input(user_input):
     """Process user input and generate response with streaming support"""
     add_user_message_to_chat(user_input)
@@ -99,9 +163,11 @@ def handle_user_input(user_input):
     
     with st.chat_message("assistant"):
         if rag_response:
+            rag_hits.increment()
             st.markdown(rag_response)
             add_assistant_message_to_chat(rag_response)
         else:
+            rag_misses.increment()
             streaming_response = display_streaming_response(user_input)
             add_assistant_message_to_chat(streaming_response)
 
@@ -125,7 +191,10 @@ def create_main_chat_interface():
 
 def main():
     """Main application entry point"""
+    load_environment()
+    start_metrics_export()
     configure_streamlit_page()
+    start_background_warmup()
     create_main_chat_interface()
 
 
@@ -0,0 +1,273 @@
+"""
+In-process latency histograms and counters
+Exported as Prometheus text or a JSON snapshot for a local scraper
+"""
+
+import bisect
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+LATENCY_BUCKETS_SECONDS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+SNAPSHOT_QUANTILES = (0.5, 0.95, 0.99)
+
+histograms = {}
+counters = {}
+gauges = {}
+metrics_server = None
+metrics_export_started = False
+_registry_lock = threading.Lock()
+_metrics_export_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within the bucket they fall in"""
+    
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS_SECONDS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max_value = max(self.max_value, value)
+    
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Estimated value at the given fraction, or None before any observation"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = fraction * self.count
+            cumulative = 0
+            for bucket, bucket_count in enumerate(self.bucket_counts):
+                if bucket_count and cumulative + bucket_count >= rank:
+                    lower = self.buckets[bucket - 1] if bucket > 0 else 0.0
+                    upper = self.buckets[bucket] if bucket < len(self.buckets) else self.max_value
+                    upper = min(upper, self.max_value)
+                    return lower + (upper - lower) * (rank - cumulative) / bucket_count
+                cumulative += bucket_count
+            return self.max_value
+    
+    def reset(self):
+        with self._lock:
+            self.bucket_counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max_value = 0.0
+    
+    def snapshot(self) -> dict:
+        summary = {f"p{round(fraction * 100)}": self.quantile(fraction) for fraction in SNAPSHOT_QUANTILES}
+        with self._lock:
+            summary.update({"count": self.count, "sum": self.total, "max": self.max_value})
+        return summary
+    
+    def prometheus_lines(self):
+        with self._lock:
+            bucket_counts, count, total = list(self.bucket_counts), self.count, self.total
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        cumulative = 0
+        for upper_bound, bucket_count in zip(list(self.buckets) + [math.inf], bucket_counts):
+            cumulative += bucket_count
+            yield f'{self.name}_bucket{{le="{"+Inf" if upper_bound == math.inf else upper_bound}"}} {cumulative}'
+        yield f"{self.name}_sum {total}"
+        yield f"{self.name}_count {count}"
+
+
+class Counter:
+    """Monotonically increasing total"""
+    
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+    
+    def increment(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+    
+    def reset(self):
+        with self._lock:
+            self.value = 0
+    
+    def prometheus_lines(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        yield f"{self.name} {self.value}"
+
+
+def get_histogram(name: str, help_text: str = "") -> Histogram:
+    """Histogram registered under name, created on first use"""
+    histogram = histograms.get(name)
+    if histogram is None:
+        with _registry_lock:
+            histogram = histograms.setdefault(name, Histogram(name, help_text or name))
+    return histogram
+
+
+def get_counter(name: str, help_text: str = "") -> Counter:
+    """Counter registered under name, created on first use"""
+    counter = counters.get(name)
+    if counter is None:
+        with _registry_lock:
+            counter = counters.setdefault(name, Counter(name, help_text or name))
+    return counter
+
+
+def register_gauge(name: str, help_text: str, read_value: Callable[[], float]):
+    """Expose a value computed at scrape time, e.g. a queue depth or breaker state"""
+    with _registry_lock:
+        gauges[name] = (help_text, read_value)
+
+
+def observe_seconds(name: str, seconds: float):
+    get_histogram(name).observe(seconds)
+
+
+def increment_counter(name: str, amount: float = 1):
+    get_counter(name).increment(amount)
+
+
+class timed:
+    """Record elapsed seconds into a histogram, as a context manager or a function decorator"""
+    
+    def __init__(self, name: str, help_text: str = ""):
+        self.histogram = get_histogram(name, help_text)
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+    
+    def __call__(self, function):
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.histogram.observe(time.perf_counter() - started)
+        
+        return timed_function
+
+
+def get_metrics_snapshot() -> Dict[str, dict]:
+    """JSON-serializable view: histogram quantiles, counter totals, gauge values and RAG hit rate"""
+    with _registry_lock:
+        registered_histograms, registered_counters, registered_gauges = dict(histograms), dict(counters), dict(gauges)
+    
+    counter_values = {name: counter.value for name, counter in registered_counters.items()}
+    rag_lookups = counter_values.get("rag_hits_total", 0) + counter_values.get("rag_misses_total", 0)
+    return {
+        "histograms": {name: histogram.snapshot() for name, histogram in registered_histograms.items()},
+        "counters": counter_values,
+        "gauges": {name: read_value() for name, (_, read_value) in registered_gauges.items()},
+        "rag_hit_rate": counter_values.get("rag_hits_total", 0) / rag_lookups if rag_lookups else None
+    }
+
+
+def render_prometheus_text() -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    with _registry_lock:
+        registered = list(histograms.values()) + list(counters.values())
+        registered_gauges = dict(gauges)
+    
+    lines = []
+    for metric in registered:
+        lines.extend(metric.prometheus_lines())
+    for name, (help_text, read_value) in registered_gauges.items():
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {read_value()}"])
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    """Zero every histogram and counter in place, so module-level references stay valid"""
+    with _registry_lock:
+        registered = list(histograms.values()) + list(counters.values())
+    for metric in registered:
+        metric.reset()
+
+
+def build_metrics_request_handler():
+    """Handler class for the metrics endpoints, built on demand so http.server stays off the import path"""
+    from http.server import BaseHTTPRequestHandler
+    
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        """GET /metrics (Prometheus text) and GET /metrics.json"""
+        
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = render_prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(get_metrics_snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            encoded = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return MetricsRequestHandler
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serve metrics on a daemon thread; later calls return the already running server"""
+    global metrics_server
+    from http.server import ThreadingHTTPServer
+    
+    with _registry_lock:
+        if metrics_server is None:
+            metrics_server = ThreadingHTTPServer((host, port), build_metrics_request_handler())
+            metrics_server.daemon_threads = True
+            threading.Thread(target=metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+    return metrics_server
+
+
+def start_metrics_export():
+    """
+    Serve /metrics and /metrics.json on METRICS_PORT when it is set
+    
+    Tried once per process: Streamlit re-runs main.py (and resets its
+    globals) on every interaction, so the flag lives here. A port that
+    cannot be bound is logged once instead of failing every rerun.
+    """
+    global metrics_export_started
+    
+    with _metrics_export_lock:
+        if metrics_export_started:
+            return
+        metrics_export_started = True
+    
+    metrics_port = os.getenv("METRICS_PORT")
+    if not metrics_port or not metrics_port.strip():
+        return
+    try:
+        start_metrics_server(int(metrics_port))
+    except (OSError, ValueError) as error:
+        logger.warning("Metrics export on METRICS_PORT=%s not started: %s", metrics_port, error)
@@ -0,0 +1,149 @@
+"""
+Pre-fork multi-process serving with one shared copy of the matcher index
+The parent builds the index into a memory-mapped snapshot, then forks workers that inherit the mapping
+"""
+
+import gc
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Callable, Optional
+from config import API_WORKER_RESPAWN_DELAY_SECONDS
+from question_matcher import get_snapshot_dir, warm_up_query_indexes
+
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+def create_listening_socket(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """Bound, listening TCP socket that every worker accepts from"""
+    listen_socket = socket.create_server((host, port), backlog=backlog)
+    listen_socket.set_inheritable(True)
+    return listen_socket
+
+
+def prepare_shared_matcher_state() -> Optional[str]:
+    """
+    Build the matcher index once in the parent, memory-mapped from a snapshot
+    
+    Without MATCHER_SNAPSHOT_DIR the snapshot goes to a private directory on
+    /dev/shm (tmpfs), so the index lives in shared memory rather than on disk.
+    gc.freeze() keeps the collector from touching the inherited objects, so
+    their pages stay shared copy-on-write instead of being copied into every worker.
+    
+    Returns:
+        The temporary snapshot directory to remove on shutdown, or None if MATCHER_SNAPSHOT_DIR was set
+    """
+    temporary_snapshot_dir = None
+    if get_snapshot_dir() is None:
+        shared_memory_dir = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+        temporary_snapshot_dir = tempfile.mkdtemp(prefix="matcher-index-", dir=shared_memory_dir)
+        os.environ["MATCHER_SNAPSHOT_DIR"] = temporary_snapshot_dir
+    
+    warm_up_query_indexes()
+    gc.freeze()
+    return temporary_snapshot_dir
+
+
+def use_worker_snapshot_dir(worker_slot: int):
+    """
+    Point this worker's later index rebuilds at its own snapshot subdirectory
+    
+    Saving a snapshot removes the older ones beside it, so a worker that
+    compacts or reloads into the shared directory would delete the parent's
+    snapshot. The subdirectory is named by slot, not pid, so a respawned
+    worker reuses (and cleans up) its predecessor's.
+    """
+    snapshot_dir = get_snapshot_dir()
+    if snapshot_dir is not None:
+        os.environ["MATCHER_SNAPSHOT_DIR"] = os.path.join(snapshot_dir, f"worker-{worker_slot}")
+
+
+def run_worker(listen_socket: socket.socket, serve_socket: Callable[[socket.socket], None], worker_slot: int):
+    """Child process body: serve until terminated, never returning into the parent's code"""
+    exit_code = 0
+    try:
+        use_worker_snapshot_dir(worker_slot)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # Ctrl+C reaches the whole process group; the parent shuts workers down with SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        serve_socket(listen_socket)
+    except BaseException:
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def run_prefork(listen_socket: socket.socket, serve_socket: Callable[[socket.socket], None], workers: int):
+    """
+    Fork workers that all accept from listen_socket, replacing any that exit, until SIGTERM or SIGINT
+    
+    Args:
+        listen_socket: Socket created with create_listening_socket
+        serve_socket: Runs one worker's server on the inherited socket; must not return while serving
+        workers: Number of worker processes, 0 for one per CPU core
+    """
+    worker_count = workers or os.cpu_count() or 1
+    # Each worker limits itself to its share of the account-wide LLM budgets
+    os.environ["LLM_BUDGET_WORKERS"] = str(worker_count)
+    worker_slots = {}
+    stopping = False
+    
+    def spawn_worker(worker_slot: int):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(listen_socket, serve_socket, worker_slot)
+        worker_slots[pid] = worker_slot
+    
+    def stop_workers(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(worker_slots):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    previous_handlers = {signum: signal.signal(signum, stop_workers) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        for worker_slot in range(worker_count):
+            spawn_worker(worker_slot)
+        
+        while worker_slots:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            worker_slot = worker_slots.pop(pid, None)
+            if not stopping and worker_slot is not None:
+                time.sleep(API_WORKER_RESPAWN_DELAY_SECONDS)
+                if not stopping:
+                    spawn_worker(worker_slot)
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+
+def serve_prefork(host: str, port: int, serve_socket: Callable[[socket.socket], None], workers: int, on_listening: Optional[Callable[[socket.socket, int], None]] = None):
+    """
+    Build the shared index, bind once and run pre-forked workers until shut down
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+        serve_socket: Runs one worker's server on the inherited socket
+        workers: Number of worker processes, 0 for one per CPU core
+        on_listening: Called in the parent with the socket and worker count before forking
+    """
+    temporary_snapshot_dir = prepare_shared_matcher_state()
+    listen_socket = create_listening_socket(host, port)
+    try:
+        if on_listening is not None:
+            on_listening(listen_socket, workers or os.cpu_count() or 1)
+        run_prefork(listen_socket, serve_socket, workers)
+    finally:
+        listen_socket.close()
+        if temporary_snapshot_dir is not None:
+            shutil.rmtree(temporary_snapshot_dir, ignore_errors=True)
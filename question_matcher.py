@@ -3,43 +3,555 @@ RAG-based question matching using keyword vectors
 Optimized for reliability and minimal dependencies
 """
 
-from typing import Optional, Tuple, List
-import numpy as np
-from data import THOUGHTFUL_AI_QA
+from __future__ import annotations
+
+import importlib
+import math
+import os
+import re
+import threading
+import zlib
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple, List
+from config import (
+    ANN_NUM_TABLES, ANN_NUM_BITS, ANN_PREBUILD, FUZZY_MATCH_ENABLED,
+    MATCHER_COMPACTION_DELTA_ENTRIES, MATCHER_COMPACTION_TOMBSTONE_FRACTION
+)
+import data
+from delta_segment import (
+    NOT_DELETED, DeltaSegment, EntryKeyIndex, get_entry_key, iter_store_entry_keys, merge_delta_matches, needs_compaction
+)
+from index_snapshot import compute_dataset_hash, load_snapshot, save_snapshot
+from kb_store import CompactQAStore, StringColumn, StringColumnBuilder
+from lazy_imports import LazyModule
+from metrics import timed
+
+np = LazyModule("numpy")
+KEYWORD_PATTERN = re.compile(r'\b\w+\b')
+IMPORTANT_KEYWORDS = [
+    'eva', 'cam', 'phil', 'eligibility', 'verification', 'claims', 
+    'processing', 'payment', 'posting', 'agent', 'automates', 
+    'benefits', 'thoughtful', 'ai', 'healthcare', 'automation'
+]
+SCORING_MODES = ("keyword", "dense", "ann")
 
 embedding_model = None
 precomputed_qa_embeddings = None
+normalized_qa_embeddings = None
 qa_dataset = None
+keyword_index = None
+lsh_index = None
+lsh_settings = {}
+fuzzy_token_index = None
+matcher_state = None
+compaction_thread = None
+
+_initialization_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_lsh_lock = threading.Lock()
+_fuzzy_lock = threading.Lock()
+# Serializes edits, compactions and the publish step of reloads; lookups never take it
+_edit_lock = threading.Lock()
+_compaction_lock = threading.Lock()
+
 
+class InvertedIndex(NamedTuple):
+    """Token -> posting list of (QA id, count), stored in CSC layout"""
+    vocabulary: Dict[str, int]
+    posting_offsets: np.ndarray
+    posting_qa_ids: np.ndarray
+    posting_counts: np.ndarray
+    qa_keyword_totals: np.ndarray
+    qa_keyword_norms: np.ndarray
 
-def initialize_question_matching():
-    """Initialize keyword-based question matching system"""
-    global embedding_model, precomputed_qa_embeddings, qa_dataset
+
+class MatcherState(NamedTuple):
+    """
+    Immutable snapshot of everything a lookup reads, swapped in as one reference
     
-    if embedding_model is None:
-        from collections import Counter
-        import re
-        
-        def create_keyword_vector(text):
-            words = re.findall(r'\b\w+\b', text.lower())
-            important_keywords = [
-                'eva', 'cam', 'phil', 'eligibility', 'verification', 'claims', 
-                'processing', 'payment', 'posting', 'agent', 'automates', 
-                'benefits', 'thoughtful', 'ai', 'healthcare', 'automation'
-            ]
-            
-            vector = []
-            for keyword in important_keywords:
-                vector.append(words.count(keyword))
+    Edits made since the last build live in delta: this state sees its first
+    delta_size entries and the tombstones written at or before its version.
+    """
+    qa_dataset: CompactQAStore
+    precomputed_qa_embeddings: np.ndarray
+    normalized_qa_embeddings: np.ndarray
+    keyword_index: InvertedIndex
+    entry_key_index: EntryKeyIndex
+    delta: Optional[DeltaSegment] = None
+    delta_size: int = 0
+    version: int = 0
+
+
+def extract_keyword_counts(text: str) -> Counter:
+    """Tokenize text into a multiset of lowercase word tokens"""
+    return Counter(KEYWORD_PATTERN.findall(text.lower()))
+
+
+def build_inverted_index(question_texts: Iterable[str]) -> InvertedIndex:
+    """
+    Build the token -> posting list index for the KB questions
+    
+    Tokens are interned to ids as each question is tokenized, and the
+    per-question (token id, count) rows go into flat typed arrays rather than
+    per-posting Python tuples. One stable sort by token id then turns the rows
+    into posting lists, each in ascending QA id order.
+    """
+    vocabulary = {}
+    row_lengths, row_token_ids, row_counts = array("q"), array("q"), array("q")
+    qa_keyword_totals, qa_keyword_squares = array("q"), array("q")
+    
+    for text in question_texts:
+        keyword_counts = extract_keyword_counts(text)
+        row_lengths.append(len(keyword_counts))
+        qa_keyword_totals.append(sum(keyword_counts.values()))
+        qa_keyword_squares.append(sum(count * count for count in keyword_counts.values()))
+        for token, count in keyword_counts.items():
+            row_token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            row_counts.append(count)
+    
+    token_ids = np.asarray(row_token_ids, dtype=np.int64)
+    posting_order = np.argsort(token_ids, kind="stable")
+    row_qa_ids = np.repeat(np.arange(len(row_lengths), dtype=np.int64), np.asarray(row_lengths, dtype=np.int64))
+    posting_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    posting_offsets[1:] = np.cumsum(np.bincount(token_ids, minlength=len(vocabulary)))
+    
+    return InvertedIndex(
+        vocabulary, posting_offsets, row_qa_ids[posting_order], np.asarray(row_counts, dtype=np.int64)[posting_order],
+        np.array(qa_keyword_totals, dtype=np.int64), np.sqrt(np.array(qa_keyword_squares, dtype=float))
+    )
+
+
+def create_keyword_vector(text: str) -> np.ndarray:
+    """Embed text as counts of the important keywords plus its word count"""
+    words = KEYWORD_PATTERN.findall(text.lower())
+    
+    vector = []
+    for keyword in IMPORTANT_KEYWORDS:
+        vector.append(words.count(keyword))
+    
+    vector.append(len(words))
+    return np.array(vector, dtype=float)
+
+
+def create_hashed_keyword_vector(text: str, dimensions: int = 512) -> np.ndarray:
+    """Embed open-vocabulary text as a unit vector of its keyword counts hashed into fixed dimensions"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token, count in extract_keyword_counts(text).items():
+        vector[zlib.crc32(token.encode("utf-8")) % dimensions] += count
+    
+    vector_norm = np.linalg.norm(vector)
+    return vector / vector_norm if vector_norm > 0 else vector
+
+
+def normalize_embedding_rows(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving all-zero rows as zeros"""
+    row_norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, row_norms, out=np.zeros_like(embeddings), where=row_norms > 0)
+
+
+def get_snapshot_dir() -> Optional[str]:
+    """Directory for persisted index snapshots, disabled when MATCHER_SNAPSHOT_DIR is unset"""
+    snapshot_dir = os.getenv("MATCHER_SNAPSHOT_DIR")
+    return snapshot_dir if snapshot_dir and snapshot_dir.strip() else None
+
+
+def snapshot_arrays_from_index(
+    embeddings: np.ndarray,
+    normalized_embeddings: np.ndarray,
+    index: InvertedIndex,
+    entry_key_index: EntryKeyIndex
+) -> Dict[str, np.ndarray]:
+    """Flatten the built matcher index into named arrays for an on-disk snapshot"""
+    # One UTF-8 buffer plus offsets, as in CompactQAStore; a fixed-width str array pads every token to the longest
+    vocabulary_tokens = StringColumnBuilder()
+    for token in sorted(index.vocabulary, key=index.vocabulary.get):
+        vocabulary_tokens.append(token)
+    vocabulary_tokens = vocabulary_tokens.build()
+    return {
+        "qa_embeddings": embeddings,
+        "normalized_qa_embeddings": normalized_embeddings,
+        "vocabulary_buffer": np.frombuffer(vocabulary_tokens.buffer, dtype=np.uint8),
+        "vocabulary_offsets": vocabulary_tokens.offsets,
+        "posting_offsets": index.posting_offsets,
+        "posting_qa_ids": index.posting_qa_ids,
+        "posting_counts": index.posting_counts,
+        "qa_keyword_totals": index.qa_keyword_totals,
+        "qa_keyword_norms": index.qa_keyword_norms,
+        "entry_key_hashes": entry_key_index.key_hashes,
+        "entry_key_qa_ids": entry_key_index.qa_ids
+    }
+
+
+def index_from_snapshot_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, InvertedIndex, EntryKeyIndex]:
+    """Rebuild the matcher index around (memory-mapped) snapshot arrays"""
+    vocabulary_tokens = list(StringColumn(arrays["vocabulary_buffer"].tobytes(), arrays["vocabulary_offsets"]))
+    index = InvertedIndex(
+        dict(zip(vocabulary_tokens, range(len(vocabulary_tokens)))),
+        arrays["posting_offsets"],
+        arrays["posting_qa_ids"],
+        arrays["posting_counts"],
+        arrays["qa_keyword_totals"],
+        arrays["qa_keyword_norms"]
+    )
+    entry_key_index = EntryKeyIndex(arrays["entry_key_hashes"], arrays["entry_key_qa_ids"])
+    return arrays["qa_embeddings"], arrays["normalized_qa_embeddings"], index, entry_key_index
+
+
+def build_matcher_state(qa_entries: Iterable[dict]) -> MatcherState:
+    """Build (or load from a valid disk snapshot) the full matcher state for a dataset"""
+    qa_store = CompactQAStore.from_entries(qa_entries)
+    snapshot_dir = get_snapshot_dir()
+    dataset_hash = compute_dataset_hash(qa_store) if snapshot_dir else None
+    snapshot_arrays = load_snapshot(snapshot_dir, dataset_hash) if snapshot_dir else None
+    
+    if snapshot_arrays is not None:
+        return MatcherState(qa_store, *index_from_snapshot_arrays(snapshot_arrays))
+    
+    embeddings = [create_keyword_vector(q) for q in qa_store.questions]
+    embeddings = np.array(embeddings).reshape(-1, len(IMPORTANT_KEYWORDS) + 1)
+    normalized_embeddings = normalize_embedding_rows(embeddings)
+    index = build_inverted_index(qa_store.questions)
+    entry_key_index = EntryKeyIndex.build(iter_store_entry_keys(qa_store), len(qa_store))
+    if snapshot_dir:
+        save_snapshot(
+            snapshot_dir, dataset_hash, snapshot_arrays_from_index(embeddings, normalized_embeddings, index, entry_key_index)
+        )
+        # Serve from the mapped files too, so every process using this snapshot shares one copy
+        snapshot_arrays = load_snapshot(snapshot_dir, dataset_hash)
+        if snapshot_arrays is not None:
+            return MatcherState(qa_store, *index_from_snapshot_arrays(snapshot_arrays))
+    
+    return MatcherState(qa_store, embeddings, normalized_embeddings, index, entry_key_index)
+
+
+def publish_matcher_state(state: MatcherState):
+    """Atomically make a fully built state visible to new lookups"""
+    global matcher_state, embedding_model, precomputed_qa_embeddings, normalized_qa_embeddings, qa_dataset, keyword_index
+    
+    matcher_state = state
+    qa_dataset = state.qa_dataset
+    precomputed_qa_embeddings = state.precomputed_qa_embeddings
+    normalized_qa_embeddings = state.normalized_qa_embeddings
+    keyword_index = state.keyword_index
+    embedding_model = "keyword_vectors"
+
+
+def initialize_question_matching() -> MatcherState:
+    """Initialize keyword-based question matching system once, safe to call from many threads"""
+    state = matcher_state
+    if state is not None:
+        return state
+    
+    with _initialization_lock:
+        if matcher_state is None:
+            publish_matcher_state(build_matcher_state(get_default_qa_entries()))
+        return matcher_state
+
+
+def get_default_qa_entries(reread: bool = False) -> Iterable[dict]:
+    """
+    The KB to serve, as chosen by data.iter_qa_entries (the KB_PATH export or data.THOUGHTFUL_AI_QA)
+    
+    Args:
+        reread: Reload the data module first, so edits to data.py are picked up
+    """
+    if reread:
+        importlib.reload(data)
+    return data.iter_qa_entries()
+
+
+def reload_question_matching(qa_entries: Optional[List[dict]] = None, background: bool = True):
+    """
+    Rebuild the matcher for new Q&A data and swap it in without blocking lookups
+    
+    Lookups keep reading the previous state until the new one is fully built;
+    the swap is a single reference assignment (copy-on-write).
+    
+    Args:
+        qa_entries: New Q&A entries (any iterable), or None to re-read the
+            KB_PATH export or data.THOUGHTFUL_AI_QA
+        background: Build on a daemon thread and return it instead of waiting
+    
+    Returns:
+        The building thread when background is True, otherwise the new state
+    """
+    def rebuild():
+        with _reload_lock:
+            entries = qa_entries if qa_entries is not None else get_default_qa_entries(reread=True)
+            state = build_matcher_state(entries)
+            # Edits published while building belonged to the old data and are dropped
+            with _edit_lock:
+                publish_matcher_state(state)
+            return state
+    
+    if not background:
+        return rebuild()
+    
+    reload_thread = threading.Thread(target=rebuild, name="question-matcher-reload", daemon=True)
+    reload_thread.start()
+    return reload_thread
+
+
+def get_qa_entry(state: MatcherState, qa_id: int) -> dict:
+    """The Q&A entry behind a QA id, whether it is in the main index or was upserted since"""
+    if qa_id < len(state.qa_dataset):
+        return state.qa_dataset[qa_id]
+    return state.delta.get_entry(qa_id)
+
+
+def upsert_qa_entry(question: str, answer: str, entry_id: Optional[str] = None) -> int:
+    """
+    Add a Q&A entry, or replace the entry with the same key, without a rebuild
+    
+    The entry is indexed on its own in the delta segment and the entry it
+    replaces gets a tombstone, so the cost is O(entry size). Lookups already
+    running keep their state; later ones see the edit.
+    
+    Args:
+        question: The KB question to match against
+        answer: The answer returned for it
+        entry_id: Key for later edits and deletes, defaults to the question text
+    
+    Returns:
+        The new entry's QA id
+    """
+    if not question or not question.strip():
+        raise ValueError("A Q&A entry needs a question")
+    
+    qa = {"question": question, "answer": answer}
+    if entry_id:
+        qa["id"] = entry_id
+    keyword_counts = extract_keyword_counts(question)
+    normalized_embedding = normalize_embedding_rows(create_keyword_vector(question).reshape(1, -1))[0]
+    
+    with _edit_lock:
+        state = initialize_question_matching()
+        delta = state.delta if state.delta is not None else DeltaSegment(state.qa_dataset, state.entry_key_index)
+        version = state.version + 1
+        replaced_id = delta.find_live_id(get_entry_key(qa))
+        if replaced_id is not None:
+            delta.mark_deleted(replaced_id, version)
+        qa_id = delta.append_entry(qa, keyword_counts, normalized_embedding)
+        publish_matcher_state(state._replace(delta=delta, delta_size=state.delta_size + 1, version=version))
+    
+    start_compaction_if_needed()
+    return qa_id
+
+
+def delete_qa_entry(entry_id: str) -> bool:
+    """
+    Remove a Q&A entry by its key (its "id", or its question text) with a tombstone
+    
+    Returns:
+        True if a live entry was deleted, False if none had that key
+    """
+    with _edit_lock:
+        state = initialize_question_matching()
+        delta = state.delta if state.delta is not None else DeltaSegment(state.qa_dataset, state.entry_key_index)
+        qa_id = delta.find_live_id(entry_id)
+        if qa_id is None:
+            return False
+        delta.entry_ids.pop(entry_id, None)
+        version = state.version + 1
+        delta.mark_deleted(qa_id, version)
+        publish_matcher_state(state._replace(delta=delta, version=version))
+    
+    start_compaction_if_needed()
+    return True
+
+
+def replay_delta_edits(
+    compacted_state: MatcherState,
+    compacted_delta: DeltaSegment,
+    base_state: MatcherState,
+    current_state: MatcherState
+) -> MatcherState:
+    """
+    Carry the edits published after base_state over to a state compacted from it
+    
+    The compacted main index holds base_state's live entries in QA id order,
+    so their new QA ids are their ranks among them. Entries upserted since go
+    to compacted_delta, a fresh segment over the compacted entries, and
+    tombstones written since are re-applied with their original versions.
+    Costs O(main size) NumPy work plus O(edits).
+    
+    Returns:
+        compacted_state with a delta segment holding the replayed edits
+    """
+    delta = current_state.delta
+    base_version = base_state.version
+    
+    # Tombstones are versioned, so "live at base_state" can still be read off the current arrays
+    main_live = delta.main_deleted_at > base_version
+    new_main_ids = np.cumsum(main_live) - 1
+    live_delta_ids = [
+        local_id for local_id in range(base_state.delta_size) if delta.delta_deleted_at[local_id] > base_version
+    ]
+    first_new_delta_id = int(main_live.sum())
+    
+    tombstones = [
+        (int(delta.main_deleted_at[qa_id]), int(new_main_ids[qa_id]))
+        for qa_id in np.flatnonzero(main_live & (delta.main_deleted_at != NOT_DELETED))
+    ]
+    tombstones.extend(
+        (delta.delta_deleted_at[local_id], first_new_delta_id + rank)
+        for rank, local_id in enumerate(live_delta_ids) if delta.delta_deleted_at[local_id] != NOT_DELETED
+    )
+    for local_id in range(base_state.delta_size, current_state.delta_size):
+        qa = delta.entries[local_id]
+        qa_id = compacted_delta.append_entry(qa, extract_keyword_counts(qa["question"]), delta.normalized_embeddings[local_id])
+        if delta.delta_deleted_at[local_id] != NOT_DELETED:
+            tombstones.append((delta.delta_deleted_at[local_id], qa_id))
+    
+    replayed_state = compacted_state._replace(
+        delta=compacted_delta, delta_size=current_state.delta_size - base_state.delta_size, version=current_state.version
+    )
+    for deleted_version, qa_id in tombstones:
+        compacted_delta.mark_deleted(qa_id, deleted_version)
+        # Main-index keys are resolved through the key index, which skips tombstoned rows
+        if qa_id >= compacted_delta.first_delta_id:
+            entry_key = get_entry_key(get_qa_entry(replayed_state, qa_id))
+            if compacted_delta.entry_ids.get(entry_key) == qa_id:
+                del compacted_delta.entry_ids[entry_key]
+    return replayed_state
+
+
+def compact_question_matching(background: bool = True):
+    """
+    Fold upserted entries and tombstones into a freshly built main index
+    
+    The index is built from a snapshot of the live entries without holding
+    the edit lock, so upserts and deletes carry on meanwhile; the ones
+    published during the build are replayed onto the compacted state before
+    it is swapped in. Lookups keep reading the current state until then.
+    
+    Returns:
+        The compacting thread when background is True, otherwise the new state
+    """
+    def compact():
+        # A reload publishing mid-build would otherwise be overwritten by the replay
+        with _reload_lock:
+            with _edit_lock:
+                base_state = initialize_question_matching()
+            if base_state.delta is None:
+                return base_state
+            live_entries = base_state.delta.collect_live_entries(
+                base_state.qa_dataset, base_state.delta_size, base_state.version
+            )
+            compacted_state = build_matcher_state(live_entries)
+            compacted_delta = DeltaSegment(compacted_state.qa_dataset, compacted_state.entry_key_index)
             
-            vector.append(len(words))
-            return np.array(vector, dtype=float)
-        
-        question_texts = [qa["question"] for qa in THOUGHTFUL_AI_QA]
-        precomputed_qa_embeddings = [create_keyword_vector(q) for q in question_texts]
-        precomputed_qa_embeddings = np.array(precomputed_qa_embeddings)
-        qa_dataset = THOUGHTFUL_AI_QA
-        embedding_model = "keyword_vectors"
+            with _edit_lock:
+                current_state = matcher_state
+                if current_state.version != base_state.version:
+                    compacted_state = replay_delta_edits(compacted_state, compacted_delta, base_state, current_state)
+                publish_matcher_state(compacted_state)
+                return compacted_state
+    
+    if not background:
+        return compact()
+    
+    thread = threading.Thread(target=compact, name="question-matcher-compaction", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_compaction_if_needed():
+    """Compact in the background once the delta segment or the tombstones pass the configured limits"""
+    global compaction_thread
+    
+    if not needs_compaction(matcher_state, MATCHER_COMPACTION_DELTA_ENTRIES, MATCHER_COMPACTION_TOMBSTONE_FRACTION):
+        return None
+    
+    with _compaction_lock:
+        if compaction_thread is None or not compaction_thread.is_alive():
+            compaction_thread = compact_question_matching(background=True)
+        return compaction_thread
+
+
+def build_lsh_index(num_tables: int = ANN_NUM_TABLES, num_bits: int = ANN_NUM_BITS, seed: int = 0):
+    """(Re)build the approximate nearest-neighbour index used by the "ann" scoring mode"""
+    global lsh_index, lsh_settings
+    from ann_index import RandomProjectionLSH
+    
+    state = initialize_question_matching()
+    lsh_settings = {"num_tables": num_tables, "num_bits": num_bits, "seed": seed}
+    lsh_index = RandomProjectionLSH(state.keyword_index, **lsh_settings)
+    return lsh_index
+
+
+def get_lsh_index(state: Optional[MatcherState] = None):
+    """Return the ANN index for a state, (re)building it with the last used settings when missing or stale"""
+    global lsh_index
+    
+    if state is None:
+        state = initialize_question_matching()
+    
+    current_index = lsh_index
+    if current_index is not None and current_index.keyword_index is state.keyword_index:
+        return current_index
+    
+    with _lsh_lock:
+        if lsh_index is None or lsh_index.keyword_index is not state.keyword_index:
+            from ann_index import RandomProjectionLSH
+            lsh_index = RandomProjectionLSH(state.keyword_index, **lsh_settings)
+        return lsh_index
+
+
+def get_fuzzy_token_index(state: Optional[MatcherState] = None):
+    """Return the trigram index over a state's vocabulary, building it on first use or after a reload"""
+    global fuzzy_token_index
+    
+    if state is None:
+        state = initialize_question_matching()
+    
+    current_index = fuzzy_token_index
+    if current_index is not None and current_index.keyword_index is state.keyword_index:
+        return current_index
+    
+    with _fuzzy_lock:
+        if fuzzy_token_index is None or fuzzy_token_index.keyword_index is not state.keyword_index:
+            from fuzzy_tokens import TrigramTokenIndex
+            fuzzy_token_index = TrigramTokenIndex(state.keyword_index)
+        return fuzzy_token_index
+
+
+def warm_up_query_indexes() -> MatcherState:
+    """
+    Initialize the matcher and build the typo index, so no query pays for building them
+    
+    The LSH index is only built here when ANN_PREBUILD is set; otherwise the
+    first scoring_mode="ann" query builds it.
+    """
+    state = initialize_question_matching()
+    get_fuzzy_token_index(state)
+    if ANN_PREBUILD:
+        get_lsh_index(state)
+    return state
+
+
+def correct_query_tokens(query_counts: Counter, state: MatcherState) -> Counter:
+    """
+    Replace query tokens missing from the KB vocabulary with the closest KB token
+    
+    Known tokens, short tokens and tokens with nothing close enough are kept
+    as they are, so a question without typos scores exactly as before.
+    """
+    vocabulary = state.keyword_index.vocabulary
+    delta_vocabulary = state.delta.postings if state.delta is not None else {}
+    unknown_tokens = [token for token in query_counts if token not in vocabulary and token not in delta_vocabulary]
+    if not FUZZY_MATCH_ENABLED or not unknown_tokens:
+        return query_counts
+    
+    # Corrections only target the main index vocabulary until the next compaction
+    fuzzy_index = get_fuzzy_token_index(state)
+    corrected_counts = Counter()
+    for token, count in query_counts.items():
+        if token in unknown_tokens:
+            token = fuzzy_index.correct(token) or token
+        corrected_counts[token] += count
+    return corrected_counts
 
 
 def calculate_cosine_similarity(vector_a: np.ndarray, vector_b: np.ndarray) -> float:
@@ -56,15 +568,8 @@ def calculate_cosine_similarity(vector_a: np.ndarray, vector_b: np.ndarray) -> f
 
 def calculate_keyword_similarity(question1: str, question2: str) -> float:
     """Calculate keyword-based similarity between two questions"""
-    from collections import Counter
-    import re
-    
-    def get_keywords(text):
-        words = re.findall(r'\b\w+\b', text.lower())
-        return Counter(words)
-    
-    keywords1 = get_keywords(question1)
-    keywords2 = get_keywords(question2)
+    keywords1 = extract_keyword_counts(question1)
+    keywords2 = extract_keyword_counts(question2)
     
     intersection = sum((keywords1 & keywords2).values())
     union = sum((keywords1 | keywords2).values())
@@ -72,35 +577,347 @@ def calculate_keyword_similarity(question1: str, question2: str) -> float:
     return intersection / union if union > 0 else 0
 
 
-def find_best_match(user_question: str, similarity_threshold: float = 0.3) -> Optional[Tuple[str, float]]:
+def calculate_keyword_cosine_similarity(question1: str, question2: str) -> float:
+    """Calculate cosine similarity between the keyword count vectors of two questions"""
+    keywords1 = extract_keyword_counts(question1)
+    keywords2 = extract_keyword_counts(question2)
+    
+    dot_product = sum(count * keywords2[word] for word, count in keywords1.items())
+    magnitude_1 = math.sqrt(sum(count * count for count in keywords1.values()))
+    magnitude_2 = math.sqrt(sum(count * count for count in keywords2.values()))
+    
+    if magnitude_1 == 0 or magnitude_2 == 0:
+        return 0
+    
+    return dot_product / (magnitude_1 * magnitude_2)
+
+
+def score_candidate_matches(user_question: str, state: Optional[MatcherState] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score only the KB entries that share at least one token with the question
+    
+    Uses the identity |A ∪ B| = |A| + |B| - |A ∩ B| so the multiset Jaccard
+    score matches calculate_keyword_similarity exactly.
+    
+    Returns:
+        Tuple of (candidate QA ids in ascending order, similarity scores)
+    """
+    if state is None:
+        state = initialize_question_matching()
+    keyword_index = state.keyword_index
+    
+    query_counts = correct_query_tokens(extract_keyword_counts(user_question), state)
+    matched_ids = []
+    matched_overlaps = []
+    
+    for token, query_count in query_counts.items():
+        token_id = keyword_index.vocabulary.get(token)
+        if token_id is None:
+            continue
+        start, end = keyword_index.posting_offsets[token_id], keyword_index.posting_offsets[token_id + 1]
+        matched_ids.append(keyword_index.posting_qa_ids[start:end])
+        matched_overlaps.append(np.minimum(keyword_index.posting_counts[start:end], query_count))
+    
+    if not matched_ids:
+        candidate_ids, scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=float)
+    else:
+        candidate_ids, candidate_positions = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        intersections = np.bincount(candidate_positions, weights=np.concatenate(matched_overlaps))
+        unions = sum(query_counts.values()) + keyword_index.qa_keyword_totals[candidate_ids] - intersections
+        scores = intersections / unions
+    
+    return merge_delta_matches(candidate_ids, scores, query_counts, state)
+
+
+def select_top_k(candidate_ids: np.ndarray, scores: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+    """Pick the top_k (id, score) pairs, highest score first and lowest id on ties"""
+    if top_k <= 0 or len(scores) == 0:
+        return []
+    
+    if len(scores) > top_k:
+        kth_score = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+        keep = scores >= kth_score
+        candidate_ids, scores = candidate_ids[keep], scores[keep]
+    
+    order = np.lexsort((candidate_ids, -scores))[:top_k]
+    return [(int(candidate_ids[i]), float(scores[i])) for i in order]
+
+
+def score_dense_matches(user_question: str, top_k: int, state: Optional[MatcherState] = None) -> List[Tuple[int, float]]:
+    """
+    Score the whole KB with one matrix-vector product over the normalized embeddings
+    
+    Returns:
+        List of (QA id, cosine similarity), best match first
+    """
+    if state is None:
+        state = initialize_question_matching()
+    
+    query_vector = create_keyword_vector(user_question)
+    query_norm = np.linalg.norm(query_vector)
+    if query_norm == 0 or top_k <= 0:
+        return []
+    
+    scores = state.normalized_qa_embeddings @ (query_vector / query_norm)
+    if state.delta is not None:
+        # Delta ids follow the main ids, so positions stay QA ids
+        scores[state.delta.main_deleted_at <= state.version] = 0
+        scores = np.concatenate([scores, state.delta.score_dense(query_vector / query_norm, state.delta_size, state.version)])
+    if top_k < len(scores):
+        candidate_ids = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidate_ids = np.arange(len(scores))
+    
+    order = np.lexsort((candidate_ids, -scores[candidate_ids]))
+    return [
+        (int(candidate_ids[i]), float(scores[candidate_ids[i]]))
+        for i in order if scores[candidate_ids[i]] > 0
+    ]
+
+
+def find_top_matches(
+    user_question: str,
+    top_k: int = 5,
+    scoring_mode: str = "keyword",
+    state: Optional[MatcherState] = None
+) -> List[Tuple[int, float]]:
+    """
+    Find the top-k KB entries for a question
+    
+    Args:
+        user_question: The user's input question
+        top_k: Maximum number of matches to return
+        scoring_mode: "keyword" (multiset Jaccard via the inverted index),
+            "dense" (cosine over the precomputed keyword embeddings) or
+            "ann" (LSH candidates re-ranked with the exact Jaccard score)
+        state: Matcher state to search, defaults to the currently published one
+    
+    Returns:
+        List of (QA id, similarity_score), best match first; see get_qa_entry
+    """
+    if scoring_mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {scoring_mode}")
+    
+    if not user_question or not user_question.strip():
+        return []
+    
+    if state is None:
+        state = initialize_question_matching()
+    
+    if scoring_mode == "dense":
+        return score_dense_matches(user_question, top_k, state)
+    
+    if scoring_mode == "ann":
+        query_counts = correct_query_tokens(extract_keyword_counts(user_question), state)
+        candidate_ids, scores = get_lsh_index(state).query(query_counts, top_k)
+        candidate_ids, scores = merge_delta_matches(candidate_ids, scores, query_counts, state)
+    else:
+        candidate_ids, scores = score_candidate_matches(user_question, state)
+    return select_top_k(candidate_ids, scores, top_k)
+
+
+@timed("find_best_match_seconds", "Knowledge base lookup latency, lazy index build included")
+def find_best_match(
+    user_question: str,
+    similarity_threshold: float = 0.3,
+    scoring_mode: str = "keyword"
+) -> Optional[Tuple[str, float]]:
     """
     Find the best matching answer using keyword-based similarity
     
     Args:
         user_question: The user's input question
         similarity_threshold: Minimum similarity score required for a match
-        
+        scoring_mode: "keyword", "dense" or "ann", see find_top_matches
+    
     Returns:
         Tuple of (answer, similarity_score) if match found, None otherwise
     """
     if not user_question or not user_question.strip():
         return None
     
-    initialize_question_matching()
+    state = initialize_question_matching()
+    top_matches = find_top_matches(user_question, top_k=1, scoring_mode=scoring_mode, state=state)
+    if not top_matches:
+        return None
     
-    highest_similarity_score = 0
-    best_matching_answer = None
+    best_index, highest_similarity_score = top_matches[0]
+    effective_threshold = similarity_threshold * 0.7
     
-    for index, qa in enumerate(qa_dataset):
-        current_similarity = calculate_keyword_similarity(user_question, qa["question"])
-        
-        if current_similarity > highest_similarity_score:
-            highest_similarity_score = current_similarity
-            best_matching_answer = qa["answer"]
+    if highest_similarity_score >= effective_threshold:
+        return (get_qa_entry(state, best_index)["answer"], highest_similarity_score)
+    
+    return None
+
+
+def build_query_count_matrix(
+    questions: List[str],
+    vocabulary: Dict[str, int],
+    correct_tokens: Optional[Callable[[Counter], Counter]] = None
+):
+    """
+    Tokenize a batch of questions into a sparse (COO) count matrix over the KB vocabulary
+    
+    Tokens missing from the vocabulary cannot overlap any KB question, so they
+    only contribute to the per-query totals used for the Jaccard union.
+    correct_tokens, when given, rewrites each question's counts first (typo correction).
+    
+    Returns:
+        Tuple of (row ids, token ids, counts, per-query totals, per-query norms)
+    """
+    row_ids, token_ids, counts = [], [], []
+    query_totals = np.zeros(len(questions), dtype=np.int64)
+    query_squares = np.zeros(len(questions), dtype=np.int64)
+    
+    for row, question in enumerate(questions):
+        query_counts = extract_keyword_counts(question or "")
+        if correct_tokens is not None:
+            query_counts = correct_tokens(query_counts)
+        query_totals[row] = sum(query_counts.values())
+        query_squares[row] = sum(count * count for count in query_counts.values())
+        for token, count in query_counts.items():
+            token_id = vocabulary.get(token)
+            if token_id is not None:
+                row_ids.append(row)
+                token_ids.append(token_id)
+                counts.append(count)
+    
+    return (
+        np.array(row_ids, dtype=np.int64),
+        np.array(token_ids, dtype=np.int64),
+        np.array(counts, dtype=np.int64),
+        query_totals,
+        np.sqrt(query_squares.astype(float))
+    )
+
+
+def score_query_batch(questions: List[str], metric: str = "jaccard", state: Optional[MatcherState] = None):
+    """
+    Score a batch of questions against every KB entry they share a token with
+    
+    The query count matrix is joined against the posting lists in bulk, so the
+    pairwise overlaps (sum of minimums for Jaccard, dot products for cosine)
+    are computed with NumPy instead of per-pair Counter arithmetic.
+    
+    Returns:
+        Tuple of (query rows, QA ids, scores) for every non-zero pair
+    """
+    if metric not in ("jaccard", "cosine"):
+        raise ValueError(f"Unknown similarity metric: {metric}")
+    
+    if state is None:
+        state = initialize_question_matching()
+    keyword_index = state.keyword_index
+    
+    corrected_queries = []
+    
+    def correct_tokens(counts: Counter) -> Counter:
+        corrected_counts = correct_query_tokens(counts, state)
+        corrected_queries.append(corrected_counts)
+        return corrected_counts
+    
+    row_ids, token_ids, query_counts, query_totals, query_norms = build_query_count_matrix(
+        questions, keyword_index.vocabulary, correct_tokens
+    )
+    posting_starts = keyword_index.posting_offsets[token_ids]
+    posting_lengths = keyword_index.posting_offsets[token_ids + 1] - posting_starts
+    total_pairs = int(posting_lengths.sum())
+    
+    if total_pairs == 0:
+        empty_pairs = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=float)
+        return merge_delta_batch_matches(*empty_pairs, corrected_queries, metric, state)
+    
+    entry_for_pair = np.repeat(np.arange(len(token_ids)), posting_lengths)
+    pair_offsets = np.arange(total_pairs) - np.repeat(np.cumsum(posting_lengths) - posting_lengths, posting_lengths)
+    posting_positions = posting_starts[entry_for_pair] + pair_offsets
+    
+    pair_qa_ids = keyword_index.posting_qa_ids[posting_positions]
+    pair_kb_counts = keyword_index.posting_counts[posting_positions]
+    pair_query_counts = query_counts[entry_for_pair]
+    if metric == "jaccard":
+        pair_overlaps = np.minimum(pair_kb_counts, pair_query_counts)
+    else:
+        pair_overlaps = pair_kb_counts * pair_query_counts
+    
+    qa_count = len(keyword_index.qa_keyword_totals)
+    pair_keys = row_ids[entry_for_pair] * qa_count + pair_qa_ids
+    unique_keys, key_positions = np.unique(pair_keys, return_inverse=True)
+    overlaps = np.bincount(key_positions, weights=pair_overlaps)
+    rows, qa_ids = unique_keys // qa_count, unique_keys % qa_count
+    
+    if metric == "jaccard":
+        scores = overlaps / (query_totals[rows] + keyword_index.qa_keyword_totals[qa_ids] - overlaps)
+    else:
+        scores = overlaps / (query_norms[rows] * keyword_index.qa_keyword_norms[qa_ids])
+    
+    return merge_delta_batch_matches(rows, qa_ids, scores, corrected_queries, metric, state)
+
+
+def merge_delta_batch_matches(
+    rows: np.ndarray,
+    qa_ids: np.ndarray,
+    scores: np.ndarray,
+    query_counts: List[Counter],
+    metric: str,
+    state: MatcherState
+):
+    """Drop deleted pairs and add each query's delta segment matches, keeping (row, QA id) order"""
+    if state.delta is None:
+        return rows, qa_ids, scores
+    
+    live = state.delta.live_main_mask(qa_ids, state.version)
+    merged_rows, merged_qa_ids, merged_scores = [rows[live]], [qa_ids[live]], [scores[live]]
+    for row, counts in enumerate(query_counts):
+        delta_ids, delta_scores = state.delta.score_keyword_matches(counts, state.delta_size, state.version, metric)
+        merged_rows.append(np.full(len(delta_ids), row, dtype=np.int64))
+        merged_qa_ids.append(delta_ids)
+        merged_scores.append(delta_scores)
+    
+    rows, qa_ids, scores = np.concatenate(merged_rows), np.concatenate(merged_qa_ids), np.concatenate(merged_scores)
+    order = np.lexsort((qa_ids, rows))
+    return rows[order], qa_ids[order], scores[order]
+
+
+def find_best_matches_batch(
+    questions: List[str],
+    similarity_threshold: float = 0.3,
+    metric: str = "jaccard",
+    chunk_size: int = 4096
+) -> List[Optional[Tuple[str, float]]]:
+    """
+    Vectorized find_best_match over many questions at once
+    
+    Args:
+        questions: The questions to match
+        similarity_threshold: Minimum similarity score required for a match
+        metric: "jaccard" (same scores as find_best_match) or "cosine"
+        chunk_size: Number of questions scored per NumPy pass, bounds peak memory
+    
+    Returns:
+        One (answer, similarity_score) tuple or None per input question
+    """
+    state = initialize_question_matching()
     
     effective_threshold = similarity_threshold * 0.7
+    results = [None] * len(questions)
     
-    if highest_similarity_score >= effective_threshold:
-        return (best_matching_answer, highest_similarity_score)
+    for chunk_start in range(0, len(questions), chunk_size):
+        chunk = questions[chunk_start:chunk_start + chunk_size]
+        rows, qa_ids, scores = score_query_batch(chunk, metric, state)
+        if len(scores) == 0:
+            continue
+        
+        # Pairs arrive sorted by (row, qa_id): take each row's max, lowest QA id on ties
+        row_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        row_best_scores = np.maximum.reduceat(scores, row_starts)
+        best_positions = np.flatnonzero(scores == np.repeat(row_best_scores, np.diff(np.r_[row_starts, len(rows)])))
+        best_rows = rows[best_positions]
+        is_first_in_row = np.r_[True, best_rows[1:] != best_rows[:-1]]
+        
+        for position in best_positions[is_first_in_row]:
+            score = float(scores[position])
+            question = chunk[rows[position]]
+            if question and question.strip() and score >= effective_threshold:
+                results[chunk_start + int(rows[position])] = (get_qa_entry(state, int(qa_ids[position]))["answer"], score)
     
-    return None 
\ No newline at end of file
+    return results
@@ -0,0 +1,243 @@
+"""
+Client-side admission control for upstream LLM calls
+Token buckets for requests/min and tokens/min, with a bounded priority wait queue
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+from config import (
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_RATE_LIMIT_QUEUE_SIZE,
+    LLM_RATE_LIMIT_QUEUE_TIMEOUT_SECONDS,
+    MAX_TOKENS
+)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+ASYNC_POLL_SECONDS = 0.01
+
+upstream_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+class RateLimitExceeded(Exception):
+    """The request was shed locally: the wait queue was full or the queue timeout elapsed"""
+
+
+def estimate_prompt_tokens(messages: List[dict]) -> int:
+    """Rough prompt size: about four characters per token plus a small per-message overhead"""
+    return sum(len(message["content"]) // CHARS_PER_TOKEN + TOKENS_PER_MESSAGE for message in messages)
+
+
+def estimate_request_tokens(completion_request: dict) -> int:
+    """Tokens a completion may use: the prompt estimate plus the full max_tokens allowance"""
+    return estimate_prompt_tokens(completion_request["messages"]) + completion_request.get("max_tokens", MAX_TOKENS)
+
+
+class TokenBucket:
+    """Continuously refilled bucket; not thread-safe on its own"""
+    
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float]):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.level = capacity
+        self.updated_at = clock()
+    
+    def seconds_until_available(self, amount: float) -> float:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+    
+    def consume(self, amount: float):
+        self.level -= amount
+    
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class UpstreamRateLimiter:
+    """
+    Shapes upstream calls to a requests/min and tokens/min budget
+    
+    Callers queue in (priority, arrival) order and only the head of the queue
+    may draw from the buckets, so a large request cannot be starved by a
+    stream of small ones. The queue is bounded and every wait has a timeout;
+    both raise RateLimitExceeded instead of letting load reach OpenAI as 429s.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        max_queue_size: int = LLM_RATE_LIMIT_QUEUE_SIZE,
+        queue_timeout_seconds: float = LLM_RATE_LIMIT_QUEUE_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60, clock)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60, clock)
+        self.max_queue_size = max_queue_size
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.clock = clock
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+    
+    def _enqueue(self, priority: int) -> tuple:
+        if len(self._waiters) >= self.max_queue_size:
+            self.rejected += 1
+            raise RateLimitExceeded("LLM request queue is full")
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._waiters, entry)
+        return entry
+    
+    def _try_admit(self, entry: tuple, tokens: float) -> Optional[float]:
+        """0 when admitted, else seconds until the buckets refill (None: wait for the queue to move)"""
+        if self._waiters[0] != entry:
+            return None
+        
+        wait_seconds = max(
+            self.request_bucket.seconds_until_available(1),
+            self.token_bucket.seconds_until_available(tokens)
+        )
+        if wait_seconds > 0:
+            return wait_seconds
+        
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(tokens)
+        heapq.heappop(self._waiters)
+        self.admitted += 1
+        self._condition.notify_all()
+        return 0.0
+    
+    def _abandon(self, entry: tuple):
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        self._condition.notify_all()
+    
+    def _queue_deadline(self, timeout: Optional[float]) -> float:
+        if timeout is None:
+            timeout = self.queue_timeout_seconds
+        return self.clock() + min(timeout, self.queue_timeout_seconds)
+    
+    def acquire(self, estimated_tokens: int, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None):
+        """
+        Block until the request fits in both buckets
+        
+        Args:
+            estimated_tokens: Token estimate for the request, see estimate_request_tokens
+            priority: Lower values are admitted first
+            timeout: Longest time to wait, capped by the limiter's queue timeout
+        
+        Raises:
+            RateLimitExceeded: If the queue is full or the wait times out
+        """
+        tokens = min(estimated_tokens, self.token_bucket.capacity)
+        with self._condition:
+            entry = self._enqueue(priority)
+            queue_deadline = self._queue_deadline(timeout)
+            admitted = False
+            try:
+                while True:
+                    wait_seconds = self._try_admit(entry, tokens)
+                    if wait_seconds == 0:
+                        admitted = True
+                        return
+                    remaining = queue_deadline - self.clock()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise RateLimitExceeded("Timed out waiting for LLM rate limit capacity")
+                    self._condition.wait(remaining if wait_seconds is None else min(wait_seconds, remaining))
+            finally:
+                if not admitted:
+                    self._abandon(entry)
+    
+    async def acquire_async(self, estimated_tokens: int, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None):
+        """Async counterpart of acquire; waits on the event loop instead of blocking a thread"""
+        tokens = min(estimated_tokens, self.token_bucket.capacity)
+        with self._condition:
+            entry = self._enqueue(priority)
+            queue_deadline = self._queue_deadline(timeout)
+        
+        admitted = False
+        try:
+            while True:
+                with self._condition:
+                    wait_seconds = self._try_admit(entry, tokens)
+                    if wait_seconds == 0:
+                        admitted = True
+                        return
+                    remaining = queue_deadline - self.clock()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise RateLimitExceeded("Timed out waiting for LLM rate limit capacity")
+                await asyncio.sleep(min(wait_seconds or ASYNC_POLL_SECONDS, remaining))
+        finally:
+            if not admitted:
+                with self._condition:
+                    self._abandon(entry)
+    
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Return tokens that were reserved but not used once the real usage is known"""
+        with self._condition:
+            if actual_tokens < estimated_tokens:
+                self.token_bucket.give_back(estimated_tokens - actual_tokens)
+                self._condition.notify_all()
+    
+    def get_stats(self) -> dict:
+        """Queue depth, admission counters and remaining bucket capacity"""
+        with self._condition:
+            return {
+                "queue_depth": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "available_requests": self.request_bucket.level,
+                "available_tokens": self.token_bucket.level
+            }
+
+
+def get_worker_share(budget: float) -> float:
+    """This process's part of an account-wide budget, split evenly across LLM_BUDGET_WORKERS pre-forked workers"""
+    try:
+        worker_count = int(os.getenv("LLM_BUDGET_WORKERS", "1"))
+    except ValueError:
+        worker_count = 1
+    return budget / max(worker_count, 1)
+
+
+def get_upstream_rate_limiter() -> UpstreamRateLimiter:
+    """Process-wide limiter shared by every upstream LLM call"""
+    global upstream_rate_limiter
+    
+    if upstream_rate_limiter is None:
+        with _rate_limiter_lock:
+            if upstream_rate_limiter is None:
+                upstream_rate_limiter = UpstreamRateLimiter(
+                    get_worker_share(LLM_REQUESTS_PER_MINUTE), get_worker_share(LLM_TOKENS_PER_MINUTE)
+                )
+    
+    return upstream_rate_limiter
+
+
+def reset_upstream_rate_limiter():
+    """Drop the parent's limiter in a forked child, which builds its own from its share of the budget"""
+    global upstream_rate_limiter
+    upstream_rate_limiter = None
+
+
+os.register_at_fork(after_in_child=reset_upstream_rate_limiter)
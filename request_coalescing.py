@@ -0,0 +1,129 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests
+Concurrent callers asking the same question share one upstream completion
+"""
+
+import asyncio
+import weakref
+from typing import AsyncIterator, Callable
+from metrics import get_counter
+
+_async_coalescers = weakref.WeakKeyDictionary()
+_async_coalescing_stats = {"upstream_calls": 0, "coalesced_calls": 0}
+coalesced_calls_total = get_counter("llm_coalesced_calls_total", "Callers served by an identical in-flight LLM request")
+
+
+class AsyncInFlightResponse:
+    """Chunks of one upstream completion, replayed to every caller that joins it"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.pump_task = None
+        self.changed = asyncio.Event()
+    
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self._wake_readers()
+    
+    def finish(self, error: Exception = None):
+        self.done = True
+        self.error = error
+        self._wake_readers()
+    
+    def _wake_readers(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+    
+    async def iter_chunks(self) -> AsyncIterator[str]:
+        """Yield every chunk from the start, waiting until new ones arrive or the flight ends"""
+        position = 0
+        while True:
+            if position >= len(self.chunks) and not self.done:
+                await self.changed.wait()
+                continue
+            
+            new_chunks = self.chunks[position:]
+            position += len(new_chunks)
+            for chunk in new_chunks:
+                yield chunk
+            
+            if self.done and position >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class AsyncRequestCoalescer:
+    """
+    Single flight for one event loop: the first caller for a key starts the
+    upstream call as a pump task, later callers for the same key attach to its
+    chunks. The pump task keeps draining upstream while any caller is still
+    reading, even if the first one went away, and is cancelled once the last
+    caller leaves before the answer is complete.
+    """
+    
+    def __init__(self):
+        self._in_flight = {}
+        self._pump_tasks = set()
+    
+    async def stream(self, request_key: str, start_upstream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Yield the chunks of the shared in-flight response for request_key"""
+        flight = self._in_flight.get(request_key)
+        if flight is None:
+            flight = AsyncInFlightResponse()
+            self._in_flight[request_key] = flight
+            _async_coalescing_stats["upstream_calls"] += 1
+            flight.pump_task = asyncio.create_task(self._pump(request_key, flight, start_upstream))
+            self._pump_tasks.add(flight.pump_task)
+            flight.pump_task.add_done_callback(self._pump_tasks.discard)
+        else:
+            _async_coalescing_stats["coalesced_calls"] += 1
+            coalesced_calls_total.increment()
+        
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.iter_chunks():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is left to read the answer, so stop paying for it upstream
+                if self._in_flight.get(request_key) is flight:
+                    del self._in_flight[request_key]
+                flight.pump_task.cancel()
+    
+    async def _pump(self, request_key: str, flight: AsyncInFlightResponse, start_upstream):
+        error = None
+        try:
+            async for chunk in start_upstream():
+                flight.publish(chunk)
+        except Exception as upstream_error:
+            error = upstream_error
+        finally:
+            if self._in_flight.get(request_key) is flight:
+                del self._in_flight[request_key]
+            flight.finish(error)
+
+
+def get_async_request_coalescer() -> AsyncRequestCoalescer:
+    """Coalescer for the running event loop"""
+    event_loop = asyncio.get_running_loop()
+    coalescer = _async_coalescers.get(event_loop)
+    if coalescer is None:
+        coalescer = AsyncRequestCoalescer()
+        _async_coalescers[event_loop] = coalescer
+    return coalescer
+
+
+def get_coalescing_stats() -> dict:
+    """Upstream calls made vs. callers served by an already in-flight call, across every event loop"""
+    coalesced_calls = _async_coalescing_stats["coalesced_calls"]
+    return {
+        "upstream_calls": _async_coalescing_stats["upstream_calls"],
+        "coalesced_calls": coalesced_calls,
+        "upstream_calls_saved": coalesced_calls,
+        "in_flight": sum(len(coalescer._in_flight) for coalescer in list(_async_coalescers.values()))
+    }
@@ -0,0 +1,212 @@
+"""
+Deadline budgets, retries and hedging for upstream LLM calls
+Every attempt, backoff sleep and hedge has to fit in the remaining request budget
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+from config import (
+    LLM_TIMEOUT_SECONDS,
+    LLM_ATTEMPT_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY_SECONDS,
+    LLM_RETRY_MAX_DELAY_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    LLM_LATENCY_WINDOW,
+    LLM_LATENCY_MIN_SAMPLES
+)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """The request budget ran out before an attempt could be made"""
+
+
+class Deadline:
+    """Fixed point in time by which a request has to be answered"""
+    
+    def __init__(self, budget_seconds: float = LLM_TIMEOUT_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + budget_seconds
+    
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+    
+    def attempt_timeout(self) -> float:
+        """Timeout for the next attempt: the per-attempt cap, or less if the budget is nearly spent"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("LLM request budget exhausted")
+        return min(remaining, LLM_ATTEMPT_TIMEOUT_SECONDS)
+
+
+class LatencyTracker:
+    """Rolling window of successful attempt latencies, used to pick the hedge delay"""
+    
+    def __init__(self, window: int = LLM_LATENCY_WINDOW, min_samples: int = LLM_LATENCY_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency at the given fraction (e.g. 0.95), or None until enough samples exist"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    
+    def hedge_delay(self) -> float:
+        """How long to wait on the first attempt before sending a hedge"""
+        observed = self.percentile(LLM_HEDGE_PERCENTILE)
+        if observed is None:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(LLM_HEDGE_MIN_DELAY_SECONDS, observed)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx responses are worth another attempt"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        APIConnectionError = ()
+    return isinstance(error, (TimeoutError, ConnectionError, APIConnectionError))
+
+
+def get_retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested wait from a Retry-After header, if the error carries one"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_backoff_delay(
+    attempt: int,
+    base_delay: float = LLM_RETRY_BASE_DELAY_SECONDS,
+    max_delay: float = LLM_RETRY_MAX_DELAY_SECONDS,
+    random_uniform: Callable[[float, float], float] = random.uniform
+) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max_delay, base_delay * 2**attempt)]"""
+    return random_uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def get_retry_delay(error: Exception, attempt: int, deadline: Deadline, max_retries: int) -> Optional[float]:
+    """Seconds to sleep before retrying, or None if the error should be raised instead"""
+    if attempt >= max_retries or not is_retryable_error(error):
+        return None
+    
+    retry_delay = max(compute_backoff_delay(attempt), get_retry_after_seconds(error) or 0.0)
+    if retry_delay >= deadline.remaining():
+        return None
+    return retry_delay
+
+
+def discard_when_done(future, on_discard: Optional[Callable[[object], None]]):
+    """Release the result of a losing attempt once it finishes"""
+    def release_result(finished_future):
+        if on_discard is not None and not finished_future.cancelled() and finished_future.exception() is None:
+            on_discard(finished_future.result())
+    
+    future.add_done_callback(release_result)
+
+
+async def call_with_hedging_async(
+    attempt_request: Callable[[float], Awaitable[T]],
+    deadline: Deadline,
+    hedge_delay: float,
+    on_discard: Optional[Callable[[T], None]] = None
+) -> T:
+    """
+    Run attempt_request, and if it hasn't answered after hedge_delay, race a second copy
+    
+    The first successful result wins; the loser is cancelled and, if it had
+    already produced a result, handed to on_discard (e.g. to close a stream).
+    """
+    primary = asyncio.ensure_future(attempt_request(deadline.attempt_timeout()))
+    done, _ = await asyncio.wait({primary}, timeout=min(hedge_delay, deadline.remaining()))
+    if done or deadline.remaining() <= 0:
+        return await primary
+    
+    pending = {primary, asyncio.ensure_future(attempt_request(deadline.attempt_timeout()))}
+    first_error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        for loser in pending:
+            loser.cancel()
+            discard_when_done(loser, on_discard)
+
+
+async def call_with_budget_async(
+    attempt_request: Callable[[float], Awaitable[T]],
+    latency_tracker: LatencyTracker,
+    budget_seconds: float = LLM_TIMEOUT_SECONDS,
+    max_retries: int = LLM_MAX_RETRIES,
+    hedge: bool = LLM_HEDGE_ENABLED,
+    on_discard: Optional[Callable[[T], None]] = None,
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+) -> T:
+    """
+    Await attempt_request(timeout) with retries and optional hedging inside one deadline
+    
+    Args:
+        attempt_request: Makes one upstream attempt with the given timeout in seconds
+        latency_tracker: Records successful attempt latencies and supplies the hedge delay
+        budget_seconds: Total time allowed for all attempts and backoff sleeps
+        max_retries: Retries after the first attempt for retryable errors
+        hedge: Whether a slow attempt is raced by a second one
+        on_discard: Called with the result of a hedge attempt that lost the race
+    
+    Returns:
+        Result of the first successful attempt
+    """
+    deadline = Deadline(budget_seconds)
+    
+    async def timed_attempt(timeout: float) -> T:
+        started = time.monotonic()
+        result = await attempt_request(timeout)
+        latency_tracker.record(time.monotonic() - started)
+        return result
+    
+    attempt = 0
+    while True:
+        try:
+            if hedge:
+                return await call_with_hedging_async(timed_attempt, deadline, latency_tracker.hedge_delay(), on_discard)
+            return await timed_attempt(deadline.attempt_timeout())
+        except DeadlineExceeded:
+            raise
+        except Exception as error:
+            retry_delay = get_retry_delay(error, attempt, deadline, max_retries)
+            if retry_delay is None:
+                raise
+            await sleep(retry_delay)
+            attempt += 1
@@ -0,0 +1,337 @@
+"""
+Response cache for LLM fallback answers
+In-memory LRU with TTL, optionally backed by a persistent SQLite tier
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional, Tuple
+from config import (
+    LLM_MODEL,
+    PROMPT_VERSION,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_PERSISTENT_MAX_ENTRIES,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_DIMENSIONS,
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+    SEMANTIC_CACHE_MIN_CONTENT_OVERLAP
+)
+from lazy_imports import LazyModule
+from metrics import get_counter
+from question_matcher import create_hashed_keyword_vector, extract_keyword_counts
+
+np = LazyModule("numpy")
+PRUNE_EVERY_WRITES = 100
+WORD_PATTERN = re.compile(r'\b\w+\b')
+REPLAY_CHUNK_PATTERN = re.compile(r'\S+\s*|\s+')
+# Words that never change what a question asks; they are ignored when comparing near-duplicate questions.
+# Question words and negations are deliberately absent: "when"/"where" or "not" change the answer.
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "and", "or", "so", "to", "of", "in", "on", "at", "for", "with", "by", "from", "about",
+    "is", "are", "was", "were", "be", "am", "do", "does", "did", "can", "could", "would", "will",
+    "i", "me", "my", "we", "our", "us", "you", "your", "it", "its", "this", "that",
+    "please", "thanks", "thank", "hi", "hello", "hey", "today", "now", "just", "really"
+})
+# Words two questions must agree on to share an answer ("t" is what is left of "don't", "can't", ...)
+KEY_WORDS = frozenset({
+    "not", "no", "never", "without", "t", "cannot",
+    "how", "what", "when", "where", "why", "who", "which"
+})
+
+semantic_cache_hits = get_counter("semantic_cache_hits_total", "LLM questions answered from the semantic near-duplicate cache")
+semantic_cache_misses = get_counter("semantic_cache_misses_total", "Semantic cache lookups that found no near-duplicate question")
+
+response_cache = None
+semantic_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def normalize_question_text(question: str) -> str:
+    """Lowercase the question and keep only its words, so punctuation and spacing don't matter"""
+    return " ".join(WORD_PATTERN.findall(question.lower()))
+
+
+def build_cache_key(question: str, model: str = LLM_MODEL, prompt_version: str = PROMPT_VERSION) -> str:
+    """Cache key for a question under a specific model and system prompt version"""
+    key_text = f"{model}\n{prompt_version}\n{normalize_question_text(question)}"
+    return hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+
+
+def iter_response_chunks(response: str, words_per_chunk: int = 3) -> Iterator[str]:
+    """Replay a cached answer as small chunks, like a streaming completion"""
+    pieces = REPLAY_CHUNK_PATTERN.findall(response)
+    for start in range(0, len(pieces), words_per_chunk):
+        yield "".join(pieces[start:start + words_per_chunk])
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU + TTL cache of LLM answers
+    
+    The memory tier is bounded by max_entries. When sqlite_path is set, every
+    answer is also written to SQLite so it survives restarts; memory misses
+    fall through to it and promote hits back into memory.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        sqlite_path: Optional[str] = None,
+        persistent_max_entries: int = RESPONSE_CACHE_PERSISTENT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent_max_entries = persistent_max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._writes_since_prune = 0
+        
+        if sqlite_path:
+            self._connection = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses "
+                "(cache_key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.commit()
+    
+    def get(self, cache_key: str) -> Optional[str]:
+        """Return a fresh cached answer or None"""
+        now = self.clock()
+        
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return response
+                del self._entries[cache_key]
+            
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT response, expires_at FROM llm_responses WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._store_in_memory(cache_key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            
+            self.misses += 1
+            return None
+    
+    def set(self, cache_key: str, response: str):
+        """Cache an answer in memory and, if configured, in SQLite"""
+        expires_at = self.clock() + self.ttl_seconds
+        
+        with self._lock:
+            self._store_in_memory(cache_key, response, expires_at)
+            
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO llm_responses (cache_key, response, expires_at) VALUES (?, ?, ?)",
+                    (cache_key, response, expires_at)
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= PRUNE_EVERY_WRITES:
+                    self._prune_persistent_tier()
+                self._connection.commit()
+    
+    def clear(self):
+        """Drop every cached answer from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM llm_responses")
+                self._connection.commit()
+    
+    def get_stats(self) -> dict:
+        """Hit/miss counters and current memory tier size"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+    
+    def _store_in_memory(self, cache_key: str, response: str, expires_at: float):
+        self._entries[cache_key] = (response, expires_at)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _prune_persistent_tier(self):
+        self._writes_since_prune = 0
+        self._connection.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (self.clock(),))
+        self._connection.execute(
+            "DELETE FROM llm_responses WHERE cache_key NOT IN "
+            "(SELECT cache_key FROM llm_responses ORDER BY expires_at DESC LIMIT ?)",
+            (self.persistent_max_entries,)
+        )
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache, persistent when RESPONSE_CACHE_DB is set"""
+    global response_cache
+    
+    if response_cache is None:
+        with _response_cache_lock:
+            if response_cache is None:
+                sqlite_path = os.getenv("RESPONSE_CACHE_DB")
+                response_cache = ResponseCache(sqlite_path=sqlite_path if sqlite_path and sqlite_path.strip() else None)
+    
+    return response_cache
+
+
+def extract_content_tokens(question: str) -> frozenset:
+    """The question's words minus FILLER_WORDS"""
+    return frozenset(token for token in extract_keyword_counts(question) if token not in FILLER_WORDS)
+
+
+def is_same_question(cached_tokens: frozenset, query_tokens: frozenset, min_overlap: float = SEMANTIC_CACHE_MIN_CONTENT_OVERLAP) -> bool:
+    """
+    Whether two similar questions ask the same thing, judged on their content words
+    
+    Words may be added or dropped while the Jaccard overlap stays above
+    min_overlap, but a word swapped for another ("cancel" vs "renew") or a
+    differing negation or question word means a different question.
+    """
+    only_cached = cached_tokens - query_tokens
+    only_query = query_tokens - cached_tokens
+    if only_cached and only_query:
+        return False
+    if (only_cached | only_query) & KEY_WORDS:
+        return False
+    all_tokens = cached_tokens | query_tokens
+    return not all_tokens or len(cached_tokens & query_tokens) / len(all_tokens) >= min_overlap
+
+
+class SemanticResponseCache:
+    """
+    Near-duplicate cache of LLM answers keyed by question vectors
+    
+    Question vectors come from question_matcher.create_hashed_keyword_vector and
+    live in one preallocated matrix, so a lookup is a single matrix-vector
+    product. When full, the oldest entry is overwritten (ring buffer).
+    
+    Cosine similarity alone cannot tell "cancel my subscription" from "renew
+    my subscription" in a long question, so a hit is also checked on content
+    words with is_same_question: near-duplicates may differ in filler words,
+    order, case, punctuation and a few added or dropped words.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        dimensions: int = SEMANTIC_CACHE_DIMENSIONS,
+        similarity_threshold: float = SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+        min_content_overlap: float = SEMANTIC_CACHE_MIN_CONTENT_OVERLAP,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time
+    ):
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self.similarity_threshold = similarity_threshold
+        self.min_content_overlap = min_content_overlap
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._expires_at = np.zeros(max_entries, dtype=float)
+        self._responses = [None] * max_entries
+        self._content_tokens = [None] * max_entries
+        self._size = 0
+        self._next_slot = 0
+        self._lock = threading.Lock()
+    
+    def lookup(self, question: str) -> Optional[Tuple[str, float]]:
+        """Return (cached answer, similarity) for the nearest fresh question above the threshold that asks the same thing"""
+        query_vector = create_hashed_keyword_vector(question, self.dimensions)
+        content_tokens = extract_content_tokens(question)
+        
+        with self._lock:
+            if self._size == 0 or not query_vector.any():
+                self._record_miss()
+                return None
+            
+            similarities = self._vectors[:self._size] @ query_vector
+            similarities[self._expires_at[:self._size] <= self.clock()] = -1
+            candidate_slots = np.flatnonzero(similarities >= self.similarity_threshold)
+            
+            for slot in candidate_slots[np.argsort(-similarities[candidate_slots], kind="stable")]:
+                if is_same_question(self._content_tokens[slot], content_tokens, self.min_content_overlap):
+                    self.hits += 1
+                    semantic_cache_hits.increment()
+                    return self._responses[slot], float(similarities[slot])
+            
+            self._record_miss()
+            return None
+    
+    def _record_miss(self):
+        self.misses += 1
+        semantic_cache_misses.increment()
+    
+    def add(self, question: str, response: str):
+        """Store the vector of an LLM-answered question alongside its answer"""
+        question_vector = create_hashed_keyword_vector(question, self.dimensions)
+        if not question_vector.any():
+            return
+        
+        with self._lock:
+            slot = self._next_slot
+            self._vectors[slot] = question_vector
+            self._expires_at[slot] = self.clock() + self.ttl_seconds
+            self._responses[slot] = response
+            self._content_tokens[slot] = extract_content_tokens(question)
+            self._next_slot = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+    
+    def get_stats(self) -> dict:
+        """Hit/miss counters, hit rate and current number of stored questions"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": self._size
+            }
+
+
+def get_semantic_cache() -> SemanticResponseCache:
+    """Process-wide semantic near-duplicate cache"""
+    global semantic_cache
+    
+    if semantic_cache is None:
+        with _response_cache_lock:
+            if semantic_cache is None:
+                semantic_cache = SemanticResponseCache()
+    
+    return semantic_cache
+
+
+def get_cached_response(question: str) -> Optional[str]:
+    """Look up an answer in the exact cache first, then among near-duplicate questions"""
+    cached_response = get_response_cache().get(build_cache_key(question))
+    if cached_response is not None:
+        return cached_response
+    
+    semantic_match = get_semantic_cache().lookup(question)
+    return semantic_match[0] if semantic_match else None
+
+
+def store_cached_response(question: str, response: str):
+    """Remember an LLM answer in both the exact and the semantic cache"""
+    get_response_cache().set(build_cache_key(question), response)
+    get_semantic_cache().add(question, response)
@@ -0,0 +1,55 @@
+"""
+Stub OpenAI clients for exercising the LLM service without network access
+"""
+
+from types import SimpleNamespace
+
+
+class AsyncStubOpenAIClient:
+    """Mimics AsyncOpenAI's chat.completions.create and tracks peak concurrency"""
+    
+    def __init__(self, response_text="Thoughtful AI automates healthcare workflows.", delay_seconds=0.0, error=None):
+        self.response_text = response_text
+        self.delay_seconds = delay_seconds
+        self.error = error
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+    
+    async def create(self, **kwargs):
+        import asyncio
+        
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.delay_seconds:
+                await asyncio.sleep(self.delay_seconds)
+            if self.error is not None:
+                raise self.error
+        finally:
+            if not kwargs.get("stream"):
+                self.in_flight -= 1
+        
+        if kwargs.get("stream"):
+            return self._stream_chunks()
+        message = SimpleNamespace(content=self.response_text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    
+    async def _stream_chunks(self):
+        try:
+            for word in self.response_text.split(" "):
+                delta = SimpleNamespace(content=word + " ")
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        finally:
+            self.in_flight -= 1
+
+
+def install_async_stub_client(monkeypatch, stub_client):
+    """Route llm_service through a stub client with the API key treated as configured"""
+    import llm_service
+    
+    monkeypatch.setattr(llm_service, "is_openai_api_key_available", lambda: True)
+    monkeypatch.setattr(llm_service, "create_async_openai_client", lambda: stub_client)
+    return stub_client
@@ -0,0 +1,99 @@
+"""
+Test suite for the approximate nearest-neighbour matcher index
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import question_matcher
+from ann_index import evaluate_recall_at_k
+from question_matcher import build_lsh_index, find_best_match, find_top_matches
+
+
+def get_test_questions():
+    """Questions with at least one KB token"""
+    return [
+        'What does EVA do?',
+        'How does phil work?',
+        'Claims processing agent',
+        'What are the benefits of Thoughtful AI?',
+        'payment posting'
+    ]
+
+
+def test_exhaustive_probing_matches_exact_search():
+    """With every bucket probed, ANN re-ranking returns the exact top-k"""
+    build_lsh_index(num_tables=2, num_bits=1)
+    try:
+        print('✅ TESTING ANN AGAINST EXACT SEARCH:')
+        for question in get_test_questions():
+            exact_matches = find_top_matches(question, top_k=3)
+            ann_matches = find_top_matches(question, top_k=3, scoring_mode='ann')
+            
+            assert ann_matches == exact_matches
+            assert find_best_match(question, scoring_mode='ann') == find_best_match(question)
+            print(f'  ✓ "{question}" → {ann_matches[0]}')
+    finally:
+        question_matcher.lsh_index = None
+
+
+def test_recall_report():
+    """Recall report covers recall@k, latency and the index knobs"""
+    build_lsh_index(num_tables=2, num_bits=1)
+    try:
+        report = evaluate_recall_at_k(get_test_questions(), k=2, num_probes=1)
+    finally:
+        question_matcher.lsh_index = None
+    
+    print(f'\n✅ RECALL REPORT: {report}')
+    assert report['recall@2'] == 1.0
+    assert report['num_tables'] == 2 and report['num_bits'] == 1
+    assert report['ann_latency_ms'] >= 0 and report['exact_latency_ms'] >= 0
+    
+    # Both sides see the typo-corrected query, so misspellings do not count as misses
+    build_lsh_index(num_tables=2, num_bits=1)
+    try:
+        typo_report = evaluate_recall_at_k(['eligibilty verfication', 'cliams procesing'], k=2, num_probes=1)
+    finally:
+        question_matcher.lsh_index = None
+    assert typo_report['recall@2'] == 1.0
+
+
+def test_chunked_projection_matches_a_dense_product(monkeypatch):
+    """The batched projection equals the dense product per row, in any chunk size and with term-less rows"""
+    import ann_index
+    import numpy as np
+    from data import THOUGHTFUL_AI_QA
+    
+    entries = list(THOUGHTFUL_AI_QA) + [{'question': '???', 'answer': 'No keywords.'}] + list(THOUGHTFUL_AI_QA)
+    keyword_index = question_matcher.build_matcher_state(entries).keyword_index
+    lsh_index = ann_index.RandomProjectionLSH(keyword_index, num_tables=4, num_bits=8)
+    
+    projected = lsh_index._project_rows(0, len(entries))
+    assert projected.dtype == np.float32
+    for row in range(len(entries)):
+        start, end = lsh_index.row_offsets[row], lsh_index.row_offsets[row + 1]
+        token_ids = lsh_index.row_token_ids[start:end]
+        expected = (lsh_index.row_counts[start:end] * lsh_index.idf_weights[token_ids]) @ lsh_index.projections[token_ids]
+        assert np.allclose(projected[row], expected, atol=1e-5)
+    
+    monkeypatch.setattr(ann_index, 'PROJECTION_CHUNK_BYTES', 1)
+    small_chunks = ann_index.RandomProjectionLSH(keyword_index, num_tables=4, num_bits=8)
+    assert np.array_equal(small_chunks.table_codes, lsh_index.table_codes)
+    assert np.array_equal(small_chunks.table_orders, lsh_index.table_orders)
+
+
+def test_warm_up_builds_the_lsh_index_only_when_configured(monkeypatch):
+    """Without ANN_PREBUILD the LSH index waits for the first ANN query"""
+    monkeypatch.setattr(question_matcher, 'lsh_index', None)
+    
+    question_matcher.warm_up_query_indexes()
+    assert question_matcher.lsh_index is None
+    find_best_match('What does EVA do?', scoring_mode='ann')
+    assert question_matcher.lsh_index is not None
+    
+    monkeypatch.setattr(question_matcher, 'lsh_index', None)
+    monkeypatch.setattr(question_matcher, 'ANN_PREBUILD', True)
+    question_matcher.warm_up_query_indexes()
+    assert question_matcher.lsh_index is not None
@@ -0,0 +1,181 @@
+"""
+Test suite for the headless HTTP API
+"""
+
+import sys
+import os
+import asyncio
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_server
+import llm_service
+import response_cache
+from circuit_breaker import CircuitBreaker
+from data import THOUGHTFUL_AI_QA
+from response_cache import ResponseCache, SemanticResponseCache
+from benchmarks.load_test_api import read_response
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+def reset_response_caches(monkeypatch):
+    """Give a test empty process-wide caches"""
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+
+
+async def send_requests(raw_requests):
+    """Start the API on a free port and send raw requests over one connection"""
+    server = await api_server.start_api_server('127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        responses = []
+        for raw_request in raw_requests:
+            writer.write(raw_request)
+            await writer.drain()
+            responses.append(await read_response(reader))
+        writer.close()
+        return responses
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def build_request(method, path, payload=None, body=None):
+    if body is None:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    return f'{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+
+
+def parse_sse_events(body):
+    """(event, data) pairs from a text/event-stream body"""
+    events = []
+    for block in body.decode('utf-8').strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_ask_answers_from_kb_and_llm(monkeypatch):
+    """KB questions come from the matcher, others from the LLM, on one keep-alive connection"""
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    
+    responses = asyncio.run(send_requests([
+        build_request('POST', '/ask', {'question': 'What does EVA do?'}),
+        build_request('POST', '/ask', {'question': 'How should clinics prepare for an audit?'})
+    ]))
+    
+    (kb_status, kb_headers, kb_body), (llm_status, _, llm_body) = responses
+    kb_answer, llm_answer = json.loads(kb_body), json.loads(llm_body)
+    assert kb_status == llm_status == 200
+    assert kb_headers['connection'] == 'keep-alive'
+    assert kb_answer['answer'] == THOUGHTFUL_AI_QA[0]['answer']
+    assert kb_answer['source'] == 'knowledge_base' and kb_answer['confidence'] > 0
+    assert llm_answer == {'answer': stub_client.response_text, 'source': 'llm', 'confidence': None}
+    print('✅ API: /ask served a KB answer and an LLM answer on one connection')
+
+
+def test_ask_stream_sends_events(monkeypatch):
+    """/ask/stream sends the answer as chunk events followed by a done event"""
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    
+    [(status, headers, body)] = asyncio.run(send_requests([
+        build_request('POST', '/ask/stream', {'question': 'How should clinics prepare for an audit?'})
+    ]))
+    
+    events = parse_sse_events(body)
+    assert status == 200
+    assert headers['content-type'] == 'text/event-stream'
+    assert [event for event, _ in events[:-1]] == ['chunk'] * (len(events) - 1)
+    assert ''.join(data['text'] for _, data in events[:-1]).strip() == stub_client.response_text
+    assert events[-1] == ('done', {'source': 'llm', 'confidence': None})
+
+
+def test_bad_requests_are_rejected(monkeypatch):
+    """Malformed bodies, oversized bodies and unknown routes get JSON errors"""
+    reset_response_caches(monkeypatch)
+    monkeypatch.setattr(api_server, 'API_MAX_BODY_BYTES', 64)
+    
+    for raw_request, expected_status in [
+        (build_request('POST', '/ask', body=b'not json'), 400),
+        (build_request('POST', '/ask', {'question': '   '}), 400),
+        (build_request('POST', '/ask', {'question': 'x' * 100}), 413),
+        (build_request('GET', '/ask'), 405),
+        (build_request('GET', '/missing'), 404)
+    ]:
+        [(status, headers, body)] = asyncio.run(send_requests([raw_request]))
+        assert status == expected_status
+        assert headers['connection'] == 'close'
+        assert 'error' in json.loads(body)
+
+
+def test_unexpected_errors_answer_500_and_are_timed(monkeypatch, caplog):
+    """A failing handler gets a logged 500 (an SSE error event once streaming), an over-long header a 431"""
+    def broken_match(question):
+        raise RuntimeError('index unavailable')
+    
+    monkeypatch.setattr(api_server, 'match_knowledge_base', broken_match)
+    requests_before = api_server.api_request_seconds.count
+    
+    with caplog.at_level('ERROR', logger='api_server'):
+        [(status, headers, body)] = asyncio.run(send_requests([build_request('POST', '/ask', {'question': 'What does EVA do?'})]))
+        [(stream_status, _, stream_body)] = asyncio.run(send_requests([
+            build_request('POST', '/ask/stream', {'question': 'What does EVA do?'})
+        ]))
+    
+    assert (status, headers['connection']) == (500, 'close')
+    assert json.loads(body) == {'error': 'Internal server error'}
+    assert stream_status == 200
+    assert parse_sse_events(stream_body) == [('error', {'error': 'Internal server error'})]
+    assert api_server.api_request_seconds.count - requests_before == 2
+    assert [str(record.exc_info[1]) for record in caplog.records if record.exc_info] == ['index unavailable'] * 2
+    
+    oversized_request = b'GET /health HTTP/1.1\r\nX-Padding: ' + b'x' * 100000 + b'\r\n\r\n'
+    [(status, _, body)] = asyncio.run(send_requests([oversized_request]))
+    assert status == 431
+    assert 'error' in json.loads(body)
+
+
+def test_health_reports_breaker_state(monkeypatch):
+    """/health is degraded while the circuit breaker is open"""
+    breaker = CircuitBreaker(window=2, min_calls=2)
+    monkeypatch.setattr(llm_service, 'llm_circuit_breaker', breaker)
+    
+    [(_, _, healthy_body)] = asyncio.run(send_requests([build_request('GET', '/health')]))
+    breaker.record_failure()
+    breaker.record_failure()
+    [(status, _, degraded_body)] = asyncio.run(send_requests([build_request('GET', '/health')]))
+    
+    assert json.loads(healthy_body)['status'] == 'ok'
+    assert status == 200
+    assert json.loads(degraded_body)['status'] == 'degraded'
+    assert json.loads(degraded_body)['circuit_breaker']['state'] == 'open'
+    assert set(json.loads(degraded_body)['semantic_cache']) == {'hits', 'misses', 'hit_rate', 'entries'}
+
+
+def test_matching_runs_off_the_event_loop(monkeypatch):
+    """/ask and /ask/stream match the knowledge base on a worker thread"""
+    import threading
+    
+    matching_threads = []
+    find_best_match = api_server.find_best_match
+    
+    def recording_find_best_match(question):
+        matching_threads.append(threading.get_ident())
+        return find_best_match(question)
+    
+    monkeypatch.setattr(api_server, 'find_best_match', recording_find_best_match)
+    
+    async def ask_both():
+        responses = await send_requests([
+            build_request('POST', '/ask', {'question': 'What does EVA do?'}),
+            build_request('POST', '/ask/stream', {'question': 'What does EVA do?'})
+        ])
+        return threading.get_ident(), responses
+    
+    loop_thread, responses = asyncio.run(ask_both())
+    assert [status for status, _, _ in responses] == [200, 200]
+    assert len(matching_threads) == 2 and loop_thread not in matching_threads
@@ -0,0 +1,112 @@
+"""
+Test suite for windowed chat history and compressed archiving of old turns
+"""
+
+import sys
+import os
+import contextlib
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from chat_history import archive_oldest_messages, compress_messages, count_messages, decompress_messages, get_recent_messages
+
+
+def make_messages(count, start=0):
+    return [{"role": "user" if index % 2 == 0 else "assistant", "content": f"message {index} ✓"} for index in range(start, start + count)]
+
+
+def test_compression_round_trip():
+    """Archived blocks decompress back to the same messages and are smaller than the JSON"""
+    messages = make_messages(50)
+    block = compress_messages(messages)
+    
+    assert decompress_messages(block) == messages
+    assert len(block) < len(str(messages))
+    print(f'✅ COMPRESSION: 50 messages packed into {len(block)} bytes')
+
+
+def test_archive_caps_live_messages():
+    """Live history never exceeds the cap and nothing is lost"""
+    messages, archived = [], []
+    for message in make_messages(250):
+        messages.append(message)
+        archive_oldest_messages(messages, archived, max_live_messages=100, block_size=40)
+        assert len(messages) <= 100
+    
+    assert count_messages(messages, archived) == 250
+    assert len(archived) == 4
+    assert get_recent_messages(messages, archived, 250) == make_messages(250)
+
+
+def test_recent_messages_span_archive_and_live():
+    """A window reaching into the archive returns messages oldest first and in order"""
+    messages, archived = make_messages(130), []
+    archive_oldest_messages(messages, archived, max_live_messages=50, block_size=40)
+    
+    assert get_recent_messages(messages, archived, 10) == make_messages(10, start=120)
+    assert get_recent_messages(messages, archived, 75) == make_messages(75, start=55)
+    assert get_recent_messages(messages, archived, 0) == []
+
+
+def test_only_overlapping_blocks_are_decompressed(monkeypatch):
+    """Rendering a short window into the archive leaves older blocks compressed"""
+    import chat_history
+    messages, archived = make_messages(200), []
+    archive_oldest_messages(messages, archived, max_live_messages=40, block_size=40)
+    decompressed = []
+    original = chat_history.decompress_messages
+    monkeypatch.setattr(chat_history, 'decompress_messages', lambda block: decompressed.append(block) or original(block))
+    
+    get_recent_messages(messages, archived, 50)
+    assert decompressed == [archived[-1][1]]
+
+
+class FakeStreamlit:
+    """Just enough of streamlit for display_all_chat_messages"""
+    
+    def __init__(self, clicked=False):
+        self.session_state = SimpleNamespace(messages=[], archived_messages=[], visible_message_count=main.CHAT_HISTORY_VISIBLE_MESSAGES)
+        self.clicked = clicked
+        self.buttons = []
+        self.rendered = []
+    
+    def button(self, label, key=None):
+        self.buttons.append(label)
+        return self.clicked
+    
+    def chat_message(self, role):
+        return contextlib.nullcontext()
+    
+    def markdown(self, text):
+        self.rendered.append(text)
+
+
+def test_display_renders_only_the_window(monkeypatch):
+    """Long conversations render the latest window plus a load-earlier button"""
+    fake_st = FakeStreamlit()
+    monkeypatch.setattr(main, 'st', fake_st)
+    for message in make_messages(300):
+        fake_st.session_state.messages.append(message)
+        main.archive_old_messages()
+    
+    main.display_all_chat_messages()
+    
+    visible = main.CHAT_HISTORY_VISIBLE_MESSAGES
+    assert len(fake_st.session_state.messages) <= main.CHAT_HISTORY_MAX_LIVE_MESSAGES
+    assert fake_st.rendered == [message["content"] for message in make_messages(visible, start=300 - visible)]
+    assert fake_st.buttons == [f'Load earlier messages ({300 - visible} more)']
+    print(f'✅ WINDOW: rendered {len(fake_st.rendered)} of 300 messages')
+
+
+def test_load_earlier_grows_the_window(monkeypatch):
+    """Clicking the button renders another step of older messages"""
+    fake_st = FakeStreamlit(clicked=True)
+    fake_st.session_state.messages = make_messages(60)
+    monkeypatch.setattr(main, 'st', fake_st)
+    
+    main.display_all_chat_messages()
+    
+    expected = main.CHAT_HISTORY_VISIBLE_MESSAGES + main.CHAT_HISTORY_LOAD_MORE_STEP
+    assert fake_st.session_state.visible_message_count == expected
+    assert len(fake_st.rendered) == min(expected, 60)
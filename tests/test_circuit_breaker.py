@@ -0,0 +1,87 @@
+"""
+Test suite for the upstream LLM circuit breaker
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_service
+import response_cache
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from data import THOUGHTFUL_AI_QA
+from llm_service import get_error_fallback_message, get_llm_response, get_llm_response_streaming
+from response_cache import ResponseCache, SemanticResponseCache
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_probes_and_recovers():
+    """Failures open the breaker, a single half-open probe decides whether it closes"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, open_seconds=30, clock=clock)
+    
+    breaker.record_success(0.2)
+    breaker.record_success(0.2)
+    breaker.record_failure()
+    assert breaker.get_stats()['state'] == CLOSED
+    breaker.record_failure()
+    
+    assert breaker.get_stats()['state'] == OPEN
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+    
+    clock.now = 31
+    assert breaker.get_stats()['state'] == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    
+    breaker.record_failure()
+    assert breaker.get_stats()['state'] == OPEN
+    
+    clock.now = 62
+    assert breaker.allow_request()
+    breaker.record_success(0.2)
+    
+    stats = breaker.get_stats()
+    print(f'✅ BREAKER: {stats}')
+    assert stats['state'] == CLOSED
+    assert stats['times_opened'] == 2
+    assert stats['rejected_calls'] == 2
+
+
+def test_slow_calls_count_as_failures():
+    """Calls slower than the slow-call threshold push the breaker open"""
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_rate=1.0, slow_call_seconds=5, clock=FakeClock())
+    
+    breaker.record_success(6)
+    breaker.record_success(7)
+    
+    assert breaker.get_stats()['state'] == OPEN
+
+
+def test_open_breaker_fails_fast_without_upstream_calls(monkeypatch):
+    """While open, unmatched questions get a KB or fallback answer and never reach the stub"""
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+    monkeypatch.setattr(llm_service, 'llm_circuit_breaker', CircuitBreaker(min_calls=2, failure_rate=0.5))
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient(error=RuntimeError('upstream down')))
+    
+    assert get_llm_response('Is the service down?') == get_error_fallback_message()
+    assert get_llm_response('Is the service down again?') == get_error_fallback_message()
+    assert llm_service.get_circuit_breaker_stats()['state'] == OPEN
+    calls_before = stub_client.calls
+    
+    assert get_llm_response('What is the weather today?') == get_error_fallback_message()
+    assert ''.join(get_llm_response_streaming('How do I reach sales?')) == get_error_fallback_message()
+    assert get_llm_response('Does PHIL post payments?') == THOUGHTFUL_AI_QA[2]['answer']
+    assert stub_client.calls == calls_before
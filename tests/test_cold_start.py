@@ -0,0 +1,61 @@
+"""
+Test suite for cold-start import cost and lazy loading of heavy dependencies
+"""
+
+import sys
+import os
+import subprocess
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.profile_imports import REPO_ROOT, profile_import
+from lazy_imports import LazyModule
+
+# Import time of the app's own modules, third-party UI framework excluded
+COLD_IMPORT_BUDGET_MS = 100
+
+
+def test_entry_points_skip_heavy_dependencies():
+    """Importing the UI or the API does not load NumPy, the OpenAI SDK or dotenv"""
+    for module_name in ('main', 'api_server', 'llm_service'):
+        profile = profile_import(module_name)
+        assert profile['heavy_dependencies_loaded'] == [], module_name
+        print(f'✅ COLD START: {module_name} imports in {profile["total_ms"]:.0f}ms without heavy dependencies')
+
+
+def test_cold_import_budget():
+    """The app's own import cost stays within budget, excluding Streamlit itself"""
+    profile = profile_import('main')
+    streamlit_ms = next(entry['cumulative_ms'] for entry in profile['slowest_cumulative'] if entry['module'] == 'streamlit')
+    app_ms = profile['total_ms'] - streamlit_ms
+    
+    print(f'✅ COLD START: app modules {app_ms:.0f}ms (budget {COLD_IMPORT_BUDGET_MS}ms), streamlit {streamlit_ms:.0f}ms')
+    assert app_ms <= COLD_IMPORT_BUDGET_MS
+
+
+def test_lazy_module_loads_on_first_use():
+    """The stand-in imports on first attribute access and then behaves like the module"""
+    lazy_colorsys = LazyModule('colorsys')
+    assert not lazy_colorsys._is_loaded()
+    
+    assert lazy_colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert lazy_colorsys._is_loaded()
+    assert 'rgb_to_hsv' in vars(lazy_colorsys)
+
+    # Module attributes named like the stand-in's helpers must reach the module
+    lazy_json = LazyModule('json')
+    assert lazy_json.load is __import__('json').load
+
+
+def test_background_warmup_loads_dependencies():
+    """The warm-up thread builds the matcher index, importing NumPy off the request path"""
+    script = (
+        "import sys, warmup, question_matcher\n"
+        "assert 'numpy' not in sys.modules\n"
+        "warmup.start_background_warmup().join()\n"
+        "assert warmup.start_background_warmup() is warmup.warmup_thread\n"
+        "print('numpy' in sys.modules, question_matcher.matcher_state is not None)\n"
+    )
+    environment = {key: value for key, value in os.environ.items() if key != 'OPENAI_API_KEY'}
+    completed = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, env=environment, capture_output=True, text=True, check=True)
+    
+    assert completed.stdout.split() == ['True', 'True']
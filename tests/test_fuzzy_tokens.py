@@ -0,0 +1,75 @@
+"""
+Test suite for typo-tolerant query token correction
+"""
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fuzzy_tokens
+import question_matcher
+from benchmarks.synthetic_kb import generate_synthetic_kb
+from data import THOUGHTFUL_AI_QA
+from fuzzy_tokens import TrigramTokenIndex, bounded_edit_distance, get_max_edit_distance
+from question_matcher import build_inverted_index, find_best_match, find_best_matches_batch, get_fuzzy_token_index
+
+
+def test_bounded_edit_distance():
+    """Insertions, deletions, substitutions and adjacent swaps each cost one edit, capped at the bound"""
+    assert bounded_edit_distance('phill', 'phil', 1) == 1
+    assert bounded_edit_distance('eligibilty', 'eligibility', 2) == 1
+    assert bounded_edit_distance('cliams', 'claims', 1) == 1
+    assert bounded_edit_distance('posting', 'posting', 1) == 0
+    assert bounded_edit_distance('payment', 'agent', 1) == 2
+    assert bounded_edit_distance('verification', 'eva', 2) == 3
+
+
+def test_kb_typos_are_corrected():
+    """Misspelled KB words resolve to the KB token, short and unrelated words are left alone"""
+    fuzzy_index = get_fuzzy_token_index()
+    
+    corrections = {token: fuzzy_index.correct(token) for token in ['phill', 'eligibilty', 'verfication', 'procesing', 'cliams']}
+    print(f'✅ FUZZY: {corrections}')
+    assert corrections == {
+        'phill': 'phil', 'eligibilty': 'eligibility', 'verfication': 'verification', 'procesing': 'processing', 'cliams': 'claims'
+    }
+    assert fuzzy_index.correct('posting') == 'posting'
+    assert fuzzy_index.correct('evaa') is None
+    assert fuzzy_index.correct('weather') is None
+
+
+def test_typos_reach_the_kb_answer(monkeypatch):
+    """A misspelled question matches like the correct one, in the scalar and batch paths"""
+    typo_questions = ['eligibilty verfication', 'PHILL paymnet postng', 'cliams procesing']
+    expected = [find_best_match(question) for question in ['eligibility verification', 'phil payment posting', 'claims processing']]
+    
+    assert [find_best_match(question) for question in typo_questions] == expected
+    assert find_best_matches_batch(typo_questions) == expected
+    assert expected[0][0] == THOUGHTFUL_AI_QA[0]['answer']
+    
+    monkeypatch.setattr(question_matcher, 'FUZZY_MATCH_ENABLED', False)
+    assert find_best_match('eligibilty verfication') is None
+
+
+def test_trigram_filter_matches_bruteforce(monkeypatch):
+    """On a large vocabulary the trigram candidates give the same best distance as scanning every token"""
+    keyword_index = build_inverted_index([qa['question'] for qa in generate_synthetic_kb(5000)])
+    fuzzy_index = TrigramTokenIndex(keyword_index)
+    random_state = random.Random(0)
+    long_tokens = [token for token in keyword_index.vocabulary if len(token) >= 6]
+    
+    for _ in range(50):
+        letters = list(random_state.choice(long_tokens))
+        letters.insert(random_state.randrange(len(letters)), 'x')
+        del letters[random_state.randrange(len(letters))]
+        typo = ''.join(letters)
+        max_distance = get_max_edit_distance(typo)
+        
+        best_distance = min(bounded_edit_distance(typo, token, max_distance) for token in keyword_index.vocabulary)
+        correction = fuzzy_index.find_correction(typo)
+        assert (bounded_edit_distance(typo, correction, max_distance) if correction else max_distance + 1) == best_distance
+        
+        monkeypatch.setattr(fuzzy_tokens, 'rapidfuzz_process', None)
+        assert fuzzy_index.find_correction(typo) == correction
+        monkeypatch.undo()
@@ -0,0 +1,213 @@
+"""
+Test suite for incremental Q&A upserts, deletes and compaction
+"""
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import question_matcher
+from benchmarks.synthetic_kb import generate_synthetic_kb
+from data import THOUGHTFUL_AI_QA
+from question_matcher import (
+    build_matcher_state,
+    compact_question_matching,
+    delete_qa_entry,
+    find_best_match,
+    find_best_matches_batch,
+    find_top_matches,
+    get_qa_entry,
+    initialize_question_matching,
+    publish_matcher_state,
+    upsert_qa_entry
+)
+
+PUBLISHED_GLOBALS = ['matcher_state', 'qa_dataset', 'precomputed_qa_embeddings', 'normalized_qa_embeddings', 'keyword_index']
+
+
+def publish_fresh_state(monkeypatch, qa_entries):
+    """Publish a state built for qa_entries; monkeypatch puts the original back afterwards"""
+    for name in PUBLISHED_GLOBALS:
+        monkeypatch.setattr(question_matcher, name, getattr(question_matcher, name))
+    # No background compaction unless a test asks for it, so nothing publishes after teardown
+    monkeypatch.setattr(question_matcher, 'MATCHER_COMPACTION_DELTA_ENTRIES', 10 ** 9)
+    monkeypatch.setattr(question_matcher, 'MATCHER_COMPACTION_TOMBSTONE_FRACTION', 1.0)
+    state = build_matcher_state([dict(qa) for qa in qa_entries])
+    publish_matcher_state(state)
+    return state
+
+
+def test_upsert_adds_and_replaces_entries(monkeypatch):
+    """New and edited entries are served by every scoring path without rebuilding the main index"""
+    base_state = publish_fresh_state(monkeypatch, THOUGHTFUL_AI_QA)
+    
+    upsert_qa_entry('How do I reset my portal password?', 'Use the forgot password link.', entry_id='portal-password')
+    upsert_qa_entry(THOUGHTFUL_AI_QA[0]['question'], 'EVA now verifies eligibility in seconds.')
+    state = initialize_question_matching()
+    
+    assert state.keyword_index is base_state.keyword_index
+    assert find_best_match('reset portal password')[0] == 'Use the forgot password link.'
+    assert find_best_match('reset portal password', scoring_mode='ann')[0] == 'Use the forgot password link.'
+    assert find_best_match('What does EVA do?')[0] == 'EVA now verifies eligibility in seconds.'
+    assert find_best_match('What does EVA do?', scoring_mode='dense')[0] == 'EVA now verifies eligibility in seconds.'
+    assert find_best_matches_batch(['What does EVA do?', 'reset portal password']) == [
+        find_best_match('What does EVA do?'), find_best_match('reset portal password')
+    ]
+    # Lookups holding the old state keep its answers
+    assert base_state.qa_dataset[0]['answer'] == THOUGHTFUL_AI_QA[0]['answer']
+    print('✅ UPSERT: new and replaced entries served from the delta segment')
+
+
+def test_delete_hides_entries(monkeypatch):
+    """Deleted entries stop matching in every scoring path, unknown keys are reported"""
+    publish_fresh_state(monkeypatch, THOUGHTFUL_AI_QA)
+    eva_question = THOUGHTFUL_AI_QA[0]['question']
+    
+    assert delete_qa_entry(eva_question)
+    assert not delete_qa_entry(eva_question)
+    assert not delete_qa_entry('no such entry')
+    
+    for scoring_mode in question_matcher.SCORING_MODES:
+        answers = [get_qa_entry(initialize_question_matching(), qa_id)['answer']
+                   for qa_id, _ in find_top_matches('eligibility verification agent EVA', top_k=10, scoring_mode=scoring_mode)]
+        assert THOUGHTFUL_AI_QA[0]['answer'] not in answers
+    assert find_best_matches_batch(['eligibility verification agent EVA'])[0] is None
+    
+    upsert_qa_entry('Is EVA still available?', 'EVA was retired.', entry_id='eva-status')
+    assert delete_qa_entry('eva-status')
+    assert find_best_match('Is EVA still available?') is None
+
+
+def test_edits_match_a_full_rebuild(monkeypatch):
+    """Random upserts and deletes score exactly like a state rebuilt from the surviving entries"""
+    kb_entries = generate_synthetic_kb(300)
+    publish_fresh_state(monkeypatch, kb_entries)
+    random_state = random.Random(7)
+    live_entries = {qa['question']: dict(qa) for qa in kb_entries}
+    
+    for step in range(120):
+        question = random_state.choice(list(live_entries))
+        if step % 3 == 0:
+            assert delete_qa_entry(question)
+            del live_entries[question]
+        else:
+            edited = dict(live_entries[question], answer=f'edited answer {step}')
+            upsert_qa_entry(edited['question'], edited['answer'])
+            live_entries[question] = edited
+    
+    def top_answers(state, question, scoring_mode):
+        matches = find_top_matches(question, top_k=len(kb_entries), scoring_mode=scoring_mode, state=state)
+        return [(get_qa_entry(state, qa_id)['answer'], round(score, 12)) for qa_id, score in matches]
+    
+    edited_state = initialize_question_matching()
+    rebuilt_state = build_matcher_state(list(live_entries.values()))
+    questions = [qa['question'] for qa in random_state.sample(kb_entries, 40)]
+    for question in questions:
+        for scoring_mode in ('keyword', 'dense'):
+            edited = top_answers(edited_state, question, scoring_mode)
+            rebuilt = top_answers(rebuilt_state, question, scoring_mode)
+            assert sorted(edited) == sorted(rebuilt)
+    
+    compacted_state = compact_question_matching(background=False)
+    assert compacted_state.delta is None
+    assert len(compacted_state.qa_dataset) == len(live_entries)
+    assert [find_best_match(question) for question in questions] == find_best_matches_batch(questions)
+    print(f'✅ INCREMENTAL: {len(questions)} questions agree with a full rebuild')
+
+
+def test_compaction_starts_in_the_background(monkeypatch):
+    """Passing the delta size limit folds the edits into a rebuilt main index"""
+    publish_fresh_state(monkeypatch, THOUGHTFUL_AI_QA)
+    monkeypatch.setattr(question_matcher, 'MATCHER_COMPACTION_DELTA_ENTRIES', 2)
+    
+    upsert_qa_entry('How do I reset my portal password?', 'Use the forgot password link.')
+    assert initialize_question_matching().delta_size == 1
+    upsert_qa_entry('Where can I download invoices?', 'Invoices are under Billing.')
+    question_matcher.compaction_thread.join()
+    
+    state = initialize_question_matching()
+    assert state.delta is None
+    assert len(state.qa_dataset) == len(THOUGHTFUL_AI_QA) + 2
+    assert find_best_match('download invoices')[0] == 'Invoices are under Billing.'
+
+
+def test_edits_during_compaction_are_replayed(monkeypatch):
+    """Upserts and deletes made while the compacted index builds survive the swap"""
+    kb_entries = generate_synthetic_kb(200)
+    publish_fresh_state(monkeypatch, kb_entries)
+    live_entries = {qa['question']: dict(qa) for qa in kb_entries}
+    
+    def edit(question, answer=None):
+        if answer is None:
+            assert delete_qa_entry(question)
+            del live_entries[question]
+        else:
+            upsert_qa_entry(question, answer)
+            live_entries[question] = {'question': question, 'answer': answer}
+    
+    for qa in kb_entries[:6]:
+        edit(qa['question'], qa['answer'] + ' (edited)')
+    edit(kb_entries[6]['question'])
+    
+    def edit_mid_build(qa_entries):
+        state = build_matcher_state(qa_entries)
+        # Runs without the edit lock held, or these calls would deadlock
+        edit('How do I reset my portal password?', 'Use the forgot password link.')
+        edit(kb_entries[0]['question'], 'edited again while compacting')
+        edit(kb_entries[1]['question'])
+        edit(kb_entries[10]['question'])
+        edit(kb_entries[11]['question'], 'replaced while compacting')
+        edit('Where can I download invoices?', 'Invoices are under Billing.')
+        edit('Where can I download invoices?')
+        return state
+    
+    monkeypatch.setattr(question_matcher, 'build_matcher_state', edit_mid_build)
+    compacted_state = compact_question_matching(background=False)
+    monkeypatch.setattr(question_matcher, 'build_matcher_state', build_matcher_state)
+    
+    assert compacted_state is initialize_question_matching()
+    assert compacted_state.delta_size == 4
+    rebuilt_state = build_matcher_state(list(live_entries.values()))
+    for question in [qa['question'] for qa in kb_entries[:20]] + ['reset portal password', 'download invoices']:
+        for scoring_mode in ('keyword', 'dense'):
+            compacted = [(get_qa_entry(compacted_state, qa_id)['answer'], round(score, 12))
+                         for qa_id, score in find_top_matches(question, top_k=len(kb_entries), scoring_mode=scoring_mode)]
+            rebuilt = [(get_qa_entry(rebuilt_state, qa_id)['answer'], round(score, 12))
+                       for qa_id, score in find_top_matches(question, top_k=len(kb_entries), scoring_mode=scoring_mode, state=rebuilt_state)]
+            assert sorted(compacted) == sorted(rebuilt)
+    
+    # Keys still resolve to the replayed entries, and deleted keys stay deleted
+    assert not delete_qa_entry(kb_entries[1]['question'])
+    assert not delete_qa_entry('Where can I download invoices?')
+    assert delete_qa_entry(kb_entries[11]['question'])
+    assert delete_qa_entry('How do I reset my portal password?')
+    assert find_best_match('reset portal password') is None
+    assert len(compact_question_matching(background=False).qa_dataset) == len(live_entries) - 2
+
+
+def test_edits_never_scan_the_main_entries(monkeypatch):
+    """The first upsert or delete after a build decodes only the rows whose key hash matches"""
+    from kb_store import CompactQAStore
+    
+    kb_entries = generate_synthetic_kb(2000)
+    publish_fresh_state(monkeypatch, kb_entries)
+    decoded_rows = []
+    get_row = CompactQAStore.__getitem__
+    
+    def counting_get_row(store, index):
+        decoded_rows.append(index)
+        return get_row(store, index)
+    
+    def refuse_iteration(store):
+        raise AssertionError('an edit iterated the whole store')
+    
+    monkeypatch.setattr(CompactQAStore, '__getitem__', counting_get_row)
+    monkeypatch.setattr(CompactQAStore, '__iter__', refuse_iteration)
+    
+    upsert_qa_entry(kb_entries[5]['question'], 'edited answer')
+    assert delete_qa_entry(kb_entries[7]['question'])
+    assert not delete_qa_entry('no such entry')
+    assert not delete_qa_entry(kb_entries[7]['question'])
+    assert decoded_rows == [5, 7]
+    assert find_best_match(kb_entries[5]['question'])[0] == 'edited answer'
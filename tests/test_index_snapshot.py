@@ -0,0 +1,120 @@
+"""
+Test suite for persisted matcher index snapshots
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import question_matcher
+from data import THOUGHTFUL_AI_QA
+from index_snapshot import compute_dataset_hash, get_snapshot_path, load_snapshot, save_snapshot
+from question_matcher import find_best_match, find_top_matches
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_test_questions():
+    """Questions used to compare rebuilt and snapshot-loaded indexes"""
+    return ['What does EVA do?', 'How does phil work?', 'payment posting', 'What is the weather today?']
+
+
+def reset_question_matching():
+    """Drop the in-process index so the next lookup initializes again"""
+    question_matcher.matcher_state = None
+
+
+def test_snapshot_roundtrip_and_staleness():
+    """Saved arrays load back memory-mapped, and a different dataset hash misses"""
+    arrays = {"values": np.arange(10), "tokens": np.array(["eva", "cam"])}
+    dataset_hash = compute_dataset_hash(THOUGHTFUL_AI_QA)
+    
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        save_snapshot(snapshot_dir, dataset_hash, arrays)
+        loaded = load_snapshot(snapshot_dir, dataset_hash)
+        
+        assert isinstance(loaded["values"], np.memmap)
+        assert loaded["values"].tolist() == list(range(10))
+        assert loaded["tokens"].tolist() == ["eva", "cam"]
+        
+        changed_hash = compute_dataset_hash(THOUGHTFUL_AI_QA[:-1])
+        assert changed_hash != dataset_hash
+        assert load_snapshot(snapshot_dir, changed_hash) is None
+        
+        save_snapshot(snapshot_dir, changed_hash, arrays)
+        assert not os.path.exists(get_snapshot_path(snapshot_dir, dataset_hash))
+
+
+def test_damaged_snapshot_is_replaced():
+    """A snapshot missing one of its arrays is rebuilt over instead of blocking every save"""
+    arrays = {"values": np.arange(10), "tokens": np.array(["eva", "cam"])}
+    dataset_hash = compute_dataset_hash(THOUGHTFUL_AI_QA)
+    
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        snapshot_path = save_snapshot(snapshot_dir, dataset_hash, arrays)
+        os.remove(os.path.join(snapshot_path, "values.npy"))
+        assert load_snapshot(snapshot_dir, dataset_hash) is None
+        
+        assert save_snapshot(snapshot_dir, dataset_hash, arrays) == snapshot_path
+        assert load_snapshot(snapshot_dir, dataset_hash)["values"].tolist() == list(range(10))
+        assert os.listdir(snapshot_dir) == [os.path.basename(snapshot_path)]
+
+
+def test_vocabulary_is_stored_unpadded():
+    """One long token does not pad every other token in the saved vocabulary"""
+    qa_entries = [{'question': f'What does agent {number} automate?', 'answer': 'Claims.'} for number in range(500)]
+    qa_entries.append({'question': 'x' * 2000, 'answer': 'A very long token.'})
+    state = question_matcher.build_matcher_state(qa_entries)
+    arrays = question_matcher.snapshot_arrays_from_index(
+        state.precomputed_qa_embeddings, state.normalized_qa_embeddings, state.keyword_index, state.entry_key_index
+    )
+    
+    token_bytes = sum(len(token.encode('utf-8')) for token in state.keyword_index.vocabulary)
+    assert arrays['vocabulary_buffer'].nbytes == token_bytes
+    _, _, index, _ = question_matcher.index_from_snapshot_arrays(arrays)
+    assert index.vocabulary == state.keyword_index.vocabulary
+
+
+def test_matcher_starts_from_snapshot():
+    """The second initialization maps the snapshot and gives identical matches"""
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        os.environ["MATCHER_SNAPSHOT_DIR"] = snapshot_dir
+        try:
+            reset_question_matching()
+            rebuilt = [find_top_matches(question) for question in get_test_questions()]
+            assert os.path.isdir(get_snapshot_path(snapshot_dir, compute_dataset_hash(THOUGHTFUL_AI_QA)))
+            
+            reset_question_matching()
+            loaded = [find_top_matches(question) for question in get_test_questions()]
+            
+            print('✅ TESTING SNAPSHOT STARTUP:')
+            assert isinstance(question_matcher.keyword_index.posting_qa_ids, np.memmap)
+            assert loaded == rebuilt
+            assert find_best_match('What does EVA do?', scoring_mode='dense') is not None
+            print(f'  ✓ {len(loaded)} questions matched identically from snapshot')
+        finally:
+            del os.environ["MATCHER_SNAPSHOT_DIR"]
+            reset_question_matching()
+
+
+def test_fresh_process_loads_existing_snapshot():
+    """A new process whose first NumPy call is the snapshot load answers from the existing snapshot"""
+    script = (
+        "import sys, question_matcher\n"
+        "answer = question_matcher.find_best_match('What does EVA do?')\n"
+        "assert answer is not None, answer\n"
+        "print(type(question_matcher.keyword_index.posting_qa_ids).__name__)\n"
+    )
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        environment = dict(os.environ, MATCHER_SNAPSHOT_DIR=snapshot_dir)
+        runs = [
+            subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, env=environment, capture_output=True, text=True)
+            for _ in range(2)
+        ]
+    
+    assert [run.returncode for run in runs] == [0, 0], runs[1].stderr
+    assert runs[1].stdout.strip() == 'memmap'
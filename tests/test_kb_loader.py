@@ -0,0 +1,121 @@
+"""
+Test suite for the streaming knowledge base loader
+"""
+
+import sys
+import os
+import csv
+import gzip
+import json
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import data
+import question_matcher
+from data import THOUGHTFUL_AI_QA
+from kb_loader import KBLoadError, LoadReport, iter_kb_file, load_kb_file
+
+MULTILINE_ENTRY = {'question': 'Does CAM handle "denied" claims?', 'answer': 'Yes.\nIt resubmits them, too.', 'id': 'cam-denials'}
+
+
+def write_jsonl(path, records, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8') as kb_file:
+        for record in records:
+            kb_file.write((record if isinstance(record, str) else json.dumps(record)) + '\n')
+
+
+def write_csv(path, records):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as kb_file:
+        writer = csv.DictWriter(kb_file, fieldnames=['id', 'question', 'answer'])
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def test_jsonl_gzip_and_csv_load_the_same_entries(tmp_path):
+    """Plain JSONL, gzipped JSONL and CSV (with a BOM and a multi-line field) give identical stores"""
+    entries = [dict(qa) for qa in THOUGHTFUL_AI_QA] + [MULTILINE_ENTRY]
+    write_jsonl(tmp_path / 'kb.jsonl', entries)
+    write_jsonl(tmp_path / 'kb.jsonl.gz', entries, compress=True)
+    write_csv(tmp_path / 'kb.csv', entries)
+    
+    for name in ('kb.jsonl', 'kb.jsonl.gz', 'kb.csv'):
+        store, report = load_kb_file(str(tmp_path / name))
+        assert list(store) == entries
+        assert (report.loaded, report.skipped) == (len(entries), 0)
+    print(f'✅ KB LOADER: {len(entries)} entries from JSONL, gzip and CSV')
+
+
+def test_invalid_records_raise_or_are_skipped(tmp_path):
+    """Bad records name their line, or are counted and listed up to the cap when skipping"""
+    kb_path = str(tmp_path / 'kb.jsonl')
+    write_jsonl(kb_path, [THOUGHTFUL_AI_QA[0], '{"question": "No answer?"}', 'not json', '[1, 2]', THOUGHTFUL_AI_QA[1]])
+    
+    with pytest.raises(KBLoadError, match=r'kb\.jsonl:2: missing or empty answer'):
+        list(iter_kb_file(kb_path))
+    
+    report = LoadReport(max_problems=2)
+    loaded = list(iter_kb_file(kb_path, skip_invalid=True, report=report))
+    assert loaded == THOUGHTFUL_AI_QA[:2]
+    assert (report.loaded, report.skipped, len(report.problems)) == (2, 3, 2)
+    
+    csv_path = tmp_path / 'kb.csv'
+    csv_path.write_text('q,a\nWhat?,That.\n')
+    with pytest.raises(KBLoadError, match='CSV header'):
+        list(iter_kb_file(str(csv_path)))
+    with pytest.raises(KBLoadError, match='unsupported'):
+        list(iter_kb_file(str(tmp_path / 'kb.xml')))
+
+
+def test_served_kb_skips_and_logs_invalid_records_once(tmp_path, monkeypatch, caplog):
+    """A bad record in the KB_PATH export is skipped while serving and reported a single time"""
+    kb_path = tmp_path / 'kb.jsonl'
+    write_jsonl(kb_path, [THOUGHTFUL_AI_QA[0], 'not json', THOUGHTFUL_AI_QA[1]])
+    monkeypatch.setenv('KB_PATH', str(kb_path))
+    
+    with caplog.at_level('WARNING', logger='kb_loader'):
+        assert list(data.iter_qa_entries()) == THOUGHTFUL_AI_QA[:2]
+        assert data.get_question_count() == 2
+    
+    assert len([record for record in caplog.records if 'skipped 1 invalid records' in record.getMessage()]) == 1
+    assert any('kb.jsonl:2' in record.getMessage() for record in caplog.records)
+
+
+def test_large_exports_stream_in_bounded_memory(tmp_path):
+    """Iterating a large gzipped export holds one record at a time, not the file"""
+    kb_path = str(tmp_path / 'kb.jsonl.gz')
+    records = ({'question': f'What does agent {number} do?', 'answer': f'Agent {number} automates task {number}. ' * 4}
+               for number in range(50000))
+    write_jsonl(kb_path, records, compress=True)
+    
+    tracemalloc.start()
+    try:
+        entry_count = sum(1 for _ in iter_kb_file(kb_path))
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    print(f'✅ STREAMING: {entry_count} entries with a {peak_bytes / 1024:.0f} KiB peak')
+    assert entry_count == 50000
+    assert peak_bytes < 1024 * 1024
+
+
+def test_kb_path_feeds_the_matcher_and_data_helpers(tmp_path, monkeypatch):
+    """With KB_PATH set, the matcher and the lazy data helpers read the export"""
+    kb_path = tmp_path / 'kb.jsonl'
+    write_jsonl(kb_path, [MULTILINE_ENTRY])
+    monkeypatch.setenv('KB_PATH', str(kb_path))
+    
+    state = question_matcher.build_matcher_state(question_matcher.get_default_qa_entries())
+    assert state.qa_dataset[0] == MULTILINE_ENTRY
+    assert question_matcher.find_top_matches('denied claims', state=state)[0][0] == 0
+    
+    questions = data.get_all_questions()
+    assert iter(questions) is questions
+    assert list(questions) == [MULTILINE_ENTRY['question']]
+    assert list(data.get_all_answers()) == [MULTILINE_ENTRY['answer']]
+    assert data.get_question_count() == 1
+    
+    monkeypatch.delenv('KB_PATH')
+    assert data.get_question_count() == len(THOUGHTFUL_AI_QA)
@@ -0,0 +1,47 @@
+"""
+Test suite for the compact Q&A store
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from benchmarks.kb_memory import measure_kb_memory
+from benchmarks.synthetic_kb import generate_synthetic_kb
+from data import THOUGHTFUL_AI_QA
+from kb_store import CompactQAStore
+from question_matcher import build_matcher_state
+
+
+def test_store_round_trips_entries():
+    """Entries read back as the same dicts, including non-ASCII text and optional ids"""
+    entries = [dict(qa) for qa in THOUGHTFUL_AI_QA]
+    entries.append({'question': '¿Qué hace EVA?', 'answer': 'Verifica la elegibilidad ✅', 'id': 'eva-es'})
+    store = CompactQAStore.from_entries(iter(entries))
+    
+    assert len(store) == len(entries)
+    assert list(store) == entries
+    assert [store[index] for index in range(len(store))] == entries
+    assert store[-1]['id'] == 'eva-es'
+    assert list(store.questions) == [qa['question'] for qa in entries]
+    assert CompactQAStore.from_entries(store) is store
+    with pytest.raises(IndexError):
+        store[len(entries)]
+
+
+def test_matcher_state_holds_a_compact_store():
+    """The matcher keeps the KB packed and still hands out answers by QA id"""
+    state = build_matcher_state(THOUGHTFUL_AI_QA)
+    
+    assert isinstance(state.qa_dataset, CompactQAStore)
+    assert state.qa_dataset[2]['answer'] == THOUGHTFUL_AI_QA[2]['answer']
+
+
+def test_compact_store_uses_less_memory_than_dicts():
+    """Packed text and CSR term data take a fraction of the dict and Counter representation"""
+    memory = measure_kb_memory(generate_synthetic_kb(2000))
+    print(f"✅ KB MEMORY: {memory['dict_entries_bytes_per_entry']:.0f} -> {memory['compact_store_bytes_per_entry']:.0f} bytes/entry")
+    
+    assert memory['text_reduction'] > 2
+    assert memory['term_reduction'] > 2
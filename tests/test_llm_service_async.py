@@ -0,0 +1,159 @@
+"""
+Test suite for the asyncio LLM service
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_service
+import response_cache
+from llm_service import get_error_fallback_message, get_llm_response_async, get_llm_response_streaming_async
+from response_cache import ResponseCache, SemanticResponseCache
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+def reset_response_caches(monkeypatch):
+    """Give a test empty process-wide caches"""
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+
+
+async def collect_stream(question):
+    """Join every chunk of an async streamed answer"""
+    return ''.join([chunk async for chunk in get_llm_response_streaming_async(question)])
+
+
+def test_async_response_and_stream(monkeypatch):
+    """Async completion and async streaming return the upstream answer"""
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    
+    answer = asyncio.run(get_llm_response_async('What can Thoughtful AI automate?'))
+    streamed = asyncio.run(collect_stream('How do agents reduce claim denials?'))
+    
+    assert answer == stub_client.response_text
+    assert streamed.strip() == stub_client.response_text
+    assert asyncio.run(get_llm_response_async('   ')).startswith('Please ask me a question')
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    """No more than LLM_MAX_CONCURRENT_REQUESTS upstream calls are outstanding"""
+    reset_response_caches(monkeypatch)
+    monkeypatch.setattr(llm_service, 'LLM_MAX_CONCURRENT_REQUESTS', 3)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient(delay_seconds=0.02))
+    
+    async def ask_many():
+        completions = [get_llm_response_async(f'Question number {index} about billing {index}') for index in range(10)]
+        streams = [collect_stream(f'Streaming question {index} about onboarding {index}') for index in range(10)]
+        return await asyncio.gather(*completions, *streams)
+    
+    answers = asyncio.run(ask_many())
+    
+    print(f'✅ ASYNC: {stub_client.calls} calls, peak concurrency {stub_client.peak_in_flight}')
+    assert stub_client.calls == 20
+    assert stub_client.peak_in_flight <= 3
+    assert all(answer.strip() == stub_client.response_text for answer in answers)
+
+
+def test_async_upstream_failure_falls_back(monkeypatch):
+    """Upstream errors become the standard fallback message"""
+    reset_response_caches(monkeypatch)
+    install_async_stub_client(monkeypatch, AsyncStubOpenAIClient(error=RuntimeError('upstream down')))
+    
+    assert asyncio.run(get_llm_response_async('Is anything broken?')) == get_error_fallback_message()
+    assert asyncio.run(collect_stream('Is anything broken now?')) == get_error_fallback_message()
+
+
+def test_blocking_lookups_run_off_the_event_loop(monkeypatch):
+    """Cache reads and writes and breaker-open KB lookups run on worker threads, not the loop thread"""
+    import threading
+    from circuit_breaker import CircuitBreaker
+    
+    reset_response_caches(monkeypatch)
+    install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    calling_threads = {}
+    
+    def record_thread(name, function):
+        def recorded(*args, **kwargs):
+            calling_threads.setdefault(name, set()).add(threading.get_ident())
+            return function(*args, **kwargs)
+        return recorded
+    
+    for name in ('get_cached_response', 'store_cached_response', 'find_best_match'):
+        monkeypatch.setattr(llm_service, name, record_thread(name, getattr(llm_service, name)))
+    
+    async def ask_all():
+        loop_thread = threading.get_ident()
+        await get_llm_response_async('What can Thoughtful AI automate?')
+        await collect_stream('How do agents reduce claim denials?')
+        
+        breaker = CircuitBreaker(window=2, min_calls=2)
+        breaker.record_failure()
+        breaker.record_failure()
+        monkeypatch.setattr(llm_service, 'llm_circuit_breaker', breaker)
+        await get_llm_response_async('Tell me about the EVA eligibility agent')
+        await collect_stream('Tell me about the PHIL payment agent')
+        return loop_thread
+    
+    loop_thread = asyncio.run(ask_all())
+    assert set(calling_threads) == {'get_cached_response', 'store_cached_response', 'find_best_match'}
+    assert all(loop_thread not in threads for threads in calling_threads.values())
+
+
+def test_upstream_outcomes_are_recorded_on_the_breaker(monkeypatch):
+    """Successes and upstream failures are counted, and rate-limited calls are shed without a failure"""
+    from circuit_breaker import CircuitBreaker
+    from rate_limiter import RateLimitExceeded
+    
+    def run_calls(async_client):
+        breaker = CircuitBreaker()
+        monkeypatch.setattr(llm_service, 'llm_circuit_breaker', breaker)
+        completion = asyncio.run(llm_service.call_openai_completion_api_async(async_client, 'What does EVA do?'))
+        
+        async def collect_async_stream():
+            return ''.join([chunk async for chunk in llm_service.call_openai_streaming_api_async(async_client, 'What does EVA do?')])
+        
+        streamed = asyncio.run(collect_async_stream())
+        return completion, streamed, breaker.get_stats()['recent_calls'], breaker.get_stats()['recent_failure_rate']
+    
+    completion, streamed, calls, failure_rate = run_calls(AsyncStubOpenAIClient())
+    assert completion == streamed.strip() == AsyncStubOpenAIClient().response_text
+    assert (calls, failure_rate) == (2, 0.0)
+    
+    error = RuntimeError('upstream down')
+    assert run_calls(AsyncStubOpenAIClient(error=error)) == (None, get_error_fallback_message(), 2, 1.0)
+    
+    error = RateLimitExceeded('shed locally')
+    assert run_calls(AsyncStubOpenAIClient(error=error)) == (None, get_error_fallback_message(), 0, 0.0)
+
+
+def test_sync_callers_share_the_llm_event_loop(monkeypatch):
+    """Synchronous calls from any thread run the async implementation on one background loop"""
+    import threading
+    
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    calling_loops = []
+    create_async_openai_client = llm_service.create_async_openai_client
+    
+    def record_loop():
+        calling_loops.append(asyncio.get_running_loop())
+        return create_async_openai_client()
+    
+    monkeypatch.setattr(llm_service, 'create_async_openai_client', record_loop)
+    answers = []
+    threads = [
+        threading.Thread(target=lambda index=index: answers.append(llm_service.get_llm_response(f'Sync question {index} about claims')))
+        for index in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    streamed = ''.join(llm_service.get_llm_response_streaming('Sync streaming question about payments'))
+    
+    assert answers == [stub_client.response_text] * 3
+    assert streamed.strip() == stub_client.response_text
+    assert set(calling_loops) == {llm_service.get_llm_event_loop()}
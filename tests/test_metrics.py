@@ -0,0 +1,102 @@
+"""
+Test suite for latency instrumentation and metrics export
+"""
+
+import sys
+import os
+import contextlib
+import json
+import urllib.request
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import metrics
+import response_cache
+from llm_service import get_llm_response_streaming
+from metrics import Histogram, get_metrics_snapshot, render_prometheus_text, reset_metrics, start_metrics_server
+from question_matcher import find_best_match
+from response_cache import ResponseCache, SemanticResponseCache
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+def test_histogram_quantiles_are_interpolated():
+    """p50/p95/p99 land in the right buckets and never exceed the largest observation"""
+    histogram = Histogram('test_seconds', 'test')
+    for millisecond in range(1, 101):
+        histogram.observe(millisecond / 1000)
+
+    snapshot = histogram.snapshot()
+    print(f'✅ HISTOGRAM: {snapshot}')
+    assert snapshot['count'] == 100
+    assert 0.025 <= snapshot['p50'] <= 0.05
+    assert 0.05 <= snapshot['p95'] <= 0.1
+    assert snapshot['p99'] <= snapshot['max'] == 0.1
+
+
+def test_chat_stages_are_recorded(monkeypatch):
+    """A RAG hit and an LLM turn fill the stage histograms, hit rate and token counters"""
+    reset_metrics()
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+    install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    fake_st = SimpleNamespace(
+        session_state=SimpleNamespace(messages=[], archived_messages=[]),
+        empty=lambda: SimpleNamespace(markdown=lambda text: None),
+        markdown=lambda text: None,
+        chat_message=lambda role: contextlib.nullcontext()
+    )
+    monkeypatch.setattr(main, 'st', fake_st)
+    monkeypatch.setattr(main, 'get_llm_response_streaming', get_llm_response_streaming)
+
+    main.handle_user_input('What does EVA do?')
+    main.handle_user_input('Can you write me a short poem about invoices?')
+
+    snapshot = get_metrics_snapshot()
+    histograms = snapshot['histograms']
+    assert histograms['chat_turn_seconds']['count'] == 2
+    assert histograms['find_best_match_seconds']['count'] == 2
+    assert histograms['llm_time_to_first_token_seconds']['count'] == 1
+    assert histograms['llm_stream_seconds']['count'] == 1
+    assert histograms['ui_render_seconds']['count'] == 1
+    assert snapshot['rag_hit_rate'] == 0.5
+    assert snapshot['counters']['llm_completion_tokens_total'] > 0
+    assert snapshot['gauges']['llm_circuit_breaker_open'] == 0.0
+
+
+def test_metrics_server_exports_prometheus_and_json(monkeypatch):
+    """The local scrape endpoint serves both formats"""
+    monkeypatch.setattr(metrics, 'metrics_server', None)
+    find_best_match('How does CAM work?')
+    server = start_metrics_server(0)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    try:
+        prometheus_text = urllib.request.urlopen(f'{base_url}/metrics').read().decode('utf-8')
+        json_snapshot = json.loads(urllib.request.urlopen(f'{base_url}/metrics.json').read())
+    finally:
+        server.shutdown()
+
+    assert '# TYPE find_best_match_seconds histogram' in prometheus_text
+    assert 'find_best_match_seconds_bucket{le="+Inf"}' in prometheus_text
+    assert 'find_best_match_seconds_count' in render_prometheus_text()
+    assert json_snapshot['histograms']['find_best_match_seconds']['count'] >= 1
+
+
+def test_metrics_export_is_attempted_once_per_process(monkeypatch, caplog):
+    """A busy METRICS_PORT is logged on the first run and not retried on reruns"""
+    import socket
+
+    monkeypatch.setattr(metrics, 'metrics_server', None)
+    monkeypatch.setattr(metrics, 'metrics_export_started', False)
+    with socket.socket() as busy_socket:
+        busy_socket.bind(('127.0.0.1', 0))
+        busy_socket.listen()
+        monkeypatch.setenv('METRICS_PORT', str(busy_socket.getsockname()[1]))
+
+        with caplog.at_level('WARNING', logger='metrics'):
+            for _ in range(3):
+                metrics.start_metrics_export()
+
+    assert metrics.metrics_server is None
+    assert len([record for record in caplog.records if 'not started' in record.getMessage()]) == 1
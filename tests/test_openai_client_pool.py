@@ -0,0 +1,61 @@
+"""
+Test suite for the pooled OpenAI client
+"""
+
+import sys
+import os
+import threading
+import time
+import weakref
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_service
+from llm_service import create_openai_client
+
+
+def test_client_is_shared_until_api_key_changes(monkeypatch):
+    """Every call reuses one client; a new API key builds a new one"""
+    monkeypatch.setattr(llm_service, '_async_clients', weakref.WeakKeyDictionary())
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-first-key')
+
+    first_client = create_openai_client()
+    assert first_client is not None
+    assert create_openai_client() is first_client
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-second-key')
+    second_client = create_openai_client()
+    assert second_client is not first_client
+    assert second_client.api_key == 'sk-second-key'
+
+    deadline = time.monotonic() + 5
+    while not first_client.is_closed() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert first_client.is_closed()
+    assert not second_client.is_closed()
+
+
+def test_concurrent_callers_share_one_client(monkeypatch):
+    """Racing threads all receive the same pooled client"""
+    monkeypatch.setattr(llm_service, '_async_clients', weakref.WeakKeyDictionary())
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-concurrent-key')
+    clients = []
+    start_barrier = threading.Barrier(8)
+
+    def acquire_client():
+        start_barrier.wait()
+        clients.append(create_openai_client())
+
+    threads = [threading.Thread(target=acquire_client) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_missing_api_key_returns_none(monkeypatch):
+    """Without a key no client is created"""
+    monkeypatch.setattr(llm_service, '_async_clients', weakref.WeakKeyDictionary())
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    assert create_openai_client() is None
@@ -0,0 +1,81 @@
+"""
+Test suite for pre-fork serving with a shared matcher index
+"""
+
+import sys
+import os
+import json
+import signal
+import subprocess
+import tempfile
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import question_matcher
+from config import LLM_REQUESTS_PER_MINUTE
+from data import THOUGHTFUL_AI_QA
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_built_state_is_served_from_the_snapshot(monkeypatch):
+    """With a snapshot directory, even the first build serves memory-mapped arrays"""
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        monkeypatch.setenv('MATCHER_SNAPSHOT_DIR', snapshot_dir)
+        state = question_matcher.build_matcher_state(THOUGHTFUL_AI_QA)
+        
+        assert isinstance(state.normalized_qa_embeddings, np.memmap)
+        assert isinstance(state.keyword_index.posting_qa_ids, np.memmap)
+
+
+def test_worker_rebuilds_keep_the_parent_snapshot(monkeypatch):
+    """A worker saving a snapshot for new data writes to its own directory and leaves the parent's in place"""
+    from index_snapshot import compute_dataset_hash, get_snapshot_path
+    from prefork_server import use_worker_snapshot_dir
+    
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        monkeypatch.setenv('MATCHER_SNAPSHOT_DIR', snapshot_dir)
+        question_matcher.build_matcher_state(THOUGHTFUL_AI_QA)
+        parent_snapshot = get_snapshot_path(snapshot_dir, compute_dataset_hash(THOUGHTFUL_AI_QA))
+        
+        use_worker_snapshot_dir(0)
+        question_matcher.build_matcher_state(THOUGHTFUL_AI_QA[:-1])
+        
+        assert os.path.isdir(parent_snapshot)
+        assert os.path.isdir(get_snapshot_path(os.path.join(snapshot_dir, 'worker-0'), compute_dataset_hash(THOUGHTFUL_AI_QA[:-1])))
+
+
+def post_question(port, question):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/ask', data=json.dumps({'question': question}).encode('utf-8'), method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_workers_share_one_index_and_shut_down():
+    """Forked workers answer from the parent's /dev/shm snapshot and exit with the parent"""
+    environment = {key: value for key, value in os.environ.items() if key not in ('MATCHER_SNAPSHOT_DIR', 'OPENAI_API_KEY')}
+    server = subprocess.Popen(
+        [sys.executable, 'api_server.py', '--port', '0', '--workers', '2'],
+        cwd=REPO_ROOT, env=environment, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        port = int(server.stdout.readline().split(':')[-1].split()[0])
+        answers = [post_question(port, 'What does EVA do?') for _ in range(6)]
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=10) as response:
+            health = json.loads(response.read())
+        worker_pid = health['pid']
+        
+        with open(f'/proc/{worker_pid}/maps') as maps_file:
+            mapped_files = maps_file.read()
+        
+        assert all(answer['answer'] == THOUGHTFUL_AI_QA[0]['answer'] for answer in answers)
+        assert worker_pid != server.pid
+        assert health['rate_limiter']['available_requests'] <= LLM_REQUESTS_PER_MINUTE / 2
+        assert 'normalized_qa_embeddings.npy' in mapped_files
+        print(f'✅ PREFORK: worker {worker_pid} maps the shared snapshot')
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=10) == 0
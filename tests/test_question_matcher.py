@@ -6,7 +6,23 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from question_matcher import find_best_match
+import threading
+
+import numpy as np
+
+import question_matcher
+from data import THOUGHTFUL_AI_QA
+from question_matcher import (
+    calculate_cosine_similarity,
+    calculate_keyword_cosine_similarity,
+    calculate_keyword_similarity,
+    create_keyword_vector,
+    find_best_match,
+    find_best_matches_batch,
+    find_top_matches,
+    initialize_question_matching,
+    reload_question_matching
+)
 
 
 def get_successful_test_cases():
@@ -77,6 +93,127 @@ def test_failed_matches():
     return results
 
 
+def test_inverted_index_matches_bruteforce_scores():
+    """Index lookups should give exactly the multiset Jaccard scores of the full scan"""
+    print('\n✅ TESTING INVERTED INDEX SCORES:')
+    for question in get_successful_test_cases() + get_failed_test_cases():
+        if not question.strip():
+            continue
+        expected = {
+            index: calculate_keyword_similarity(question, qa["question"])
+            for index, qa in enumerate(THOUGHTFUL_AI_QA)
+        }
+        expected = {index: score for index, score in expected.items() if score > 0}
+        indexed = dict(find_top_matches(question, top_k=len(THOUGHTFUL_AI_QA)))
+
+        assert indexed == expected
+        print(f'  ✓ "{question}" → {len(indexed)} candidates')
+
+
+def test_top_k_ordering():
+    """Top-k results are sorted by score and agree with find_best_match"""
+    top_matches = find_top_matches('What does the claims processing agent do?', top_k=3)
+    scores = [score for _, score in top_matches]
+
+    assert len(top_matches) == 3
+    assert scores == sorted(scores, reverse=True)
+    assert find_best_match('What does the claims processing agent do?') == (
+        THOUGHTFUL_AI_QA[top_matches[0][0]]["answer"], top_matches[0][1]
+    )
+    assert find_top_matches('', top_k=3) == []
+
+
+def test_batch_matching_matches_scalar_path():
+    """Batch Jaccard results must equal find_best_match question by question"""
+    questions = get_successful_test_cases() + get_failed_test_cases()
+    batch_results = find_best_matches_batch(questions, chunk_size=4)
+
+    print('\n✅ TESTING BATCH MATCHING:')
+    for question, batch_result in zip(questions, batch_results):
+        assert batch_result == find_best_match(question)
+        print(f'  ✓ "{question}" → {batch_result[1] if batch_result else "NO MATCH"}')
+
+
+def test_batch_cosine_matches_scalar_scores():
+    """Batch cosine scores equal the best scalar keyword cosine score"""
+    questions = get_successful_test_cases()
+    batch_results = find_best_matches_batch(questions, similarity_threshold=0, metric='cosine')
+
+    for question, (answer, score) in zip(questions, batch_results):
+        scalar_scores = [calculate_keyword_cosine_similarity(question, qa["question"]) for qa in THOUGHTFUL_AI_QA]
+        best_index = scalar_scores.index(max(scalar_scores))
+        assert score == scalar_scores[best_index]
+        assert answer == THOUGHTFUL_AI_QA[best_index]["answer"]
+
+
+def test_dense_scoring_mode_matches_cosine_loop():
+    """Dense mode ranks the KB like a loop of calculate_cosine_similarity calls"""
+    print('\n✅ TESTING DENSE SCORING MODE:')
+    for question in get_successful_test_cases():
+        query_vector = create_keyword_vector(question)
+        loop_scores = [
+            calculate_cosine_similarity(query_vector, create_keyword_vector(qa["question"]))
+            for qa in THOUGHTFUL_AI_QA
+        ]
+        dense_matches = find_top_matches(question, top_k=2, scoring_mode='dense')
+        best_index, best_score = dense_matches[0]
+
+        assert np.isclose(best_score, max(loop_scores))
+        assert np.isclose(loop_scores[best_index], max(loop_scores))
+        assert find_best_match(question, scoring_mode='dense')[1] == best_score
+        print(f'  ✓ "{question}" → {best_score:.3f} cosine')
+
+    assert find_best_match('   ', scoring_mode='dense') is None
+
+
+def test_concurrent_initialization_builds_once():
+    """Racing first requests share a single index build"""
+    original_build = question_matcher.build_matcher_state
+    build_calls = []
+    start_barrier = threading.Barrier(8)
+
+    def counting_build(qa_entries):
+        qa_entries = list(qa_entries)
+        build_calls.append(len(qa_entries))
+        return original_build(qa_entries)
+
+    def first_request():
+        start_barrier.wait()
+        find_best_match('What does EVA do?')
+
+    question_matcher.build_matcher_state = counting_build
+    question_matcher.matcher_state = None
+    try:
+        threads = [threading.Thread(target=first_request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        question_matcher.build_matcher_state = original_build
+
+    assert build_calls == [len(THOUGHTFUL_AI_QA)]
+
+
+def test_hot_reload_swaps_index_atomically():
+    """Lookups see the old index until the background rebuild is published"""
+    updated_entries = [dict(qa) for qa in THOUGHTFUL_AI_QA]
+    updated_entries[0]["answer"] = "EVA now verifies eligibility in seconds."
+    old_state = initialize_question_matching()
+
+    try:
+        reload_thread = reload_question_matching(updated_entries)
+        during_reload = find_best_match('What does EVA do?')[0]
+        reload_thread.join()
+
+        assert during_reload in (THOUGHTFUL_AI_QA[0]["answer"], updated_entries[0]["answer"])
+        assert find_best_match('What does EVA do?')[0] == updated_entries[0]["answer"]
+        assert old_state.qa_dataset[0]["answer"] == THOUGHTFUL_AI_QA[0]["answer"]
+        print('\n✅ HOT RELOAD: new answer served after swap')
+    finally:
+        reload_question_matching(THOUGHTFUL_AI_QA, background=False)
+
+
 def calculate_test_statistics(successful_results, failed_results):
     """Calculate and display test statistics"""
     successful_matches = sum(1 for _, _, matched in successful_results if matched)
@@ -0,0 +1,148 @@
+"""
+Test suite for client-side LLM admission control
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import llm_service
+import rate_limiter
+import response_cache
+from circuit_breaker import CircuitBreaker
+from config import MAX_TOKENS
+from llm_service import build_completion_request, create_admitted_completion_async, get_error_fallback_message, get_llm_response
+from rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    RateLimitExceeded,
+    UpstreamRateLimiter,
+    estimate_request_tokens
+)
+from response_cache import ResponseCache, SemanticResponseCache
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+def test_request_estimate_covers_prompt_and_max_tokens():
+    """The token estimate reserves the whole completion allowance on top of the prompt"""
+    estimate = estimate_request_tokens(build_completion_request('What does EVA do?'))
+    assert MAX_TOKENS + 50 < estimate < MAX_TOKENS + 500
+
+
+def test_token_bucket_shapes_bursts():
+    """Once the tokens/min budget is spent, the next request waits for the refill"""
+    limiter = UpstreamRateLimiter(requests_per_minute=6000, tokens_per_minute=6000)
+    limiter.acquire(6000)
+    
+    started = time.perf_counter()
+    limiter.acquire(50)
+    waited = time.perf_counter() - started
+    
+    print(f'✅ RATE LIMIT: waited {waited * 1000:.0f} ms for 50 tokens at 100 tokens/s')
+    assert 0.4 < waited < 1.5
+    assert limiter.get_stats()['admitted'] == 2
+
+
+def test_queue_full_and_timeout_shed_load():
+    """A full queue rejects at once and a waiter gives up after its timeout"""
+    limiter = UpstreamRateLimiter(requests_per_minute=60, tokens_per_minute=60, max_queue_size=1)
+    limiter.acquire(60)
+    waiter = threading.Thread(target=lambda: pytest.raises(RateLimitExceeded, limiter.acquire, 10, timeout=0.3))
+    waiter.start()
+    time.sleep(0.05)
+    
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(10)
+    waiter.join()
+    
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(limiter.acquire_async(10, timeout=0.05))
+    
+    stats = limiter.get_stats()
+    assert stats['rejected'] == 1
+    assert stats['timed_out'] == 2
+    assert stats['queue_depth'] == 0
+
+
+def test_interactive_requests_are_admitted_first():
+    """Waiting interactive requests overtake earlier background ones"""
+    limiter = UpstreamRateLimiter(requests_per_minute=600, tokens_per_minute=600000)
+    limiter.acquire(1)
+    limiter.request_bucket.level = 0
+    admission_order = []
+    
+    def wait_for_admission(name, priority):
+        limiter.acquire(1, priority=priority)
+        admission_order.append(name)
+    
+    threads = [threading.Thread(target=wait_for_admission, args=('background', PRIORITY_BACKGROUND))]
+    threads[0].start()
+    time.sleep(0.02)
+    threads.append(threading.Thread(target=wait_for_admission, args=('interactive', PRIORITY_INTERACTIVE)))
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+    
+    assert admission_order == ['interactive', 'background']
+
+
+def test_prefork_workers_split_the_account_budget(monkeypatch):
+    """Each of N workers admits 1/N of the configured requests, tokens and concurrent calls"""
+    monkeypatch.setenv('LLM_BUDGET_WORKERS', '4')
+    monkeypatch.setattr(rate_limiter, 'upstream_rate_limiter', None)
+    limiter = rate_limiter.get_upstream_rate_limiter()
+    
+    assert limiter.request_bucket.capacity == rate_limiter.LLM_REQUESTS_PER_MINUTE / 4
+    assert limiter.token_bucket.capacity == rate_limiter.LLM_TOKENS_PER_MINUTE / 4
+    
+    async def semaphore_slots():
+        return llm_service.get_async_request_semaphore()._value
+    
+    assert asyncio.run(semaphore_slots()) == llm_service.LLM_MAX_CONCURRENT_REQUESTS // 4
+
+
+def test_shed_requests_fall_back_without_tripping_breaker(monkeypatch):
+    """Locally shed questions get the fallback message and are not counted as upstream failures"""
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+    monkeypatch.setattr(llm_service, 'llm_circuit_breaker', CircuitBreaker(min_calls=1))
+    saturated_limiter = UpstreamRateLimiter(requests_per_minute=1, tokens_per_minute=100000, queue_timeout_seconds=0.05)
+    saturated_limiter.acquire(1)
+    monkeypatch.setattr(rate_limiter, 'upstream_rate_limiter', saturated_limiter)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+    
+    assert get_llm_response('Can you summarize our contract terms?') == get_error_fallback_message()
+    assert ''.join(llm_service.get_llm_response_streaming('Can you list our invoices?')) == get_error_fallback_message()
+    assert stub_client.calls == 0
+    assert llm_service.get_circuit_breaker_stats()['recent_calls'] == 0
+
+
+def test_admission_wait_is_taken_out_of_the_attempt_timeout(monkeypatch):
+    """The upstream call only gets the timeout left after queueing, and none left means no call"""
+    monkeypatch.setattr(rate_limiter, 'upstream_rate_limiter', UpstreamRateLimiter())
+    
+    async def slow_admission(estimated_tokens, priority=PRIORITY_INTERACTIVE, timeout=None):
+        await asyncio.sleep(0.1)
+    
+    monkeypatch.setattr(rate_limiter.upstream_rate_limiter, 'acquire_async', slow_admission)
+    stub_client = AsyncStubOpenAIClient()
+    upstream_timeouts = []
+    create_completion = stub_client.create
+    
+    async def record_timeout(**kwargs):
+        upstream_timeouts.append(kwargs['timeout'])
+        return await create_completion(**kwargs)
+    
+    stub_client.chat.completions.create = record_timeout
+    asyncio.run(create_admitted_completion_async(stub_client, build_completion_request('What does EVA do?', timeout=1.0)))
+    assert len(upstream_timeouts) == 1
+    assert 0.5 < upstream_timeouts[0] <= 0.9
+    
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(create_admitted_completion_async(stub_client, build_completion_request('What does EVA do?', timeout=0.05)))
+    assert stub_client.calls == 1
@@ -0,0 +1,138 @@
+"""
+Test suite for single-flight coalescing of identical LLM requests
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import weakref
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import request_coalescing
+import response_cache
+from llm_service import get_llm_response, get_llm_response_async, get_llm_response_streaming
+from request_coalescing import AsyncRequestCoalescer, get_coalescing_stats
+from response_cache import ResponseCache, SemanticResponseCache
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+def reset_coalescing_state(monkeypatch):
+    """Give a test empty caches and fresh coalescers"""
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+    monkeypatch.setattr(request_coalescing, '_async_coalescers', weakref.WeakKeyDictionary())
+    monkeypatch.setattr(request_coalescing, '_async_coalescing_stats', {'upstream_calls': 0, 'coalesced_calls': 0})
+
+
+def test_identical_questions_share_one_upstream_call(monkeypatch):
+    """Concurrent streaming and non-streaming callers get the same answer from one call"""
+    reset_coalescing_state(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient(delay_seconds=0.2))
+    start_barrier = threading.Barrier(8)
+    answers = []
+
+    def ask(streaming):
+        start_barrier.wait()
+        if streaming:
+            answers.append(''.join(get_llm_response_streaming('What does EVA do for billing?')).strip())
+        else:
+            answers.append(get_llm_response('what does eva do for billing'))
+
+    threads = [threading.Thread(target=ask, args=(index % 2 == 0,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = get_coalescing_stats()
+    print(f'✅ COALESCING: {stub_client.calls} upstream call(s), {stats["upstream_calls_saved"]} saved')
+    assert stub_client.calls == 1
+    assert answers == [stub_client.response_text] * 8
+    assert stats['upstream_calls'] == 1
+    assert stats['upstream_calls_saved'] == 7
+    assert stats['in_flight'] == 0
+
+
+def test_followers_receive_chunks_as_they_arrive(monkeypatch):
+    """A caller joining mid-stream replays earlier chunks and then follows live ones"""
+    monkeypatch.setattr(request_coalescing, '_async_coalescing_stats', {'upstream_calls': 0, 'coalesced_calls': 0})
+
+    async def follow_stream():
+        coalescer = AsyncRequestCoalescer()
+        release_second_chunk = asyncio.Event()
+
+        async def upstream():
+            yield 'first '
+            await asyncio.wait_for(release_second_chunk.wait(), timeout=5)
+            yield 'second'
+
+        async def never_called():
+            yield 'never called'
+
+        leader = coalescer.stream('key', upstream)
+        assert await leader.__anext__() == 'first '
+
+        follower = coalescer.stream('key', never_called)
+        assert await follower.__anext__() == 'first '
+
+        release_second_chunk.set()
+        assert [chunk async for chunk in leader] == ['second']
+        assert [chunk async for chunk in follower] == ['second']
+        return len(coalescer._in_flight)
+
+    assert asyncio.run(follow_stream()) == 0
+    assert get_coalescing_stats()['upstream_calls'] == 1
+    assert get_coalescing_stats()['coalesced_calls'] == 1
+
+
+def test_async_identical_questions_share_one_upstream_call(monkeypatch):
+    """Async callers on one event loop coalesce the same way"""
+    from metrics import get_counter, render_prometheus_text
+
+    reset_coalescing_state(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient(delay_seconds=0.05))
+    coalesced_before = get_counter('llm_coalesced_calls_total').value
+
+    async def ask_many():
+        return await asyncio.gather(*[get_llm_response_async('How does CAM handle claims?') for _ in range(5)])
+
+    answers = asyncio.run(ask_many())
+
+    assert stub_client.calls == 1
+    assert answers == [stub_client.response_text] * 5
+    assert get_coalescing_stats()['upstream_calls_saved'] == 4
+    assert get_counter('llm_coalesced_calls_total').value - coalesced_before == 4
+    assert '# TYPE llm_coalesced_calls_total counter' in render_prometheus_text()
+
+
+def test_upstream_is_cancelled_when_the_last_caller_leaves(monkeypatch):
+    """Closing every subscriber mid-answer cancels the pump; one remaining subscriber keeps it going"""
+    monkeypatch.setattr(request_coalescing, '_async_coalescing_stats', {'upstream_calls': 0, 'coalesced_calls': 0})
+
+    async def leave_early():
+        coalescer = AsyncRequestCoalescer()
+        upstream_closed = asyncio.Event()
+
+        async def upstream():
+            try:
+                yield 'first '
+                await asyncio.sleep(5)
+                yield 'second'
+            finally:
+                upstream_closed.set()
+
+        leader = coalescer.stream('key', upstream)
+        follower = coalescer.stream('key', upstream)
+        assert await leader.__anext__() == 'first '
+        assert await follower.__anext__() == 'first '
+
+        await leader.aclose()
+        await asyncio.sleep(0.01)
+        assert not upstream_closed.is_set()
+
+        await follower.aclose()
+        await asyncio.wait_for(upstream_closed.wait(), timeout=1)
+        return len(coalescer._in_flight)
+
+    assert asyncio.run(leave_early()) == 0
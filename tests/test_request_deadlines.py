@@ -0,0 +1,139 @@
+"""
+Test suite for deadline budgets, retries and hedged LLM requests
+"""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import request_deadlines
+from request_deadlines import LatencyTracker, call_with_budget_async, compute_backoff_delay
+
+
+def record_sleeps(sleeps):
+    """Async sleep stand-in that records the requested delays instead of waiting"""
+    async def sleep(seconds):
+        sleeps.append(seconds)
+    
+    return sleep
+
+
+class StatusError(Exception):
+    """Upstream error carrying an HTTP status, like openai.APIStatusError"""
+    
+    def __init__(self, status_code):
+        super().__init__(f'status {status_code}')
+        self.status_code = status_code
+
+
+def test_transient_errors_are_retried_with_backoff():
+    """429s are retried with growing jittered sleeps until an attempt succeeds"""
+    outcomes = [StatusError(429), StatusError(503), 'answer']
+    timeouts, sleeps = [], []
+    
+    async def attempt_request(timeout):
+        timeouts.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    
+    result = asyncio.run(call_with_budget_async(
+        attempt_request, LatencyTracker(), budget_seconds=30, hedge=False, sleep=record_sleeps(sleeps)
+    ))
+    
+    print(f'✅ RETRIES: {len(timeouts)} attempts, slept {sleeps}')
+    assert result == 'answer'
+    assert len(timeouts) == 3
+    assert all(timeout <= request_deadlines.LLM_ATTEMPT_TIMEOUT_SECONDS for timeout in timeouts)
+    assert 0 <= sleeps[0] <= request_deadlines.LLM_RETRY_BASE_DELAY_SECONDS
+    assert 0 <= sleeps[1] <= request_deadlines.LLM_RETRY_BASE_DELAY_SECONDS * 2
+
+
+def test_non_retryable_and_out_of_budget_errors_raise():
+    """Client errors fail at once, and no backoff sleep may overrun the budget"""
+    attempts = []
+    
+    async def bad_request(timeout):
+        attempts.append(timeout)
+        raise StatusError(400)
+    
+    with pytest.raises(StatusError):
+        asyncio.run(call_with_budget_async(bad_request, LatencyTracker(), hedge=False, sleep=record_sleeps([])))
+    assert len(attempts) == 1
+    
+    async def rate_limited(timeout):
+        attempts.append(timeout)
+        raise StatusError(429)
+    
+    with pytest.raises(StatusError):
+        asyncio.run(call_with_budget_async(rate_limited, LatencyTracker(), budget_seconds=0.001, hedge=False))
+    assert len(attempts) == 2
+
+
+def test_backoff_is_capped():
+    """The jitter window doubles per attempt up to the configured maximum"""
+    assert compute_backoff_delay(0, 0.25, 4.0, random_uniform=lambda low, high: high) == 0.25
+    assert compute_backoff_delay(3, 0.25, 4.0, random_uniform=lambda low, high: high) == 2.0
+    assert compute_backoff_delay(10, 0.25, 4.0, random_uniform=lambda low, high: high) == 4.0
+
+
+def test_hedge_delay_follows_p95():
+    """Hedging waits for the default delay until enough latencies are known, then for the p95"""
+    latency_tracker = LatencyTracker(window=100, min_samples=20)
+    assert latency_tracker.hedge_delay() == request_deadlines.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    
+    for index in range(100):
+        latency_tracker.record(1.0 + index / 100)
+    
+    assert latency_tracker.percentile(0.95) == pytest.approx(1.95)
+    assert latency_tracker.hedge_delay() == pytest.approx(1.95)
+
+
+def test_hedged_request_bounds_slow_first_attempt(monkeypatch):
+    """A hedge sent after the delay answers without waiting for the slow first attempt"""
+    monkeypatch.setattr(LatencyTracker, 'hedge_delay', lambda self: 0.05)
+    delays = [0.5, 0.01]
+    discarded = []
+    
+    async def attempt_request(timeout):
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return f'answer after {delay}'
+    
+    started = time.perf_counter()
+    result = asyncio.run(call_with_budget_async(attempt_request, LatencyTracker(), hedge=True, on_discard=discarded.append))
+    elapsed = time.perf_counter() - started
+    
+    print(f'✅ HEDGING: answered in {elapsed * 1000:.0f} ms')
+    assert result == 'answer after 0.01'
+    assert elapsed < 0.3
+    assert discarded == []
+
+
+def test_async_hedge_cancels_slow_attempt(monkeypatch):
+    """The async path retries, hedges and cancels the losing attempt"""
+    monkeypatch.setattr(LatencyTracker, 'hedge_delay', lambda self: 0.05)
+    monkeypatch.setattr(request_deadlines, 'compute_backoff_delay', lambda attempt: 0)
+    outcomes = [StatusError(429), 0.5, 0.01]
+    cancelled = []
+    
+    async def attempt_request(timeout):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        try:
+            await asyncio.sleep(outcome)
+        except asyncio.CancelledError:
+            cancelled.append(outcome)
+            raise
+        return f'answer after {outcome}'
+    
+    result = asyncio.run(call_with_budget_async(attempt_request, LatencyTracker(), hedge=True))
+    
+    assert result == 'answer after 0.01'
+    assert cancelled == [0.5]
@@ -0,0 +1,168 @@
+"""
+Test suite for the LLM response cache
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_cache
+from llm_service import get_llm_response, get_llm_response_streaming
+from response_cache import ResponseCache, SemanticResponseCache, build_cache_key, iter_response_chunks
+from tests.llm_stubs import AsyncStubOpenAIClient, install_async_stub_client
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def reset_response_caches(monkeypatch):
+    """Give a test empty process-wide caches"""
+    monkeypatch.setattr(response_cache, 'response_cache', ResponseCache())
+    monkeypatch.setattr(response_cache, 'semantic_cache', SemanticResponseCache())
+
+
+def test_cache_key_normalization():
+    """Case, punctuation and spacing variants share one key; model/prompt version split keys"""
+    assert build_cache_key('What are your hours?') == build_cache_key('  what are  YOUR hours ')
+    assert build_cache_key('What are your hours?') != build_cache_key('What are your hours?', model='other-model')
+    assert build_cache_key('What are your hours?') != build_cache_key('What are your hours?', prompt_version='2')
+
+
+def test_lru_eviction_and_ttl():
+    """Least recently used entries are evicted and expired entries are misses"""
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, clock=clock)
+    cache.set('a', 'answer a')
+    cache.set('b', 'answer b')
+    cache.get('a')
+    cache.set('c', 'answer c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'answer a'
+
+    clock.now += 61
+    assert cache.get('a') is None
+    assert cache.get_stats() == {'hits': 2, 'misses': 2, 'entries': 1}
+
+
+def test_sqlite_tier_survives_restart():
+    """A new cache instance reads answers persisted by a previous one"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        sqlite_path = os.path.join(cache_dir, 'responses.sqlite3')
+        ResponseCache(sqlite_path=sqlite_path).set('key', 'persisted answer')
+
+        restarted = ResponseCache(sqlite_path=sqlite_path)
+        assert restarted.get('key') == 'persisted answer'
+        assert restarted.get_stats()['entries'] == 1
+
+
+def test_llm_responses_are_cached(monkeypatch):
+    """Repeated questions skip the upstream call, streaming replays cached chunks"""
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+
+    first = get_llm_response('What are your hours?')
+    second = get_llm_response('what are your hours')
+    streamed_chunks = list(get_llm_response_streaming('WHAT are your hours??'))
+
+    print(f'✅ CACHE: {stub_client.calls} upstream call(s) for 3 questions')
+    assert first == second == stub_client.response_text
+    assert len(streamed_chunks) > 1
+    assert ''.join(streamed_chunks) == first
+    assert stub_client.calls == 1
+
+
+def test_streamed_answers_fill_cache(monkeypatch):
+    """A completed stream is cached, a failed one is not"""
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+
+    streamed = ''.join(get_llm_response_streaming('How do I reset my password?'))
+    assert get_llm_response('How do I reset my password?') == streamed.strip()
+    assert stub_client.calls == 1
+
+    install_async_stub_client(monkeypatch, AsyncStubOpenAIClient(error=RuntimeError('upstream down')))
+    list(get_llm_response_streaming('Is the service down?'))
+    assert response_cache.get_response_cache().get(build_cache_key('Is the service down?')) is None
+
+
+def test_replay_chunks_preserve_text():
+    """Replayed chunks concatenate back to the original answer"""
+    answer = 'EVA verifies eligibility.\n\nCAM handles  claims.'
+    assert ''.join(iter_response_chunks(answer)) == answer
+
+
+def test_semantic_cache_threshold_and_counters():
+    """Near-duplicates above the threshold hit, unrelated questions miss"""
+    clock = FakeClock()
+    cache = SemanticResponseCache(max_entries=4, similarity_threshold=0.85, clock=clock)
+    cache.add('What are your support hours?', 'We are available 24/7.')
+
+    answer, similarity = cache.lookup('what are your support hours today')
+    assert answer == 'We are available 24/7.'
+    assert similarity >= 0.85
+    assert cache.lookup('How do I cook pasta?') is None
+
+    clock.now += cache.ttl_seconds + 1
+    assert cache.lookup('What are your support hours?') is None
+    assert cache.get_stats() == {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3, 'entries': 1}
+
+
+def test_semantic_cache_rejects_a_changed_content_word():
+    """Long questions that differ in one content word are similar but must not share an answer"""
+    cache = SemanticResponseCache()
+    cache.add('How do I cancel my EVA subscription for the clinic account', 'Go to Billing and choose Cancel.')
+    
+    assert cache.lookup('How do I renew my EVA subscription for the clinic account') is None
+    assert cache.lookup('How do I cancel my EVA subscription for the clinic account?')[0] == 'Go to Billing and choose Cancel.'
+    assert cache.lookup('Please, how do I cancel the EVA subscription for my clinic account') is not None
+
+
+def test_semantic_cache_tolerates_added_words_but_not_changed_meaning():
+    """An extra content word still hits; a swapped word, negation or question word misses"""
+    from metrics import get_counter
+    
+    hits_before = get_counter('semantic_cache_hits_total').value
+    misses_before = get_counter('semantic_cache_misses_total').value
+    cache = SemanticResponseCache()
+    cache.add('How do I export claims reports from CAM for the clinic', 'Open Reports and choose Export.')
+    
+    assert cache.lookup('How do I export monthly claims reports from CAM for the clinic')[0] == 'Open Reports and choose Export.'
+    assert cache.lookup('How do I import claims reports from CAM for the clinic') is None
+    assert cache.lookup('Why does CAM not export claims reports for the clinic') is None
+    assert cache.lookup('When do I export claims reports from CAM for the clinic') is None
+    assert get_counter('semantic_cache_hits_total').value - hits_before == 1
+    assert get_counter('semantic_cache_misses_total').value - misses_before == 3
+
+
+def test_semantic_cache_ring_buffer():
+    """Only the newest max_entries questions are kept"""
+    cache = SemanticResponseCache(max_entries=2)
+    for index, topic in enumerate(['billing', 'onboarding', 'security']):
+        cache.add(f'Tell me about {topic}', f'answer {index}')
+
+    assert cache.lookup('Tell me about billing') is None
+    assert cache.lookup('Tell me about security')[0] == 'answer 2'
+    assert cache.get_stats()['entries'] == 2
+
+
+def test_llm_reuses_near_duplicate_answers(monkeypatch):
+    """A reworded question is served from the semantic cache without an upstream call"""
+    reset_response_caches(monkeypatch)
+    stub_client = install_async_stub_client(monkeypatch, AsyncStubOpenAIClient())
+
+    first = get_llm_response('How can Thoughtful AI help my clinic?')
+    reworded = ''.join(get_llm_response_streaming('How can Thoughtful AI help my clinic today?'))
+
+    print(f'✅ SEMANTIC CACHE: {response_cache.get_semantic_cache().get_stats()}')
+    assert reworded == first
+    assert stub_client.calls == 1
+    assert response_cache.get_semantic_cache().get_stats()['hits'] == 1
@@ -0,0 +1,67 @@
+"""
+Test suite for throttled rendering of streamed answers
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from config import STREAM_RENDER_MAX_PENDING_CHARS
+
+
+class RecordingPlaceholder:
+    """Stands in for st.empty() and keeps every markdown payload"""
+    
+    def __init__(self):
+        self.renders = []
+    
+    def markdown(self, text):
+        self.renders.append(text)
+
+
+def render_stream(monkeypatch, chunks, seconds_per_chunk):
+    """Run display_streaming_response over fixed chunks with a fake clock"""
+    placeholder = RecordingPlaceholder()
+    clock = SimpleNamespace(now=0.0)
+    
+    def timed_chunks(user_input):
+        for chunk in chunks:
+            clock.now += seconds_per_chunk
+            yield chunk
+    
+    monkeypatch.setattr(main, 'st', SimpleNamespace(empty=lambda: placeholder))
+    monkeypatch.setattr(main, 'get_llm_response_streaming', timed_chunks)
+    monkeypatch.setattr(main, 'time', SimpleNamespace(perf_counter=lambda: clock.now))
+    return main.display_streaming_response('question'), placeholder.renders
+
+
+def test_fast_chunks_are_coalesced(monkeypatch):
+    """A burst of small chunks renders far fewer times than it has chunks"""
+    chunks = [f'word{index} ' for index in range(1000)]
+    response, renders = render_stream(monkeypatch, chunks, seconds_per_chunk=0.001)
+    
+    print(f'✅ THROTTLE: {len(chunks)} chunks → {len(renders)} redraws')
+    assert response == ''.join(chunks)
+    assert renders[0] == chunks[0] + '▌'
+    assert renders[-1] == response
+    assert len(renders) < 100
+    assert all(len(later) >= len(earlier) for earlier, later in zip(renders, renders[1:]))
+
+
+def test_slow_chunks_render_without_lag(monkeypatch):
+    """Chunks slower than the render interval are each shown as soon as they arrive"""
+    chunks = ['Thoughtful ', 'AI ', 'automates ', 'healthcare.']
+    response, renders = render_stream(monkeypatch, chunks, seconds_per_chunk=0.2)
+    
+    assert renders[:-1] == [''.join(chunks[:count]) + '▌' for count in range(1, len(chunks) + 1)]
+    assert renders[-1] == response
+
+
+def test_large_pending_text_forces_a_redraw(monkeypatch):
+    """Even within one interval, a big enough backlog of text is flushed"""
+    chunks = ['x' * (STREAM_RENDER_MAX_PENDING_CHARS // 2)] * 6
+    _, renders = render_stream(monkeypatch, chunks, seconds_per_chunk=0.0)
+    
+    assert len(renders) == 1 + 2 + 1
@@ -0,0 +1,30 @@
+"""
+Background warm-up of lazily loaded dependencies
+Runs while the first page renders, so the first question does not wait for NumPy, the index or the OpenAI SDK
+"""
+
+import threading
+from llm_service import create_openai_client, is_openai_api_key_available
+from question_matcher import warm_up_query_indexes
+
+warmup_thread = None
+_warmup_lock = threading.Lock()
+
+
+def warm_up():
+    """Import NumPy and build the matcher and typo indexes, then import the OpenAI SDK and pool a client if a key is set"""
+    warm_up_query_indexes()
+    if is_openai_api_key_available():
+        create_openai_client()
+
+
+def start_background_warmup() -> threading.Thread:
+    """Start warm_up once per process on a daemon thread; later calls return the same thread"""
+    global warmup_thread
+    
+    with _warmup_lock:
+        if warmup_thread is None:
+            warmup_thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+            warmup_thread.start()
+    
+    return warmup_thread